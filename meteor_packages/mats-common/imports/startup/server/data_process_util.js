@@ -18,6 +18,54 @@ import { _ } from "meteor/underscore";
 
 /* eslint-disable no-await-in-loop */
 
+// calculate the python ctc error bars for every point of a diff curve in one batch,
+// rather than starting one python process per point. Points without error bars are null.
+const getCTCDiffErrorLengths = async function (
+  returnDataset,
+  diffFrom,
+  statisticSelect,
+  numberOfPoints
+) {
+  const errorLengths = new Array(numberOfPoints).fill(null);
+  if (diffFrom === undefined || diffFrom === null) {
+    return errorLengths;
+  }
+  const minuend = returnDataset[diffFrom[0]];
+  const subtrahend = returnDataset[diffFrom[1]];
+  const tasks = [];
+  const taskIndices = [];
+  for (let di = 0; di < numberOfPoints; di += 1) {
+    if (
+      (Array.isArray(minuend.subHit[di]) ||
+        !matsMethods.isThisANaN(minuend.subHit[di])) &&
+      (Array.isArray(subtrahend.subHit[di]) ||
+        !matsMethods.isThisANaN(subtrahend.subHit[di]))
+    ) {
+      tasks.push({
+        statistic: statisticSelect,
+        minuend_data: {
+          hit: minuend.subHit[di],
+          fa: minuend.subFa[di],
+          miss: minuend.subMiss[di],
+          cn: minuend.subCn[di],
+        },
+        subtrahend_data: {
+          hit: subtrahend.subHit[di],
+          fa: subtrahend.subFa[di],
+          miss: subtrahend.subMiss[di],
+          cn: subtrahend.subCn[di],
+        },
+      });
+      taskIndices.push(di);
+    }
+  }
+  const taskErrorLengths = await matsDataUtils.ctcErrorPythonBatch(tasks);
+  taskIndices.forEach(function (di, taskIndex) {
+    errorLengths[di] = taskErrorLengths[taskIndex];
+  });
+  return errorLengths;
+};
+
 const processDataXYCurve = async function (
   dataset,
   appParams,
@@ -75,6 +123,17 @@ const processDataXYCurve = async function (
     }
     const { label } = returnDataset[curveIndex];
 
+    // call the python ctc error bar code for all of the points of a diff curve at once
+    const ctcErrorLengths =
+      appParams.matching && statType === "ctc"
+        ? await getCTCDiffErrorLengths(
+            returnDataset,
+            diffFrom,
+            statisticSelect,
+            data.x.length
+          )
+        : [];
+
     let di = 0;
     const values = [];
     const indVars = [];
@@ -124,38 +183,11 @@ const processDataXYCurve = async function (
       if (!appParams.matching || statType.includes("met-mode")) {
         data.error_y.array[di] = null;
       } else if (statType === "ctc") {
-        // call the python ctc error bar code for diff curves
-        if (
-          diffFrom === undefined ||
-          diffFrom === null ||
-          !(
-            Array.isArray(returnDataset[diffFrom[0]].subHit[di]) ||
-            !matsMethods.isThisANaN(returnDataset[diffFrom[0]].subHit[di])
-          ) ||
-          !(
-            Array.isArray(returnDataset[diffFrom[1]].subHit[di]) ||
-            !matsMethods.isThisANaN(returnDataset[diffFrom[1]].subHit[di])
-          )
-        ) {
+        // use the python ctc error bars that were calculated up front for diff curves
+        if (ctcErrorLengths[di] === null) {
           data.error_y.array[di] = null;
         } else {
-          const minuendData = {
-            hit: returnDataset[diffFrom[0]].subHit[di],
-            fa: returnDataset[diffFrom[0]].subFa[di],
-            miss: returnDataset[diffFrom[0]].subMiss[di],
-            cn: returnDataset[diffFrom[0]].subCn[di],
-          };
-          const subtrahendData = {
-            hit: returnDataset[diffFrom[1]].subHit[di],
-            fa: returnDataset[diffFrom[1]].subFa[di],
-            miss: returnDataset[diffFrom[1]].subMiss[di],
-            cn: returnDataset[diffFrom[1]].subCn[di],
-          };
-          errorLength = await matsDataUtils.ctcErrorPython(
-            statisticSelect,
-            minuendData,
-            subtrahendData
-          );
+          errorLength = ctcErrorLengths[di];
           errorMax = errorMax > errorLength ? errorMax : errorLength;
           data.error_y.array[di] = errorLength;
         }
@@ -621,6 +653,17 @@ const processDataProfile = async function (
     }
     const { label } = returnDataset[curveIndex];
 
+    // call the python ctc error bar code for all of the points of a diff curve at once
+    const ctcErrorLengths =
+      appParams.matching && statType === "ctc"
+        ? await getCTCDiffErrorLengths(
+            returnDataset,
+            diffFrom,
+            statisticSelect,
+            data.y.length
+          )
+        : [];
+
     let di = 0;
     const values = [];
     const levels = [];
@@ -661,38 +704,11 @@ const processDataProfile = async function (
       if (!appParams.matching || statType.includes("met-mode")) {
         data.error_x.array[di] = null;
       } else if (statType === "ctc") {
-        // call the python ctc error bar code for diff curves
-        if (
-          diffFrom === undefined ||
-          diffFrom === null ||
-          !(
-            Array.isArray(returnDataset[diffFrom[0]].subHit[di]) ||
-            !matsMethods.isThisANaN(returnDataset[diffFrom[0]].subHit[di])
-          ) ||
-          !(
-            Array.isArray(returnDataset[diffFrom[1]].subHit[di]) ||
-            !matsMethods.isThisANaN(returnDataset[diffFrom[1]].subHit[di])
-          )
-        ) {
+        // use the python ctc error bars that were calculated up front for diff curves
+        if (ctcErrorLengths[di] === null) {
           data.error_x.array[di] = null;
         } else {
-          const minuendData = {
-            hit: returnDataset[diffFrom[0]].subHit[di],
-            fa: returnDataset[diffFrom[0]].subFa[di],
-            miss: returnDataset[diffFrom[0]].subMiss[di],
-            cn: returnDataset[diffFrom[0]].subCn[di],
-          };
-          const subtrahendData = {
-            hit: returnDataset[diffFrom[1]].subHit[di],
-            fa: returnDataset[diffFrom[1]].subFa[di],
-            miss: returnDataset[diffFrom[1]].subMiss[di],
-            cn: returnDataset[diffFrom[1]].subCn[di],
-          };
-          errorLength = await matsDataUtils.ctcErrorPython(
-            statisticSelect,
-            minuendData,
-            subtrahendData
-          );
+          errorLength = ctcErrorLengths[di];
           errorMax = errorMax > errorLength ? errorMax : errorLength;
           data.error_x.array[di] = errorLength;
         }
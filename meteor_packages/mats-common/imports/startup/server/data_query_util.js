@@ -145,9 +145,139 @@ const getStationsInCouchbaseRegion = async function (pool, region) {
   return null;
 };
 
-// utility to parse query results from python shell
-const parsePythonShellQueryResults = function (results, queryArray) {
-  const parsedData = JSON.parse(results);
+// utility to decode the columnar payload written by the python query utilities.
+// See columnar_output.py for the layout. The typed arrays are little-endian,
+// like the servers we run on.
+const decodeColumnarQueryResults = function (payload) {
+  if (payload.toString("latin1", 0, 8) !== "MATSCOL1") {
+    throw new Error("Python query results are not in the columnar format");
+  }
+  // copy into a fresh ArrayBuffer, so that the aligned arrays are aligned in memory too
+  const buffer = payload.buffer.slice(
+    payload.byteOffset,
+    payload.byteOffset + payload.byteLength
+  );
+  const headerLength = payload.readUInt32LE(8);
+  const bodyStart = 12 + headerLength;
+  const parsedData = JSON.parse(payload.toString("utf8", 12, bodyStart));
+  const typedArrays = { f8: Float64Array, i4: Int32Array, u1: Uint8Array };
+  parsedData.columns.forEach(function (column) {
+    const values = new typedArrays[column.dtype](
+      buffer,
+      bodyStart + column.valuesOffset,
+      column.length
+    );
+    const offsets = new Int32Array(
+      buffer,
+      bodyStart + column.offsetsOffset,
+      column.points + 1
+    );
+    const missing = new Uint8Array(
+      buffer,
+      bodyStart + column.missingOffset,
+      column.points
+    );
+    const { dictionary } = column;
+    const entries = new Array(column.points);
+    for (let pidx = 0; pidx < column.points; pidx += 1) {
+      if (missing[pidx]) {
+        entries[pidx] = NaN;
+      } else {
+        const pointValues = values.subarray(offsets[pidx], offsets[pidx + 1]);
+        entries[pidx] =
+          dictionary === undefined
+            ? Array.from(pointValues)
+            : Array.from(pointValues, (code) => dictionary[code]);
+      }
+    }
+    parsedData.data[column.curve][column.field] = entries;
+  });
+  delete parsedData.columns;
+  return parsedData;
+};
+
+// utility to read (and clean up) a columnar query results file from python shell
+const readColumnarQueryResults = function (outputPath) {
+  const fs = require("fs");
+  try {
+    return decodeColumnarQueryResults(fs.readFileSync(outputPath));
+  } finally {
+    fs.unlink(outputPath, () => {});
+  }
+};
+
+// utility to get a temp file path for a columnar python query, if that format is on
+const getColumnarOutputPath = function () {
+  if (Meteor.settings.private.PYTHON_QUERY_FORMAT !== "columnar") {
+    return null;
+  }
+  const os = require("os");
+  const path = require("path");
+  const crypto = require("crypto");
+  return path.join(os.tmpdir(), `mats_python_query_${crypto.randomUUID()}.bin`);
+};
+
+// utility for replacing the "null" strings python sends for missing points
+const nullifyMissingPoints = function (curve, statLineType) {
+  for (let didx = 0; didx < curve.y.length; didx += 1) {
+    if (curve.y[didx] === "null") {
+      curve.y[didx] = null;
+      if (curve.subVals.length > 0) {
+        curve.subData[didx] = NaN;
+        curve.subHeaders[didx] = NaN;
+        curve.subVals[didx] = NaN;
+        if (statLineType === "ctc") {
+          curve.subHit[didx] = NaN;
+          curve.subFa[didx] = NaN;
+          curve.subMiss[didx] = NaN;
+          curve.subCn[didx] = NaN;
+        } else if (statLineType === "mode_pair") {
+          curve.subInterest[didx] = NaN;
+        } else if (statLineType === "mode_single") {
+          curve.nForecast[didx] = 0;
+          curve.nMatched[didx] = 0;
+          curve.nSimple[didx] = 0;
+          curve.nTotal[didx] = 0;
+        }
+      }
+      curve.subSecs[didx] = NaN;
+      curve.subLevs[didx] = NaN;
+    } else if (curve.x[didx] === "null") {
+      curve.x[didx] = null;
+      if (curve.subVals.length > 0) {
+        curve.subData[didx] = NaN;
+        curve.subHeaders[didx] = NaN;
+        curve.subVals[didx] = NaN;
+        if (statLineType === "ctc") {
+          curve.subHit[didx] = NaN;
+          curve.subFa[didx] = NaN;
+          curve.subMiss[didx] = NaN;
+          curve.subCn[didx] = NaN;
+        } else if (statLineType === "mode_pair") {
+          curve.subInterest[didx] = NaN;
+        } else if (statLineType === "mode_single") {
+          curve.nForecast[didx] = 0;
+          curve.nMatched[didx] = 0;
+          curve.nSimple[didx] = 0;
+          curve.nTotal[didx] = 0;
+        }
+      }
+      curve.subSecs[didx] = NaN;
+      curve.subLevs[didx] = NaN;
+    }
+  }
+};
+
+// utility to parse query results from python shell. If the results were written to
+// a columnar output file, they are read from there instead of from the JSON.
+const parsePythonShellQueryResults = function (
+  results,
+  queryArray,
+  columnarOutputPath
+) {
+  const parsedData = columnarOutputPath
+    ? readColumnarQueryResults(columnarOutputPath)
+    : JSON.parse(results);
   const d = parsedData.data;
   const { n0 } = parsedData;
   const { nTimes } = parsedData;
@@ -155,52 +285,12 @@ const parsePythonShellQueryResults = function (results, queryArray) {
 
   // check for nulls in output, since JSON only passes strings
   for (let idx = 0; idx < d.length; idx += 1) {
-    for (let didx = 0; didx < d[idx].y.length; didx += 1) {
-      if (d[idx].y[didx] === "null") {
-        d[idx].y[didx] = null;
-        if (d[idx].subVals.length > 0) {
-          d[idx].subData[didx] = NaN;
-          d[idx].subHeaders[didx] = NaN;
-          d[idx].subVals[didx] = NaN;
-          if (queryArray[idx].statLineType === "ctc") {
-            d[idx].subHit[didx] = NaN;
-            d[idx].subFa[didx] = NaN;
-            d[idx].subMiss[didx] = NaN;
-            d[idx].subCn[didx] = NaN;
-          } else if (queryArray[idx].statLineType === "mode_pair") {
-            d[idx].subInterest[didx] = NaN;
-          } else if (queryArray[idx].statLineType === "mode_single") {
-            d[idx].nForecast[didx] = 0;
-            d[idx].nMatched[didx] = 0;
-            d[idx].nSimple[didx] = 0;
-            d[idx].nTotal[didx] = 0;
-          }
-        }
-        d[idx].subSecs[didx] = NaN;
-        d[idx].subLevs[didx] = NaN;
-      } else if (d[idx].x[didx] === "null") {
-        d[idx].x[didx] = null;
-        if (d[idx].subVals.length > 0) {
-          d[idx].subData[didx] = NaN;
-          d[idx].subHeaders[didx] = NaN;
-          d[idx].subVals[didx] = NaN;
-          if (queryArray[idx].statLineType === "ctc") {
-            d[idx].subHit[didx] = NaN;
-            d[idx].subFa[didx] = NaN;
-            d[idx].subMiss[didx] = NaN;
-            d[idx].subCn[didx] = NaN;
-          } else if (queryArray[idx].statLineType === "mode_pair") {
-            d[idx].subInterest[didx] = NaN;
-          } else if (queryArray[idx].statLineType === "mode_single") {
-            d[idx].nForecast[didx] = 0;
-            d[idx].nMatched[didx] = 0;
-            d[idx].nSimple[didx] = 0;
-            d[idx].nTotal[didx] = 0;
-          }
-        }
-        d[idx].subSecs[didx] = NaN;
-        d[idx].subLevs[didx] = NaN;
-      }
+    nullifyMissingPoints(d[idx], queryArray[idx].statLineType);
+    if (d[idx].multiStats) {
+      // any extra statistics requested for this curve come back in the same shape
+      Object.values(d[idx].multiStats).forEach(function (statOutput) {
+        nullifyMissingPoints(statOutput.data, queryArray[idx].statLineType);
+      });
     }
   }
   return { d, n0, nTimes, error };
@@ -235,6 +325,10 @@ const queryCBPython = async function (pool, queryArray) {
         JSON.stringify(queryArray),
       ],
     };
+    const columnarOutputPath = getColumnarOutputPath();
+    if (columnarOutputPath) {
+      pyOptions.args.push("-f", "columnar", "-o", columnarOutputPath);
+    }
 
     let d = [];
     let error = "";
@@ -266,7 +360,11 @@ const queryCBPython = async function (pool, queryArray) {
       };
     }
     // get the data back from the query
-    ({ d, n0, nTimes, error } = parsePythonShellQueryResults(results, queryArray));
+    ({ d, n0, nTimes, error } = parsePythonShellQueryResults(
+      results,
+      queryArray,
+      columnarOutputPath
+    ));
     return {
       data: d,
       error,
@@ -277,11 +375,157 @@ const queryCBPython = async function (pool, queryArray) {
   return null;
 };
 
+// long-lived mysql_query_util.py workers, a small pool per database, so that we don't
+// pay for interpreter start-up, imports, and a new db connection on every plot
+const pythonQueryWorkers = {};
+
+// utility for taking a python query worker out of its database's pool
+const removePythonQueryWorker = function (worker, workerKey) {
+  const workers = pythonQueryWorkers[workerKey] || [];
+  const index = workers.indexOf(worker);
+  if (index >= 0) {
+    workers.splice(index, 1);
+  }
+};
+
+// utility for starting a python query worker and adding it to its database's pool
+const startPythonQueryWorker = function (pyOptions, workerKey) {
+  const pyShell = require("python-shell");
+  const worker = new pyShell.PythonShell("mysql_query_util.py", pyOptions);
+  // a worker is only handed a request when it's idle, so it has at most one pending
+  worker.pendingRequest = undefined;
+  const failPendingRequest = function (err) {
+    removePythonQueryWorker(worker, workerKey);
+    const request = worker.pendingRequest;
+    worker.pendingRequest = undefined;
+    if (request !== undefined) {
+      request.reject(err);
+    }
+  };
+  worker.on("message", (message) => {
+    const request = worker.pendingRequest;
+    worker.pendingRequest = undefined;
+    if (request !== undefined) {
+      request.resolve(message);
+    }
+  });
+  worker.on("pythonError", failPendingRequest);
+  worker.on("error", failPendingRequest);
+  worker.on("close", () =>
+    failPendingRequest(new Error("mysql_query_util.py worker exited"))
+  );
+  if (pythonQueryWorkers[workerKey] === undefined) {
+    pythonQueryWorkers[workerKey] = [];
+  }
+  pythonQueryWorkers[workerKey].push(worker);
+  return worker;
+};
+
+// utility for getting an idle python query worker for a database, starting one if the
+// pool isn't full yet. Returns undefined if every worker is busy.
+const getPythonQueryWorker = function (pyOptions, workerKey, poolSize) {
+  const workers = pythonQueryWorkers[workerKey] || [];
+  const idleWorker = workers.find(
+    (worker) => worker.pendingRequest === undefined
+  );
+  if (idleWorker !== undefined) {
+    return idleWorker;
+  }
+  if (workers.length < poolSize) {
+    return startPythonQueryWorker(pyOptions, workerKey);
+  }
+  return undefined;
+};
+
+// utility for sending a query array to a python query worker. A request that runs past
+// the timeout is rejected, and its worker is killed and replaced with a fresh one.
+const queryPythonWorker = function (
+  worker,
+  pyOptions,
+  workerKey,
+  queryArray,
+  columnarOutputPath
+) {
+  return new Promise((resolve, reject) => {
+    const timeout = Meteor.settings.private.PYTHON_QUERY_WORKER_TIMEOUT
+      ? Meteor.settings.private.PYTHON_QUERY_WORKER_TIMEOUT
+      : 300;
+    const timer = setTimeout(() => {
+      worker.pendingRequest = undefined;
+      removePythonQueryWorker(worker, workerKey);
+      worker.kill();
+      startPythonQueryWorker(pyOptions, workerKey);
+      reject(
+        new Error(`mysql_query_util.py worker timed out after ${timeout} seconds`)
+      );
+    }, timeout * 1000);
+    worker.pendingRequest = {
+      resolve: (message) => {
+        clearTimeout(timer);
+        resolve(message);
+      },
+      reject: (err) => {
+        clearTimeout(timer);
+        reject(err);
+      },
+    };
+    worker.send(
+      JSON.stringify(
+        columnarOutputPath
+          ? {
+              query_array: queryArray,
+              format: "columnar",
+              outputPath: columnarOutputPath,
+            }
+          : { query_array: queryArray }
+      )
+    );
+  });
+};
+
 // utility for querying the MySQL DB via Python
 const queryDBPython = async function (pool, queryArray) {
   if (Meteor.isServer) {
     // send the query statement to the python query function
     const mysqlConnection = await pool.getConnection();
+    const workerPoolSize = Meteor.settings.private.PYTHON_QUERY_WORKERS
+      ? Number(Meteor.settings.private.PYTHON_QUERY_WORKERS)
+      : 0;
+    const connectionArgs = [
+      "-h",
+      mysqlConnection.config.host,
+      "-P",
+      mysqlConnection.config.port,
+      "-u",
+      mysqlConnection.config.user,
+      "-p",
+      mysqlConnection.config.password,
+      "-d",
+      mysqlConnection.config.database,
+      "-t",
+      Meteor.settings.public.mysql_wait_timeout
+        ? Meteor.settings.public.mysql_wait_timeout
+        : 300,
+    ];
+    if (Meteor.settings.private.PYTHON_QUERY_CONCURRENCY) {
+      // let python query the curves in parallel, capped at this many connections
+      connectionArgs.push("-c", Meteor.settings.private.PYTHON_QUERY_CONCURRENCY);
+    }
+    if (Meteor.settings.private.PYTHON_QUERY_STREAM) {
+      // have python reduce each row as it streams in, instead of holding the whole result set
+      connectionArgs.push("-s");
+    }
+    if (Meteor.settings.private.PYTHON_QUERY_CACHE_DIR) {
+      // keep decoded rows on disk, so that replotting with another statistic skips the database
+      connectionArgs.push("-C", Meteor.settings.private.PYTHON_QUERY_CACHE_DIR);
+      if (Meteor.settings.private.PYTHON_QUERY_CACHE_TTL) {
+        connectionArgs.push("-T", Meteor.settings.private.PYTHON_QUERY_CACHE_TTL);
+      }
+      if (Meteor.settings.private.PYTHON_QUERY_CACHE_MB) {
+        connectionArgs.push("-M", Meteor.settings.private.PYTHON_QUERY_CACHE_MB);
+      }
+    }
+    const columnarOutputPath = getColumnarOutputPath();
     const pyOptions = {
       mode: "text",
       pythonPath: Meteor.settings.private.PYTHON_PATH,
@@ -290,25 +534,13 @@ const queryDBPython = async function (pool, queryArray) {
         process.env.NODE_ENV === "development"
           ? `${process.env.PWD}/.meteor/local/build/programs/server/assets/packages/randyp_mats-common/public/python/`
           : `${process.env.PWD}/programs/server/assets/packages/randyp_mats-common/public/python/`,
-      args: [
-        "-h",
-        mysqlConnection.config.host,
-        "-P",
-        mysqlConnection.config.port,
-        "-u",
-        mysqlConnection.config.user,
-        "-p",
-        mysqlConnection.config.password,
-        "-d",
-        mysqlConnection.config.database,
-        "-t",
-        Meteor.settings.public.mysql_wait_timeout
-          ? Meteor.settings.public.mysql_wait_timeout
-          : 300,
-        "-q",
-        JSON.stringify(queryArray),
-      ],
+      args: [...connectionArgs, "-q", JSON.stringify(queryArray)],
     };
+    if (columnarOutputPath) {
+      pyOptions.args.push("-f", "columnar", "-o", columnarOutputPath);
+    }
+    const workerKey = `${mysqlConnection.config.host}:${mysqlConnection.config.port}/${mysqlConnection.config.database}`;
+    const workerOptions = { ...pyOptions, args: [...connectionArgs, "-w"] };
     mysqlConnection.release();
 
     let d = [];
@@ -316,9 +548,31 @@ const queryDBPython = async function (pool, queryArray) {
     let n0 = [];
     let nTimes = [];
 
+    // when every worker for this database is busy, don't queue behind them, just run a
+    // one-shot process like we do without workers
     const pyShell = require("python-shell");
-    const results = await pyShell.PythonShell.run("mysql_query_util.py", pyOptions)
-      .then()
+    const worker =
+      workerPoolSize > 0
+        ? getPythonQueryWorker(workerOptions, workerKey, workerPoolSize)
+        : undefined;
+    const pythonQuery =
+      worker !== undefined
+        ? queryPythonWorker(
+            worker,
+            workerOptions,
+            workerKey,
+            queryArray,
+            columnarOutputPath
+          )
+        : pyShell.PythonShell.run("mysql_query_util.py", pyOptions);
+    const results = await pythonQuery
+      .then((output) => {
+        // a worker reports request-level failures in-band, so it can keep serving
+        if (worker !== undefined && output.startsWith('{"workerError"')) {
+          error = JSON.parse(output).workerError;
+        }
+        return output;
+      })
       .catch((err) => {
         error = err.message;
         return {
@@ -341,7 +595,11 @@ const queryDBPython = async function (pool, queryArray) {
       };
     }
     // get the data back from the query
-    ({ d, n0, nTimes, error } = parsePythonShellQueryResults(results, queryArray));
+    ({ d, n0, nTimes, error } = parsePythonShellQueryResults(
+      results,
+      queryArray,
+      columnarOutputPath
+    ));
     return {
       data: d,
       error,
@@ -1332,6 +1332,61 @@ const ctcErrorPython = async function (statistic, minuendData, subtrahendData) {
   return null;
 };
 
+// use python to calculate the ctc error bar lengths for a whole list of points at once.
+// each task is {statistic, minuend_data, subtrahend_data}
+const ctcErrorPythonBatch = async function (tasks) {
+  if (Meteor.isServer) {
+    if (tasks.length === 0) {
+      return [];
+    }
+    // send the tasks to the python script over stdin, since they're too big for argv
+    const pyOptions = {
+      mode: "text",
+      pythonPath: Meteor.settings.private.PYTHON_PATH,
+      pythonOptions: ["-u"], // get print results in real-time
+      scriptPath:
+        process.env.NODE_ENV === "development"
+          ? `${process.env.PWD}/.meteor/local/build/programs/server/assets/packages/randyp_mats-common/public/python/`
+          : `${process.env.PWD}/programs/server/assets/packages/randyp_mats-common/public/python/`,
+      args: [
+        "-b",
+        "-j",
+        Meteor.settings.private.PYTHON_CTC_ERROR_JOBS
+          ? Meteor.settings.private.PYTHON_CTC_ERROR_JOBS
+          : 1,
+      ],
+    };
+    const pyShell = require("python-shell");
+
+    let error;
+    let errorLengths = [];
+    const results = await new Promise((resolve, reject) => {
+      const shell = new pyShell.PythonShell("python_ctc_error.py", pyOptions);
+      const output = [];
+      shell.on("message", (message) => output.push(message));
+      shell.send(JSON.stringify(tasks));
+      shell.end((err) => (err ? reject(err) : resolve(output.join(""))));
+    }).catch((err) => {
+      error = err.message;
+    });
+    // parse the results or set an error
+    if (results === undefined || results === "undefined" || results === "") {
+      error =
+        error ||
+        "Error thrown by python_ctc_error.py. Please write down exactly how you produced this error, and submit a ticket at mats.gsl@noaa.gov.";
+    } else {
+      // get the data back from the query
+      const parsedData = JSON.parse(results);
+      errorLengths = parsedData.map((taskResult) => Number(taskResult.error_length));
+    }
+    if (error) {
+      throw new Error(`Error when calculating CTC errorbars: ${error}`);
+    }
+    return errorLengths;
+  }
+  return null;
+};
+
 // calculate the t value for a student's t-test
 const getTValue = function (x1, x2, s1, s2, n1, n2) {
   return Math.abs(x1 - x2) / Math.sqrt(s1 ** 2 / n1 + s2 ** 2 / n2);
@@ -2161,6 +2216,7 @@ export default matsDataUtils = {
   readableAdeckModels,
   getErr,
   ctcErrorPython,
+  ctcErrorPythonBatch,
   checkDiffContourSignificance,
   checkDiffContourSignificanceCTC,
   setHistogramParameters,
@@ -339,6 +339,8 @@ Package.onUse(function (api) {
   api.addAssets("public/python/calc_stats.py", "server");
   api.addAssets("public/python/calc_ens_stats.py", "server");
   api.addAssets("public/python/mode_stats.py", "server");
+  api.addAssets("public/python/columnar_output.py", "server");
+  api.addAssets("public/python/query_cache.py", "server");
 
   // static assets -- fonts
   api.addAssets("public/fonts/PublicSans-Black.ttf", "client");
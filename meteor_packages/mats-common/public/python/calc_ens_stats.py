@@ -1,3 +1,12 @@
+import numpy as np
+
+
+def _ratio(numerator, denominator):
+    """function for dividing two arrays, with None wherever the denominator is zero"""
+    ratio = np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator != 0).tolist()
+    return [None if denominator_value == 0 else value for value, denominator_value in zip(ratio, denominator.tolist())]
+
+
 def get_ens_stat(plot_type, forecast_total, observed_total, on_all, oy_all, threshold_all, total_times,
                  total_values):
     """function for processing the sub-values from the query and getting the overall ensemble statistics"""
@@ -12,56 +21,32 @@ def get_ens_stat(plot_type, forecast_total, observed_total, on_all, oy_all, thre
 
     if plot_type == 'Reliability':
         # determine the hit rate for each probability bin
-        for i in range(0, len(threshold_all)):
-            try:
-                hr = float(oy_all[i]) / (float(oy_all[i]) + float(on_all[i]))
-            except ZeroDivisionError:
-                hr = None
-            hit_rate.append(hr)
+        oy = np.asarray(oy_all[:len(threshold_all)], dtype=np.float64)
+        on = np.asarray(on_all[:len(threshold_all)], dtype=np.float64)
+        hit_rate = _ratio(oy, oy + on)
         # calculate the sample climatology
         sample_climo = float(observed_total) / float(forecast_total)
         x_var = 'threshold_all'
         y_var = 'hit_rate'
 
     elif plot_type == 'ROC' or plot_type == "PerformanceDiagram":
-        # determine the probability of detection (hit rate) and probability of false detection (false alarm ratio) for each probability bin
-        for i in range(0, len(threshold_all)):
-            hit = 0
-            miss = 0
-            fa = 0
-            cn = 0
-            for index, value in enumerate(oy_all):
-                if index > i:
-                    hit += value
-                if index <= i:
-                    miss += value
-            for index, value in enumerate(on_all):
-                if index > i:
-                    fa += value
-                if index <= i:
-                    cn += value
+        # determine the probability of detection (hit rate) and probability of false detection (false alarm ratio) for each probability bin.
+        # everything above a bin's threshold is a yes forecast, so the misses and correct negatives are running sums.
+        oy = np.asarray(oy_all, dtype=np.int64)
+        on = np.asarray(on_all, dtype=np.int64)
+        miss = np.cumsum(oy)[:len(threshold_all)]
+        cn = np.cumsum(on)[:len(threshold_all)]
+        hit = oy.sum() - miss
+        fa = on.sum() - cn
 
-            # POD
-            try:
-                hr = hit / (hit + miss)
-            except ZeroDivisionError:
-                hr = None
-            pody.append(hr)
-
-            if plot_type == 'ROC':
-                # POFD
-                try:
-                    pofd = fa / (fa + cn)
-                except ZeroDivisionError:
-                    pofd = None
-                far.append(pofd)
-            else:
-                # 1- FAR for success ratio
-                try:
-                    far1 = 1 - (fa / (fa + hit))
-                except ZeroDivisionError:
-                    far1 = None
-                far.append(far1)
+        # POD
+        pody = _ratio(hit, hit + miss)
+        if plot_type == 'ROC':
+            # POFD
+            far = _ratio(fa, fa + cn)
+        else:
+            # 1- FAR for success ratio
+            far = [None if far1 is None else 1 - far1 for far1 in _ratio(fa, fa + hit)]
 
         # Reverse all of the lists (easier to graph)
         pody = pody[::-1]
@@ -82,11 +67,14 @@ def get_ens_stat(plot_type, forecast_total, observed_total, on_all, oy_all, thre
             total_values.append(-999)
             total_times.append(-999)
 
-            # Calculate AUC
-            auc_sum = 0
-            for i in range(1, len(threshold_all)):
-                auc_sum = ((pody[i] + pody[i - 1]) * (far[i] - far[i - 1])) + auc_sum
-            auc = auc_sum / 2
+            # Calculate AUC with the trapezoidal rule, adding up the trapezoids in order
+            if None not in pody and None not in far:
+                pody_values = np.asarray(pody, dtype=np.float64)
+                far_values = np.asarray(far, dtype=np.float64)
+                trapezoids = (pody_values[1:] + pody_values[:-1]) * (far_values[1:] - far_values[:-1])
+                auc = np.add.accumulate(np.concatenate(([0.], trapezoids)))[-1] / 2
+            else:
+                auc = None
         x_var = 'far'
         y_var = 'pody'
 
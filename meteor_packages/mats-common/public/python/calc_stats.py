@@ -1,19 +1,20 @@
 import numpy as np
-import metcalcpy.util.sl1l2_statistics as calc_sl1l2
-import metcalcpy.util.sal1l2_statistics as calc_sal1l2
-import metcalcpy.util.vcnt_statistics as calc_vcnt
-import metcalcpy.util.val1l2_statistics as calc_val1l2
-import metcalcpy.util.ctc_statistics as calc_ctc
-import metcalcpy.util.ecnt_statistics as calc_ecnt
-import metcalcpy.util.nbrcnt_statistics as calc_nbrcnt
-import metcalcpy.util.mode_2d_ratio_statistics as calc_2d_ratio
-import metcalcpy.util.mode_2d_arearat_statistics as calc_2d_arearat
-from mode_stats import calculate_ots, calculate_mmi, calculate_ofb, calculate_mcd, \
-    calculate_mode_csi, calculate_mode_far, calculate_mode_pody
+from functools import lru_cache
+from importlib import import_module
 
 
+@lru_cache(maxsize=None)
+def _metcalcpy_module(name):
+    """function for importing a metcalcpy.util module the first time a statistic needs it, so that a query
+    only pays for the line types it actually uses"""
+    return import_module('metcalcpy.util.' + name)
+
+
+@lru_cache(maxsize=None)
 def _scalar_stat_switch():
     """function for defining the appropriate scalar statistical calculation functions"""
+    calc_sl1l2 = _metcalcpy_module('sl1l2_statistics')
+    calc_sal1l2 = _metcalcpy_module('sal1l2_statistics')
     return {
         'ACC': calc_sal1l2.calculate_anom_corr,
         'RMSE': calc_sl1l2.calculate_rmse,
@@ -33,8 +34,11 @@ def _scalar_stat_switch():
     }
 
 
+@lru_cache(maxsize=None)
 def _vector_stat_switch():
     """function for defining the appropriate vector statistical calculation functions"""
+    calc_vcnt = _metcalcpy_module('vcnt_statistics')
+    calc_val1l2 = _metcalcpy_module('val1l2_statistics')
     return {
         'Vector ACC': calc_val1l2.calculate_val1l2_anom_corr,
         'Forecast length of mean wind vector': calc_vcnt.calculate_vcnt_fbar_speed,
@@ -57,8 +61,10 @@ def _vector_stat_switch():
     }
 
 
+@lru_cache(maxsize=None)
 def _ctc_stat_switch():
     """function for defining the appropriate ctc statistical calculation functions"""
+    calc_ctc = _metcalcpy_module('ctc_statistics')
     return {
         'CSI (Critical Success Index)': calc_ctc.calculate_csi,
         'FAR (False Alarm Ratio)': calc_ctc.calculate_far,
@@ -71,15 +77,19 @@ def _ctc_stat_switch():
     }
 
 
+@lru_cache(maxsize=None)
 def _nbrcnt_stat_switch():
     """function for defining the appropriate nbrcnt statistical calculation functions"""
+    calc_nbrcnt = _metcalcpy_module('nbrcnt_statistics')
     return {
         'FSS': calc_nbrcnt.calculate_nbr_fss
     }
 
 
+@lru_cache(maxsize=None)
 def _ecnt_stat_switch():
     """function for defining the appropriate ecnt statistical calculation functions"""
+    calc_ecnt = _metcalcpy_module('ecnt_statistics')
     return {
         'RMSE': [calc_ecnt.calculate_ecnt_rmse, np.square, 'mse'],
         'RMSE with obs error': [calc_ecnt.calculate_ecnt_rmse_oerr, np.square, 'mse_oerr'],
@@ -93,8 +103,11 @@ def _ecnt_stat_switch():
     }
 
 
+@lru_cache(maxsize=None)
 def _mode_single_stat_switch():
     """function for defining the appropriate mode_single statistical calculation functions"""
+    calc_2d_ratio = _metcalcpy_module('mode_2d_ratio_statistics')
+    calc_2d_arearat = _metcalcpy_module('mode_2d_arearat_statistics')
     return {
         'Ratio of simple objects that are forecast objects': calc_2d_ratio.calculate_2d_ratio_fsa_asa,
         'Ratio of simple objects that are observation objects': calc_2d_ratio.calculate_2d_ratio_osa_asa,
@@ -150,8 +163,29 @@ def _mode_single_stat_switch():
     }
 
 
+# the columns of decoded mode_single sub_data
+MODE_SINGLE_COLUMN_HEADERS = ('object_id', 'object_cat', 'object_type', 'area', 'total', 'fcst_flag', 'simple_flag',
+                              'matched_flag')
+
+# the fields of decoded mode_pair sub_data. The ids and categories are integer codes.
+MODE_PAIR_DTYPE = np.dtype([('mode_header_id', np.int32), ('object_id', np.int32), ('object_f_id', np.int32),
+                            ('object_o_id', np.int32), ('object_f_cat', np.int32), ('object_o_cat', np.int32),
+                            ('object_type', 'U2'), ('interest', np.float64), ('centroid_dist', np.float64),
+                            ('f_area', np.float64), ('o_area', np.float64), ('f_intensity_nn', np.float64),
+                            ('o_intensity_nn', np.float64), ('f_centroid_lat', np.float64),
+                            ('o_centroid_lat', np.float64), ('f_centroid_lon', np.float64),
+                            ('o_centroid_lon', np.float64), ('total', np.float64)])
+
+# the mode_pair statistics that come from the object contingency table, and so depend on the interest threshold
+MODE_CTC_STATISTICS = ['CSI (Critical Success Index)', 'FAR (False Alarm Ratio)',
+                       'PODy (Probability of positive detection)']
+
+
+@lru_cache(maxsize=None)
 def _mode_pair_stat_switch():
     """function for defining the appropriate mode_pair statistical calculation functions"""
+    from mode_stats import calculate_ots, calculate_mmi, calculate_ofb, calculate_mcd, \
+        calculate_mode_csi, calculate_mode_far, calculate_mode_pody
     return {
         'OTS (Object Threat Score)': calculate_ots,
         'MMI (Median of Maximum Interest)': calculate_mmi,
@@ -163,24 +197,105 @@ def _mode_pair_stat_switch():
     }
 
 
-def calculate_stat(statistic, stat_line_type, agg_method, outlier_qc_param, numpy_data, column_headers, sub_secs, sub_levs):
-    """function for determining and calling the appropriate statistical calculation function"""
+def _stat_switch(stat_line_type):
+    """function for finding the statistical calculation functions for a line type"""
     if stat_line_type == 'scalar':
-        stat_switch = _scalar_stat_switch()
+        return _scalar_stat_switch()
     elif stat_line_type == 'vector':
-        stat_switch = _vector_stat_switch()
+        return _vector_stat_switch()
     elif stat_line_type == 'ctc':
-        stat_switch = _ctc_stat_switch()
+        return _ctc_stat_switch()
     elif stat_line_type == 'nbrcnt':
-        stat_switch = _nbrcnt_stat_switch()
+        return _nbrcnt_stat_switch()
     elif stat_line_type == 'ecnt':
-        stat_switch = _ecnt_stat_switch()
+        return _ecnt_stat_switch()
     elif stat_line_type == 'mode_single':
-        stat_switch = _mode_single_stat_switch()
+        return _mode_single_stat_switch()
     elif stat_line_type == 'mode_pair':
-        stat_switch = _mode_pair_stat_switch()
+        return _mode_pair_stat_switch()
+    return {}
+
+
+def resolve_statistics(statistics, statistic, stat_line_type):
+    """function for finding the statistics requested alongside a curve's main one. "all" means every statistic of
+    the line type that is calculated from the same sub_data columns as the main one."""
+    if statistics == "all":
+        candidates = list(_stat_switch(stat_line_type).keys())
+        if stat_line_type not in ['mode_single', 'mode_pair']:
+            column_headers = numeric_column_headers(stat_line_type, statistic)
+            candidates = [candidate for candidate in candidates
+                          if np.array_equal(numeric_column_headers(stat_line_type, candidate), column_headers)]
     else:
-        stat_switch = {}
+        candidates = list(statistics)
+    extra_statistics = []
+    for candidate in candidates:
+        if candidate != statistic and candidate not in extra_statistics:
+            extra_statistics.append(candidate)
+    return extra_statistics
+
+
+def parse_mode_interest_param(mode_interest):
+    """function for reading the modeInterest app param. It's an interest threshold for matching MODE objects, or a
+    list of them, either as an actual list or as a comma-separated string. The first threshold is the one the
+    curve's statistic uses, and the MODE CSI, PODy, and FAR are also swept over all of them."""
+    if isinstance(mode_interest, str):
+        mode_interest = mode_interest.split(',')
+    elif not isinstance(mode_interest, (list, tuple)):
+        mode_interest = [mode_interest]
+    thresholds = [float(threshold) for threshold in mode_interest]
+    if len(thresholds) == 0:
+        raise ValueError("no MODE interest thresholds given")
+    return thresholds
+
+
+def read_mode_interest_param(app_params):
+    """function for reading the modeInterest app param the way the query tools report bad inputs. Returns the
+    thresholds, or None and an error message for the curve if they can't be read."""
+    try:
+        return parse_mode_interest_param(app_params.get("modeInterest", 0.70)), ""
+    except (TypeError, ValueError) as e:
+        return None, "Error parsing the MODE interest thresholds: " + str(e)
+
+
+def parse_outlier_qc_param(outliers):
+    """function for reading the outliers app param. It's "all" to keep everything, a number of standard deviations
+    from the mean, or "mad:<n>" for n scaled median absolute deviations from the median, or "percentile:<p>" to
+    clip the values below the pth and above the (100 - p)th percentiles."""
+    if outliers == "all":
+        return "all"
+    if isinstance(outliers, str) and ':' in outliers:
+        mode, limit = outliers.split(':', 1)
+        if mode not in ['mad', 'percentile']:
+            raise ValueError("unknown outlier QC mode " + mode)
+        return mode, float(limit)
+    return int(outliers)
+
+
+def outlier_qc_mask(sub_stats, outlier_qc_param):
+    """function for finding which sub-values survive outlier QC, as a boolean mask. Nans are never outliers."""
+    if outlier_qc_param == "all":
+        return np.ones(len(sub_stats), dtype=bool)
+    if isinstance(outlier_qc_param, tuple):
+        mode, limit = outlier_qc_param
+        if mode == 'percentile':
+            lower, upper = np.nanpercentile(sub_stats, [limit, 100 - limit])
+            return ~((sub_stats < lower) | (sub_stats > upper))
+        median = np.nanmedian(sub_stats)
+        deviations = np.abs(sub_stats - median)
+        mad = np.nanmedian(deviations)
+        # 1.4826 scales the MAD to a standard deviation for normally distributed values. If most of the values
+        # are the same, the MAD is zero and can't tell outliers apart, so everything is kept.
+        return ~((deviations > limit * 1.4826 * mad) & (mad > 0))
+    sub_stdev = np.nanstd(sub_stats)
+    sub_mean = np.nanmean(sub_stats)
+    return ~(np.abs(sub_stats - sub_mean) > outlier_qc_param * sub_stdev)
+
+
+def calculate_stat(statistic, stat_line_type, agg_method, outlier_qc_param, numpy_data, column_headers, sub_secs, sub_levs,
+                   mode_interest=0.70):
+    """function for determining and calling the appropriate statistical calculation function. mode_interest is the
+    interest threshold for the MODE object contingency table stats."""
+    stat_switch = _stat_switch(stat_line_type)
 
     error = ""
     data_length = numpy_data.shape[0]
@@ -189,32 +304,33 @@ def calculate_stat(statistic, stat_line_type, agg_method, outlier_qc_param, nump
     if stat_line_type == "ecnt":
         column_headers[0] = stat_switch[statistic][2]
     try:
-        for idx in range(data_length):
-            if stat_line_type == "precalculated":
-                sub_stats[idx] = numpy_data[idx, 0]
-            elif stat_line_type == "ecnt":
-                if stat_switch[statistic][1] != '':
-                    numpy_data[[idx], :] = stat_switch[statistic][1](numpy_data[[idx], :])
-                sub_stats[idx] = stat_switch[statistic][0](numpy_data[[idx], :], column_headers)
-            elif stat_line_type == 'mode_pair':
-                # dummy because these need to be overall stats only
-                sub_stats[idx] = 1
-            else:
-                sub_stats[idx] = stat_switch[statistic](numpy_data[[idx], :], column_headers)
+        # calculate every row at once where there's a kernel for the statistic, rather than calling metcalcpy per row
+        row_stats = calculate_row_stats(statistic, stat_line_type, numpy_data, column_headers)
+        if row_stats is not None:
+            sub_stats = row_stats
+        else:
+            for idx in range(data_length):
+                if stat_line_type == "ecnt":
+                    if stat_switch[statistic][1] != '':
+                        numpy_data[[idx], :] = stat_switch[statistic][1](numpy_data[[idx], :])
+                    sub_stats[idx] = stat_switch[statistic][0](numpy_data[[idx], :], column_headers)
+                elif stat_line_type == 'mode_pair':
+                    # dummy because these need to be overall stats only
+                    sub_stats[idx] = 1
+                else:
+                    sub_stats[idx] = stat_switch[statistic](numpy_data[[idx], :], column_headers)
 
         # now that we have all the sub-stats, we can get the standard deviation 
         # and remove the rows that exceed it. This should only ever trigger for 
         # scalar stats, everything else will have outlier_qc_param = 100
         if outlier_qc_param != "all":
-            sub_stdev = np.nanstd(sub_stats)
-            sub_mean = np.nanmean(sub_stats)
-            sd_limit = outlier_qc_param * sub_stdev
-            for idx in reversed(range(data_length)):
-                if abs(sub_stats[idx] - sub_mean) > sd_limit:
-                    sub_stats = np.delete(sub_stats, idx, 0)
-                    sub_secs = np.delete(sub_secs, idx, 0)
-                    sub_levs = np.delete(sub_levs, idx, 0) if len(sub_levs) > 0 else sub_levs
-                    numpy_data = np.delete(numpy_data, idx, 0)
+            keep = outlier_qc_mask(sub_stats, outlier_qc_param)
+            if not np.all(keep):
+                # apply the mask to every array at once, rather than deleting the outliers one at a time
+                sub_stats = sub_stats[keep]
+                sub_secs = np.asarray(sub_secs)[keep]
+                sub_levs = np.asarray(sub_levs)[keep] if len(sub_levs) > 0 else sub_levs
+                numpy_data = numpy_data[keep]
 
         # calculate the overall statistic
         if agg_method == "Mean statistic":
@@ -227,8 +343,13 @@ def calculate_stat(statistic, stat_line_type, agg_method, outlier_qc_param, nump
         elif statistic in ['rhist', 'phist', 'relp']:
             stat = np.nansum(sub_stats)  # calculate stat as sum of sub_values
         else:
-            numpy_data[:, total_index] = 1  # METcalcpy is weird about how it calculates totals. This gets what we want here.
-            if stat_line_type == 'ctc' or 'mode' in stat_line_type:
+            if numpy_data.dtype.names is not None:
+                numpy_data['total'] = 1  # mode_pair sub_data is a structured array
+            else:
+                numpy_data[:, total_index] = 1  # METcalcpy is weird about how it calculates totals. This gets what we want here.
+            if stat_line_type == 'mode_pair' and statistic in MODE_CTC_STATISTICS:
+                stat = stat_switch[statistic](numpy_data, column_headers, mode_interest)  # calculate overall stat
+            elif stat_line_type == 'ctc' or 'mode' in stat_line_type:
                 stat = stat_switch[statistic](numpy_data, column_headers)  # calculate overall stat
             else:
                 stat = stat_switch[statistic](numpy_data, column_headers, True)  # calculate overall stat
@@ -243,12 +364,176 @@ def calculate_stat(statistic, stat_line_type, agg_method, outlier_qc_param, nump
     return sub_stats, sub_secs, sub_levs, numpy_data, stat, error
 
 
+def numeric_column_headers(stat_line_type, statistic):
+    """function for getting the sub_data column headers for the numeric line types"""
+    if stat_line_type == 'scalar':
+        if "ACC" not in statistic:
+            return np.asarray(['fbar', 'obar', 'ffbar', 'oobar', 'fobar', 'total'])
+        return np.asarray(['fabar', 'oabar', 'ffabar', 'ooabar', 'foabar', 'total'])
+    elif stat_line_type == 'vector':
+        if "ACC" not in statistic:
+            return np.asarray(['ufbar', 'vfbar', 'uobar', 'vobar', 'uvfobar', 'uvffbar', 'uvoobar',
+                               'f_speed_bar', 'o_speed_bar', 'total'])
+        return np.asarray(['ufabar', 'vfabar', 'uoabar', 'voabar', 'uvfoabar', 'uvffabar', 'uvooabar', 'total'])
+    elif stat_line_type == 'ctc':
+        return np.asarray(['fy_oy', 'fy_on', 'fn_oy', 'fn_on', 'total'])
+    elif stat_line_type == 'nbrcnt':
+        return np.asarray(['fss', 'fbs', 'total'])
+    # everything else is a precalculated stat
+    return np.asarray(['precalc', 'total'])
+
+
+def _sub_data_fields(sub_data, row_length):
+    """function for splitting a group_concat sub_data string into one flat list of its fields, row_length per
+    sub_datum, along with the number of sub_data"""
+    sub_data = str(sub_data)
+    num_rows = sub_data.count(',') + 1
+    fields = sub_data.replace(',', ';').split(';')
+    if len(fields) != num_rows * row_length:
+        # some sub_datum has trailing fields we don't use, so only take the ones we do
+        fields = [field for sub_datum in sub_data.split(',') for field in sub_datum.split(';')[:row_length]]
+    return fields, num_rows
+
+
+def _missing_to_nan(values):
+    """function for replacing the database's missing-value sentinel, 9999, with nans in a float array"""
+    values[np.abs(values) == 9999.] = np.nan
+    return values
+
+
+def _decode_secs(secs):
+    """function for turning float secs into ints, unless some are missing, in which case they're a list with nans"""
+    sub_secs = secs.astype(np.int64)
+    if np.any(np.abs(sub_secs) == 9999):
+        sub_secs = [sec if abs(sec) != 9999 else np.nan for sec in sub_secs.tolist()]
+    return sub_secs
+
+
+def _dictionary_codes(columns):
+    """function for integer-coding several string columns through one small dictionary of their unique values"""
+    lengths = [len(column) for column in columns]
+    codes = np.unique(np.concatenate(columns), return_inverse=True)[1].reshape(-1).astype(np.int32)
+    return np.split(codes, np.cumsum(lengths)[:-1])
+
+
+def decode_numeric_sub_data(sub_data, num_fields, has_levels):
+    """function for decoding a numeric group_concat sub_data string into a float array, secs, and levels in bulk"""
+    row_length = num_fields + 2 if has_levels else num_fields + 1
+    fields, num_rows = _sub_data_fields(sub_data, row_length)
+    sub_levs = []
+    if has_levels:
+        sub_levs = np.asarray(fields[row_length - 1::row_length])
+        del fields[row_length - 1::row_length]
+    values = np.array(fields, dtype=np.float64).reshape(num_rows, num_fields + 1)
+
+    numpy_data = _missing_to_nan(np.ascontiguousarray(values[:, :num_fields]))
+    sub_secs = _decode_secs(values[:, num_fields])
+    return numpy_data, sub_secs, sub_levs
+
+
+def precalculated_sub_data(values, secs, levs):
+    """function for turning typed columns of precalculated stat values, secs, and levels into the same arrays that
+    decode_numeric_sub_data makes from a precalculated sub_data string, for queries that never build the string"""
+    numpy_data = np.full([len(values), 2], np.nan)
+    numpy_data[:, 0] = _missing_to_nan(np.array(values, dtype=np.float64))
+    sub_secs = _decode_secs(np.asarray(secs, dtype=np.int64))
+    sub_levs = np.asarray(levs)
+    return numpy_data, sub_secs, sub_levs
+
+
+def _ctc_counts(numpy_data):
+    """function for giving decoded ctc counts back their integer type, unless some are missing and have to stay nans"""
+    if np.isnan(numpy_data).any():
+        return numpy_data
+    return numpy_data.astype(np.int64)
+
+
+def decode_mode_single_sub_data(sub_data, has_levels):
+    """function for decoding a mode_single sub_data string into a table of typed values, secs, and levels. The
+    object ids and categories are integer-coded. It stays a 2d object array, because metcalcpy reads it by column."""
+    row_length = 9 if has_levels else 8
+    fields, num_rows = _sub_data_fields(sub_data, row_length)
+    numpy_data = np.empty([num_rows, len(MODE_SINGLE_COLUMN_HEADERS)], dtype=object)
+    numpy_data[:, 0], numpy_data[:, 1] = _dictionary_codes([np.asarray(fields[0::row_length]),
+                                                            np.asarray(fields[1::row_length])])
+    numpy_data[:, 2] = '2d'
+    # area, total, fcst_flag, simple_flag, and matched_flag
+    numpy_data[:, 3:] = _missing_to_nan(np.array([fields[field_idx::row_length] for field_idx in range(2, 7)],
+                                                 dtype=np.float64)).T
+    sub_secs = _decode_secs(np.array(fields[7::row_length], dtype=np.float64))
+    sub_levs = np.asarray(fields[8::row_length]) if has_levels else []
+    return numpy_data, sub_secs, sub_levs
+
+
+def decode_mode_pair_sub_data(sub_data, has_levels):
+    """function for decoding a mode_pair sub_data string into a structured array with one record per object pair,
+    plus secs and levels. Each pair's forecast object and observation object come in as separate sub_data, which
+    are put back together in order. Object ids, categories, and mode_header_ids are integer-coded."""
+    row_length = 12 if has_levels else 11
+    fields, num_rows = _sub_data_fields(sub_data, row_length)
+    columns = [np.asarray(fields[field_idx::row_length]) for field_idx in range(row_length)]
+    pair_ids = columns[1]
+    object_ids = columns[2]
+    # pair ids look like F001_O001. Make sure the object IDs match--the mysql join sometimes matches complex and
+    # simple objects when it isn't supposed to, because of the format of the names
+    f_ids, _, o_ids = np.char.partition(pair_ids, '_').T
+    o_ids = np.char.partition(o_ids, '_')[:, 0]
+    is_f = object_ids == f_ids
+    f_rows = np.flatnonzero(is_f)
+    o_rows = np.flatnonzero(~is_f & (object_ids == o_ids))
+    if len(f_rows) != len(o_rows):
+        raise ValueError("mode_pair sub_data has " + str(len(f_rows)) + " forecast objects but "
+                         + str(len(o_rows)) + " observation objects")
+
+    numpy_data = np.empty(len(f_rows), dtype=MODE_PAIR_DTYPE)
+    codes = _dictionary_codes([columns[0][f_rows], pair_ids[f_rows], object_ids[f_rows], object_ids[o_rows],
+                               columns[3][f_rows], columns[3][o_rows]])
+    for name, name_codes in zip(['mode_header_id', 'object_id', 'object_f_id', 'object_o_id', 'object_f_cat',
+                                 'object_o_cat'], codes):
+        numpy_data[name] = name_codes
+    numpy_data['object_type'] = '2d'
+    for name, field_idx, rows in [('interest', 4, f_rows), ('centroid_dist', 5, f_rows), ('f_area', 6, f_rows),
+                                  ('o_area', 6, o_rows), ('f_intensity_nn', 7, f_rows), ('o_intensity_nn', 7, o_rows),
+                                  ('f_centroid_lat', 8, f_rows), ('o_centroid_lat', 8, o_rows),
+                                  ('f_centroid_lon', 9, f_rows), ('o_centroid_lon', 9, o_rows), ('total', 10, f_rows)]:
+        numpy_data[name] = _missing_to_nan(columns[field_idx][rows].astype(np.float64))
+    sub_secs = _decode_secs(columns[10][f_rows].astype(np.float64))
+    sub_levs = columns[11][f_rows] if has_levels else []
+    return numpy_data, sub_secs, sub_levs
+
+
+def sub_data_array(sub_data, stat_line_type):
+    """function for turning a point's sub_data back into the kind of array it was decoded into, after it was made
+    into a list for the output"""
+    if stat_line_type == 'mode_pair':
+        return np.array([tuple(sub_datum) for sub_datum in sub_data], dtype=MODE_PAIR_DTYPE)
+    if stat_line_type == 'mode_single':
+        return np.array(sub_data, dtype=object).reshape(-1, len(MODE_SINGLE_COLUMN_HEADERS))
+    return np.asarray(sub_data)
+
+
+def decode_rows_sub_data(rows, num_fields, has_levels):
+    """function for decoding the sub_data of several rows in one batch. Returns the arrays and each row's number of
+    sub-values. Rows that came out of the query cache already have their arrays, so they're just put together."""
+    if len(rows) > 0 and all('decoded_sub_data' in row for row in rows):
+        decoded = [row['decoded_sub_data'] for row in rows]
+        numpy_data = np.concatenate([row_data[0] for row_data in decoded])
+        sub_secs = np.concatenate([row_data[1] for row_data in decoded])
+        sub_levs = np.concatenate([row_data[2] for row_data in decoded]) if has_levels else []
+        counts = np.asarray([len(row_data[1]) for row_data in decoded])
+        return numpy_data, sub_secs, sub_levs, counts
+    sub_data = [str(row['sub_data']) for row in rows]
+    numpy_data, sub_secs, sub_levs = decode_numeric_sub_data(','.join(sub_data), num_fields, has_levels)
+    counts = np.asarray([sub_datum.count(',') + 1 for sub_datum in sub_data])
+    return numpy_data, sub_secs, sub_levs, counts
+
+
 def get_stat(row, statistic, stat_line_type, app_params):
     """function for processing the sub-values from the query and calling a calculate_stat function"""
 
     has_levels = app_params["hasLevels"]
     agg_method = app_params["aggMethod"]
-    outlier_qc_param = "all" if app_params["outliers"] == "all" else int(app_params["outliers"])
+    outlier_qc_param = parse_outlier_qc_param(app_params["outliers"])
 
     # these are the sub-fields that are returned in the end
     stat = "null"
@@ -257,241 +542,41 @@ def get_stat(row, statistic, stat_line_type, app_params):
     sub_values = np.empty(0)
     error = ""
 
+    mode_interest = 0.70
+    if 'mode_pair' in stat_line_type:
+        mode_interest, error = read_mode_interest_param(app_params)
+        if mode_interest is None:
+            # a bad threshold means there's nothing to calculate, so stop now and return empty data objects
+            return np.nan, np.empty(0), np.empty(0), np.empty(0), np.empty(0), np.empty(0), error
+        mode_interest = mode_interest[0]
+
     try:
         # get all of the sub-values for each time
-        if stat_line_type == 'scalar':
-            sub_data = str(row['sub_data']).split(',')
-            # these are the sub-fields specific to scalar stats
-            sub_fbar = []
-            sub_obar = []
-            sub_ffbar = []
-            sub_oobar = []
-            sub_fobar = []
-            sub_total = []
-            for sub_datum in sub_data:
-                sub_datum = sub_datum.split(';')
-                sub_fbar.append(float(sub_datum[0]) if abs(float(sub_datum[0])) != 9999. else np.nan)
-                sub_obar.append(float(sub_datum[1]) if abs(float(sub_datum[1])) != 9999. else np.nan)
-                sub_ffbar.append(float(sub_datum[2]) if abs(float(sub_datum[2])) != 9999. else np.nan)
-                sub_oobar.append(float(sub_datum[3]) if abs(float(sub_datum[3])) != 9999. else np.nan)
-                sub_fobar.append(float(sub_datum[4]) if abs(float(sub_datum[4])) != 9999. else np.nan)
-                sub_total.append(int(sub_datum[5]) if abs(int(sub_datum[5])) != 9999 else np.nan)
-                sub_secs.append(int(sub_datum[6]) if abs(int(sub_datum[6])) != 9999 else np.nan)
-                if has_levels:
-                    sub_levs.append(sub_datum[7])
-
-            # calculate the scalar statistic
-            numpy_data = np.column_stack([sub_fbar, sub_obar, sub_ffbar, sub_oobar, sub_fobar, sub_total])
-            if "ACC" not in statistic:
-                column_headers = np.asarray(['fbar', 'obar', 'ffbar', 'oobar', 'fobar', 'total'])
-            else:
-                column_headers = np.asarray(['fabar', 'oabar', 'ffabar', 'ooabar', 'foabar', 'total'])
-
-        elif stat_line_type == 'vector':
-            sub_data = str(row['sub_data']).split(',')
-            # these are the sub-fields specific to vector stats
-            sub_ufbar = []
-            sub_vfbar = []
-            sub_uobar = []
-            sub_vobar = []
-            sub_uvfobar = []
-            sub_uvffbar = []
-            sub_uvoobar = []
-            sub_f_speed_bar = []
-            sub_o_speed_bar = []
-            sub_total = []
-            for sub_datum in sub_data:
-                sub_datum = sub_datum.split(';')
-                sub_ufbar.append(float(sub_datum[0]) if abs(float(sub_datum[0])) != 9999. else np.nan)
-                sub_vfbar.append(float(sub_datum[1]) if abs(float(sub_datum[1])) != 9999. else np.nan)
-                sub_uobar.append(float(sub_datum[2]) if abs(float(sub_datum[2])) != 9999. else np.nan)
-                sub_vobar.append(float(sub_datum[3]) if abs(float(sub_datum[3])) != 9999. else np.nan)
-                sub_uvfobar.append(float(sub_datum[4]) if abs(float(sub_datum[4])) != 9999. else np.nan)
-                sub_uvffbar.append(float(sub_datum[5]) if abs(float(sub_datum[5])) != 9999. else np.nan)
-                sub_uvoobar.append(float(sub_datum[6]) if abs(float(sub_datum[6])) != 9999. else np.nan)
-                if "ACC" not in statistic:
-                    sub_f_speed_bar.append(float(sub_datum[7]) if abs(float(sub_datum[7])) != 9999. else np.nan)
-                    sub_o_speed_bar.append(float(sub_datum[8]) if abs(float(sub_datum[8])) != 9999. else np.nan)
-                    sub_total.append(int(sub_datum[9]) if abs(int(sub_datum[9])) != 9999 else np.nan)
-                    sub_secs.append(int(sub_datum[10]) if abs(int(sub_datum[10])) != 9999 else np.nan)
-                    if has_levels:
-                        sub_levs.append(sub_datum[11])
-                else:
-                    sub_total.append(int(sub_datum[7]) if abs(int(sub_datum[7])) != 9999 else np.nan)
-                    sub_secs.append(int(sub_datum[8]) if abs(int(sub_datum[8])) != 9999 else np.nan)
-                    if has_levels:
-                        sub_levs.append(sub_datum[9])
-
-            # calculate the vector statistic
-            if "ACC" not in statistic:
-                numpy_data = np.column_stack(
-                    [sub_ufbar, sub_vfbar, sub_uobar, sub_vobar, sub_uvfobar, sub_uvffbar, sub_uvoobar,
-                     sub_f_speed_bar, sub_o_speed_bar, sub_total])
-                column_headers = np.asarray(
-                    ['ufbar', 'vfbar', 'uobar', 'vobar', 'uvfobar', 'uvffbar', 'uvoobar',
-                     'f_speed_bar', 'o_speed_bar', 'total'])
-            else:
-                numpy_data = np.column_stack(
-                    [sub_ufbar, sub_vfbar, sub_uobar, sub_vobar, sub_uvfobar, sub_uvffbar, sub_uvoobar, sub_total])
-                column_headers = np.asarray(
-                    ['ufabar', 'vfabar', 'uoabar', 'voabar', 'uvfoabar', 'uvffabar', 'uvooabar', 'total'])
-
-        elif stat_line_type == 'ctc':
-            sub_data = str(row['sub_data']).split(',')
-            # these are the sub-fields specific to ctc stats
-            sub_fy_oy = []
-            sub_fy_on = []
-            sub_fn_oy = []
-            sub_fn_on = []
-            sub_total = []
-            for sub_datum in sub_data:
-                sub_datum = sub_datum.split(';')
-                sub_fy_oy.append(int(sub_datum[0]) if abs(int(sub_datum[0])) != 9999 else np.nan)
-                sub_fy_on.append(int(sub_datum[1]) if abs(int(sub_datum[1])) != 9999 else np.nan)
-                sub_fn_oy.append(int(sub_datum[2]) if abs(int(sub_datum[2])) != 9999 else np.nan)
-                sub_fn_on.append(int(sub_datum[3]) if abs(int(sub_datum[3])) != 9999 else np.nan)
-                sub_total.append(int(sub_datum[4]) if abs(int(sub_datum[4])) != 9999 else np.nan)
-                sub_secs.append(int(sub_datum[5]) if abs(int(sub_datum[5])) != 9999 else np.nan)
-                if has_levels:
-                    sub_levs.append(sub_datum[6])
-
-            # calculate the ctc statistic
-            numpy_data = np.column_stack([sub_fy_oy, sub_fy_on, sub_fn_oy, sub_fn_on, sub_total])
-            column_headers = np.asarray(['fy_oy', 'fy_on', 'fn_oy', 'fn_on', 'total'])
-
-        elif stat_line_type == 'nbrcnt':
-            sub_data = str(row['sub_data']).split(',')
-            # these are the sub-fields specific to nbrcnt stats
-            sub_fss = []
-            sub_fbs = []
-            sub_total = []
-            for sub_datum in sub_data:
-                sub_datum = sub_datum.split(';')
-                sub_fss.append(float(sub_datum[0]) if abs(float(sub_datum[0])) != 9999. else np.nan)
-                sub_fbs.append(float(sub_datum[1]) if abs(float(sub_datum[1])) != 9999. else np.nan)
-                sub_total.append(int(sub_datum[2]) if abs(int(sub_datum[2])) != 9999 else np.nan)
-                sub_secs.append(int(sub_datum[3]) if abs(int(sub_datum[3])) != 9999 else np.nan)
-                if has_levels:
-                    sub_levs.append(sub_datum[4])
-
-            # calculate the nbrcnt statistic
-            numpy_data = np.column_stack([sub_fss, sub_fbs, sub_total])
-            column_headers = np.asarray(['fss', 'fbs', 'total'])
-
-        elif stat_line_type == 'mode_single':
-            sub_data = str(row['sub_data']).split(',')
+        if stat_line_type == 'mode_single':
             # these are the sub-fields specific to single-object mode stats
-            sub_obj_id = []
-            sub_obj_cat = []
-            sub_obj_type = []
-            sub_area = []
-            sub_total = []
-            sub_fcst_flag = []
-            sub_simple_flag = []
-            sub_matched_flag = []
-            for sub_datum in sub_data:
-                sub_datum = sub_datum.split(';')
-                sub_obj_id.append(sub_datum[0])
-                sub_obj_cat.append(sub_datum[1])
-                sub_obj_type.append('2d')
-                sub_area.append(float(sub_datum[2]) if abs(float(sub_datum[2])) != 9999. else np.nan)
-                sub_total.append(int(sub_datum[3]) if abs(int(sub_datum[3])) != 9999 else np.nan)
-                sub_fcst_flag.append(int(sub_datum[4]) if abs(int(sub_datum[4])) != 9999 else np.nan)
-                sub_simple_flag.append(int(sub_datum[5]) if abs(int(sub_datum[5])) != 9999 else np.nan)
-                sub_matched_flag.append(int(sub_datum[6]) if abs(int(sub_datum[6])) != 9999 else np.nan)
-                sub_secs.append(int(sub_datum[7]) if abs(int(sub_datum[7])) != 9999 else np.nan)
-                if has_levels:
-                    sub_levs.append(sub_datum[8])
-
-            # calculate the single-object mode statistic
-            numpy_data = np.column_stack([sub_obj_id, sub_obj_cat, sub_obj_type, sub_area, sub_total,
-                                          sub_fcst_flag, sub_simple_flag, sub_matched_flag])
-            column_headers = np.asarray(['object_id', 'object_cat', 'object_type', 'area', 'total',
-                                         'fcst_flag', 'simple_flag', 'matched_flag'])
+            numpy_data, sub_secs, sub_levs = decode_mode_single_sub_data(row['sub_data'], has_levels)
+            column_headers = np.asarray(MODE_SINGLE_COLUMN_HEADERS)
 
         elif 'mode_pair' in stat_line_type:
-            sub_data = str(row['sub_data']).split(',')
             # these are the sub-fields specific to paired-object mode stats
-            sub_mode_header_id = []
-            sub_obj_pair_id = []
-            sub_obj_f_id = []
-            sub_obj_o_id = []
-            sub_obj_f_cat = []
-            sub_obj_o_cat = []
-            sub_obj_type = []
-            sub_interest = []
-            sub_centroid_dist = []
-            sub_f_area = []
-            sub_o_area = []
-            sub_f_intensity_nn = []
-            sub_o_intensity_nn = []
-            sub_f_centroid_lat = []
-            sub_o_centroid_lat = []
-            sub_f_centroid_lon = []
-            sub_o_centroid_lon = []
-            sub_total = []
-            for sub_datum in sub_data:
-                sub_datum = sub_datum.split(';')
-                mode_header_id = sub_datum[0]
-                obj_pair_id = sub_datum[1]
-                obj_f_id = sub_datum[1].split('_')[0]
-                obj_o_id = sub_datum[1].split('_')[1]
-                if sub_datum[2] == obj_f_id:
-                    # make sure the f object IDs match--the mysql join sometimes matches complex and simple objects
-                    # when it isn't supposed to, because of the format of the names
-                    sub_mode_header_id.append(sub_datum[0])
-                    sub_obj_pair_id.append(sub_datum[1])
-                    sub_obj_type.append('2d')
-                    sub_interest.append(float(sub_datum[4]) if abs(float(sub_datum[4])) != 9999. else np.nan)
-                    sub_centroid_dist.append(float(sub_datum[5]) if abs(float(sub_datum[5])) != 9999. else np.nan)
-                    sub_total.append(int(sub_datum[10]) if abs(int(sub_datum[10])) != 9999 else np.nan)
-                    sub_secs.append(int(sub_datum[10]) if abs(int(sub_datum[10])) != 9999 else np.nan)
-                    if has_levels:
-                        sub_levs.append(sub_datum[11])
-                    sub_obj_f_id.append(sub_datum[2])
-                    sub_obj_f_cat.append(sub_datum[3])
-                    sub_f_area.append(float(sub_datum[6]) if abs(float(sub_datum[6])) != 9999. else np.nan)
-                    sub_f_intensity_nn.append(float(sub_datum[7]) if abs(float(sub_datum[7])) != 9999. else np.nan)
-                    sub_f_centroid_lat.append(float(sub_datum[8]) if abs(float(sub_datum[8])) != 9999. else np.nan)
-                    sub_f_centroid_lon.append(float(sub_datum[9]) if abs(float(sub_datum[9])) != 9999. else np.nan)
-                elif sub_datum[2] == obj_o_id:
-                    # make sure the o object IDs match--the mysql join sometimes matches complex and simple objects
-                    # when it isn't supposed to, because of the format of the names
-                    sub_obj_o_id.append(sub_datum[2])
-                    sub_obj_o_cat.append(sub_datum[3])
-                    sub_o_area.append(float(sub_datum[6]) if abs(float(sub_datum[6])) != 9999. else np.nan)
-                    sub_o_intensity_nn.append(float(sub_datum[7]) if abs(float(sub_datum[7])) != 9999. else np.nan)
-                    sub_o_centroid_lat.append(float(sub_datum[8]) if abs(float(sub_datum[8])) != 9999. else np.nan)
-                    sub_o_centroid_lon.append(float(sub_datum[9]) if abs(float(sub_datum[9])) != 9999. else np.nan)
-
-            # calculate the single-object mode statistic
-            numpy_data = np.column_stack([sub_mode_header_id, sub_obj_pair_id, sub_obj_f_id, sub_obj_o_id,
-                                          sub_obj_f_cat, sub_obj_o_cat, sub_obj_type, sub_interest, sub_centroid_dist,
-                                          sub_f_area, sub_o_area, sub_f_intensity_nn, sub_o_intensity_nn,
-                                          sub_f_centroid_lat, sub_o_centroid_lat, sub_f_centroid_lon,
-                                          sub_o_centroid_lon, sub_total])
-            column_headers = np.asarray(['mode_header_id', 'object_id', 'object_f_id', 'object_o_id', 'object_f_cat',
-                                         'object_o_cat', 'object_type', 'interest', 'centroid_dist', 'f_area', 'o_area',
-                                         'f_intensity_nn', 'o_intensity_nn', 'f_centroid_lat', 'o_centroid_lat',
-                                         'f_centroid_lon', 'o_centroid_lon', 'total'])
+            numpy_data, sub_secs, sub_levs = decode_mode_pair_sub_data(row['sub_data'], has_levels)
+            column_headers = np.asarray(MODE_PAIR_DTYPE.names)
 
         else:
-            sub_data = str(row['sub_data']).split(',')
-            # these are the sub-fields specific to precalculated stats
-            sub_values = []
-            sub_total = []
-            for sub_datum in sub_data:
-                sub_datum = sub_datum.split(';')
-                sub_values.append(float(sub_datum[0]) if abs(float(sub_datum[0])) != 9999. else np.nan)
-                sub_total.append(int(sub_datum[1]) if abs(int(sub_datum[1])) != 9999 else np.nan)
-                sub_secs.append(int(sub_datum[2]) if abs(int(sub_datum[2])) != 9999 else np.nan)
-                if has_levels:
-                    sub_levs.append(sub_datum[3])
-            numpy_data = np.column_stack([sub_values, sub_total])
-            column_headers = np.asarray(['precalc', 'total'])
+            # the numeric line types all decode the same way, they just have different columns
+            column_headers = numeric_column_headers(stat_line_type, statistic)
+            if 'decoded_sub_data' in row:
+                # this row came out of the query cache, so copy its arrays rather than changing the cached ones
+                numpy_data, sub_secs, sub_levs = [np.array(array) for array in row['decoded_sub_data']]
+                sub_levs = sub_levs if has_levels else []
+            else:
+                numpy_data, sub_secs, sub_levs = decode_numeric_sub_data(row['sub_data'], len(column_headers),
+                                                                         has_levels)
+            if stat_line_type == 'ctc':
+                numpy_data = _ctc_counts(numpy_data)
 
         sub_values, sub_secs, sub_levs, numpy_data, stat, stat_error = calculate_stat(statistic, stat_line_type, 
-                agg_method, outlier_qc_param, numpy_data, column_headers, sub_secs, sub_levs)
+                agg_method, outlier_qc_param, numpy_data, column_headers, sub_secs, sub_levs, mode_interest)
         if stat_error != '':
             error = stat_error
 
@@ -503,3 +588,513 @@ def get_stat(row, statistic, stat_line_type, app_params):
 
     # if we do have the data we expect, return the requested statistic
     return stat, sub_levs, sub_secs, sub_values, numpy_data, column_headers, error
+
+
+@lru_cache(maxsize=None)
+def _scalar_row_stat_switch():
+    """function for defining the scalar statistics that can be calculated for all sub-value rows at once"""
+    return {
+        'ACC': _row_anom_corr,
+        'RMSE': _row_rmse,
+        'Bias-corrected RMSE': _row_bcrmse,
+        'MSE': _row_mse,
+        'Bias-corrected MSE': _row_bcmse,
+        'ME (Additive bias)': _row_me,
+        'Fractional Error': _row_fe,
+        'Multiplicative bias': _row_mbias,
+        'N': _row_total,
+        'Forecast mean': _row_fbar,
+        'Observed mean': _row_obar,
+        'Forecast stdev': _row_fstdev,
+        'Observed stdev': _row_ostdev,
+        'Error stdev': _row_estdev,
+        'Pearson correlation': _row_pr_corr
+    }
+
+
+@lru_cache(maxsize=None)
+def _vector_row_stat_switch():
+    """function for defining the vector statistics that can be calculated for all sub-value rows at once"""
+    return {
+        'Vector ACC': _row_wind_corr,
+        'Forecast length of mean wind vector': _row_fbar_speed,
+        'Observed length of mean wind vector': _row_obar_speed,
+        'Forecast length - observed length of mean wind vector': _row_speed_err,
+        'abs(Forecast length - observed length of mean wind vector)': _row_speed_abserr,
+        'Length of forecast - observed mean wind vector': _row_vdiff_speed,
+        'Direction of forecast - observed mean wind vector': _row_vdiff_dir,
+        'Forecast direction of mean wind vector': _row_fdir,
+        'Observed direction of mean wind vector': _row_odir,
+        'Angle between mean forecast and mean observed wind vectors': _row_vdiff_dir,
+        'RMSE of forecast wind vector length': _row_fs_rms,
+        'RMSE of observed wind vector length': _row_os_rms,
+        'Vector wind speed MSVE': _row_msve,
+        'Vector wind speed RMSVE': _row_rmsve,
+        'Forecast mean of wind vector length': _row_f_speed_bar,
+        'Observed mean of wind vector length': _row_o_speed_bar,
+        'Forecast stdev of wind vector length': _row_f_speed_stdev,
+        'Observed stdev of wind vector length': _row_f_speed_stdev
+    }
+
+
+@lru_cache(maxsize=None)
+def _ctc_row_stat_switch():
+    """function for defining the ctc statistics that can be calculated for all sub-value rows at once"""
+    return {
+        'CSI (Critical Success Index)': _row_csi,
+        'FAR (False Alarm Ratio)': _row_far,
+        'FBIAS (Frequency Bias)': _row_fbias,
+        'GSS (Gilbert Skill Score)': _row_gss,
+        'HSS (Heidke Skill Score)': _row_hss,
+        'PODy (Probability of positive detection)': _row_pody,
+        'PODn (Probability of negative detection)': _row_podn,
+        'POFD (Probability of false detection)': _row_pofd
+    }
+
+
+@lru_cache(maxsize=None)
+def _nbrcnt_row_stat_switch():
+    """function for defining the nbrcnt statistics that can be calculated for all sub-value rows at once"""
+    return {
+        'FSS': _row_fss
+    }
+
+
+def _row_csi(c):
+    """function for calculating CSI for every sub-value row, the same way metcalcpy does for one row"""
+    return c['fy_oy'] / (c['fy_oy'] + c['fy_on'] + c['fn_oy'])
+
+
+def _row_far(c):
+    """function for calculating FAR for every sub-value row, the same way metcalcpy does for one row"""
+    return c['fy_on'] / (c['fy_oy'] + c['fy_on'])
+
+
+def _row_fbias(c):
+    """function for calculating FBIAS for every sub-value row, the same way metcalcpy does for one row"""
+    oy = c['fy_oy'] + c['fn_oy']
+    return np.where(oy == 0, np.nan, (c['fy_oy'] + c['fy_on']) / oy)
+
+
+def _row_gss(c):
+    """function for calculating GSS for every sub-value row, the same way metcalcpy does for one row"""
+    dbl_c = ((c['fy_oy'] + c['fy_on']) / c['total']) * (c['fy_oy'] + c['fn_oy'])
+    gss = (c['fy_oy'] - dbl_c) / (c['fy_oy'] + c['fy_on'] + c['fn_oy'] - dbl_c)
+    return np.where(c['total'] == 0, np.nan, gss)
+
+
+def _row_hss(c):
+    """function for calculating HSS for every sub-value row, the same way metcalcpy does for one row"""
+    dbl_c = ((c['fy_oy'] + c['fy_on']) / c['total']) * (c['fy_oy'] + c['fn_oy']) \
+        + ((c['fn_oy'] + c['fn_on']) / c['total']) * (c['fy_on'] + c['fn_on'])
+    hss = (c['fy_oy'] + c['fn_on'] - dbl_c) / (c['total'] - dbl_c)
+    return np.where(c['total'] == 0, np.nan, hss)
+
+
+def _row_pody(c):
+    """function for calculating PODy for every sub-value row, the same way metcalcpy does for one row"""
+    return c['fy_oy'] / (c['fy_oy'] + c['fn_oy'])
+
+
+def _row_podn(c):
+    """function for calculating PODn for every sub-value row, the same way metcalcpy does for one row"""
+    return c['fn_on'] / (c['fy_on'] + c['fn_on'])
+
+
+def _row_pofd(c):
+    """function for calculating POFD for every sub-value row, the same way metcalcpy does for one row"""
+    return c['fy_on'] / (c['fy_on'] + c['fn_on'])
+
+
+def _row_fss(c):
+    """function for calculating FSS for every sub-value row, the same way metcalcpy does for one row"""
+    return 1.0 - c['fbs'] / c['fss']
+
+
+def _round_half_up(values):
+    """function for rounding an array the same way metcalcpy rounds its results"""
+    multiplier = 10 ** _metcalcpy_module('utils').PRECISION
+    return np.floor(values * multiplier + 0.5) / multiplier
+
+
+def _row_fbar(c):
+    """function for calculating the forecast mean for every sub-value row, the same way metcalcpy does for one row"""
+    return c['fbar']
+
+
+def _row_obar(c):
+    """function for calculating the observed mean for every sub-value row, the same way metcalcpy does for one row"""
+    return c['obar']
+
+
+def _row_total(c):
+    """function for calculating N for every sub-value row, the same way metcalcpy does for one row"""
+    if np.any(np.isnan(c['total'])):
+        # metcalcpy sums a missing total to None, which it can't round, and raises
+        raise ValueError("missing N")
+    return c['total']
+
+
+def _row_me(c):
+    """function for calculating ME for every sub-value row, the same way metcalcpy does for one row"""
+    return c['fbar'] - c['obar']
+
+
+def _row_mse(c):
+    """function for calculating MSE for every sub-value row, the same way metcalcpy does for one row"""
+    return c['ffbar'] + c['oobar'] - 2 * c['fobar']
+
+
+def _row_rmse(c):
+    """function for calculating RMSE for every sub-value row, the same way metcalcpy does for one row"""
+    mse = _round_half_up(_row_mse(c))
+    if np.any(mse < 0):
+        # metcalcpy can't round the nan it gets from a negative MSE, and raises
+        raise ValueError("negative MSE")
+    return np.sqrt(mse)
+
+
+def _row_bcmse(c):
+    """function for calculating bias-corrected MSE for every sub-value row, the same way metcalcpy does for one row"""
+    return _round_half_up(_row_mse(c)) - _round_half_up(_row_me(c)) ** 2
+
+
+def _row_bcrmse(c):
+    """function for calculating bias-corrected RMSE for every sub-value row, the same way metcalcpy does for one row"""
+    bcmse = _round_half_up(_row_bcmse(c))
+    if np.any(bcmse < 0):
+        # metcalcpy can't round the nan it gets from a negative MSE, and raises
+        raise ValueError("negative bias-corrected MSE")
+    return np.sqrt(bcmse)
+
+
+def _row_fe(c):
+    """function for calculating fractional error for every sub-value row, the same way metcalcpy does for one row"""
+    return (c['fbar'] - c['obar']) / c['fbar']
+
+
+def _row_mbias(c):
+    """function for calculating multiplicative bias for every sub-value row, the same way metcalcpy does for one row"""
+    return np.where(c['obar'] == 0, np.nan, c['fbar'] / c['obar'])
+
+
+def _row_stddev(sum_total, sum_sq, n):
+    """function for calculating a standard deviation for every sub-value row, like metcalcpy's calculate_stddev"""
+    v = (sum_sq - sum_total * sum_total / n) / (n - 1)
+    return np.where((n < 1) | (v < 0), np.nan, np.sqrt(v))
+
+
+def _row_fstdev(c):
+    """function for calculating the forecast stdev for every sub-value row, the same way metcalcpy does for one row"""
+    return _row_stddev(c['fbar'] * c['total'], c['ffbar'] * c['total'], c['total'])
+
+
+def _row_ostdev(c):
+    """function for calculating the observed stdev for every sub-value row, the same way metcalcpy does for one row"""
+    return _row_stddev(c['obar'] * c['total'], c['oobar'] * c['total'], c['total'])
+
+
+def _row_estdev(c):
+    """function for calculating the error stdev for every sub-value row, the same way metcalcpy does for one row"""
+    me = _round_half_up(_row_me(c))
+    mse = _round_half_up(_row_mse(c))
+    sum_total = me * c['total']
+    sum_sq = mse * c['total']
+    # metcalcpy's warnings are off by the time it divides here, so a single-sample row gives it an inf or nan
+    # that it can't round, and raises
+    if np.any(np.isfinite(sum_total) & np.isfinite(sum_sq) & (c['total'] == 1)
+              & (sum_sq - sum_total * sum_total / c['total'] >= 0)):
+        raise ValueError("error stdev of a single sample")
+    return _row_stddev(sum_total, sum_sq, c['total'])
+
+
+def _row_pr_corr(c):
+    """function for calculating the Pearson correlation for every sub-value row, the same way metcalcpy does for one
+    row"""
+    total = c['total']
+    v = (total ** 2 * c['ffbar'] - total ** 2 * c['fbar'] ** 2) * (total ** 2 * c['oobar'] - total ** 2 * c['obar'] ** 2)
+    pr_corr = (total ** 2 * c['fobar'] - total ** 2 * c['fbar'] * c['obar']) / np.sqrt(v)
+    return np.where((v <= 0) | (pr_corr > 1), np.nan, pr_corr)
+
+
+def _row_anom_corr(c):
+    """function for calculating ACC for every sub-value row, the same way metcalcpy does for one row"""
+    v = (c['ffabar'] - c['fabar'] ** 2) * (c['ooabar'] - c['oabar'] ** 2)
+    anom_corr = (c['foabar'] - c['fabar'] * c['oabar']) / np.sqrt(v)
+    return np.where((v <= 0) | (anom_corr > 1), np.nan, anom_corr)
+
+
+def _row_wind_corr(c):
+    """function for calculating vector ACC for every sub-value row, the same way metcalcpy does for one row"""
+    return (c['uvfoabar'] - c['ufabar'] * c['uoabar'] - c['vfabar'] * c['voabar']) \
+        / (np.sqrt(c['uvffabar'] - c['ufabar'] * c['ufabar'] - c['vfabar'] * c['vfabar'])
+           * np.sqrt(c['uvooabar'] - c['uoabar'] * c['uoabar'] - c['voabar'] * c['voabar']))
+
+
+def _row_speed(u_comp, v_comp):
+    """function for calculating a wind speed for every sub-value row, like metcalcpy's calc_speed"""
+    return np.sqrt(u_comp * u_comp + v_comp * v_comp)
+
+
+def _row_direction(u_comp, v_comp):
+    """function for calculating a wind direction for every sub-value row, like metcalcpy's calc_direction"""
+    direction = np.arctan2(u_comp, v_comp)
+    direction = direction - 360 * np.floor(direction / 360)
+    tolerance = 1e-05
+    return np.where((np.abs(u_comp) < tolerance) & (np.abs(v_comp) < tolerance), np.nan, direction)
+
+
+def _row_fbar_speed(c):
+    """function for calculating the forecast mean wind vector length for every sub-value row, the same way
+    metcalcpy does for one row"""
+    return _row_speed(c['ufbar'], c['vfbar'])
+
+
+def _row_obar_speed(c):
+    """function for calculating the observed mean wind vector length for every sub-value row, the same way
+    metcalcpy does for one row"""
+    return _row_speed(c['uobar'], c['vobar'])
+
+
+def _row_speed_err(c):
+    """function for calculating the wind vector length error for every sub-value row, the same way metcalcpy
+    does for one row"""
+    return _round_half_up(_row_fbar_speed(c)) - _round_half_up(_row_obar_speed(c))
+
+
+def _row_speed_abserr(c):
+    """function for calculating the absolute wind vector length error for every sub-value row, the same way
+    metcalcpy does for one row"""
+    return np.abs(_round_half_up(_row_speed_err(c)))
+
+
+def _row_vdiff_speed(c):
+    """function for calculating the length of the mean wind vector difference for every sub-value row, the same way
+    metcalcpy does for one row"""
+    return _row_speed(c['ufbar'] - c['uobar'], c['vfbar'] - c['vobar'])
+
+
+def _row_vdiff_dir(c):
+    """function for calculating the direction of the mean wind vector difference for every sub-value row, the same
+    way metcalcpy does for one row"""
+    return _row_direction(-(c['ufbar'] - c['uobar']), -(c['vfbar'] - c['vobar']))
+
+
+def _row_fdir(c):
+    """function for calculating the forecast mean wind direction for every sub-value row, the same way metcalcpy
+    does for one row"""
+    return _row_direction(-c['ufbar'], -c['vfbar'])
+
+
+def _row_odir(c):
+    """function for calculating the observed mean wind direction for every sub-value row, the same way metcalcpy
+    does for one row"""
+    return _row_direction(-c['uobar'], -c['vobar'])
+
+
+def _row_fs_rms(c):
+    """function for calculating the forecast wind vector length RMSE for every sub-value row, the same way
+    metcalcpy does for one row"""
+    return np.sqrt(c['uvffbar'])
+
+
+def _row_os_rms(c):
+    """function for calculating the observed wind vector length RMSE for every sub-value row, the same way
+    metcalcpy does for one row"""
+    return np.sqrt(c['uvoobar'])
+
+
+def _row_msve(c):
+    """function for calculating the vector wind speed MSVE for every sub-value row, the same way metcalcpy does for
+    one row"""
+    msve = c['uvffbar'] - 2 * c['uvfobar'] + c['uvoobar']
+    return np.where(msve < 0, np.nan, msve)
+
+
+def _row_rmsve(c):
+    """function for calculating the vector wind speed RMSVE for every sub-value row, the same way metcalcpy does for
+    one row"""
+    return np.sqrt(_round_half_up(_row_msve(c)))
+
+
+def _row_f_speed_bar(c):
+    """function for calculating the forecast mean wind vector length for every sub-value row, the same way metcalcpy
+    does for one row"""
+    return c['f_speed_bar']
+
+
+def _row_o_speed_bar(c):
+    """function for calculating the observed mean wind vector length for every sub-value row, the same way metcalcpy
+    does for one row"""
+    return c['o_speed_bar']
+
+
+def _row_f_speed_stdev(c):
+    """function for calculating the forecast wind vector length stdev for every sub-value row, the same way
+    metcalcpy does for one row"""
+    return np.sqrt(_round_half_up(c['uvffbar'] - c['f_speed_bar'] * c['f_speed_bar']))
+
+
+def _row_stat_switch(stat_line_type):
+    """function for finding the row-at-once statistic kernels for a line type"""
+    if stat_line_type == 'scalar':
+        return _scalar_row_stat_switch()
+    elif stat_line_type == 'vector':
+        return _vector_row_stat_switch()
+    elif stat_line_type == 'ctc':
+        return _ctc_row_stat_switch()
+    elif stat_line_type == 'nbrcnt':
+        return _nbrcnt_row_stat_switch()
+    return {}
+
+
+def calculate_row_stats(statistic, stat_line_type, numpy_data, column_headers):
+    """function for calculating the statistic for every sub-value row at once, or None if there's no kernel for it"""
+    if stat_line_type == 'precalculated':
+        return numpy_data[:, 0].copy()
+    kernel = _row_stat_switch(stat_line_type).get(statistic)
+    if kernel is None:
+        return None
+    # adding zero turns -0.0 into 0.0, the same as the nansum metcalcpy reads every column with
+    columns = {name: numpy_data[:, col_idx] + 0. for name, col_idx in _column_indices(tuple(column_headers)).items()}
+    with np.errstate(all='ignore'):
+        sub_stats = np.asarray(kernel(columns), dtype=np.float64)
+        # metcalcpy returns None for any row that divides by zero or is missing data, which becomes a nan here
+        sub_stats[~np.isfinite(sub_stats)] = np.nan
+        return _round_half_up(sub_stats)
+
+
+@lru_cache(maxsize=None)
+def _column_indices(column_headers):
+    """function for finding where each sub_data column is, once per header layout"""
+    indices = {}
+    for col_idx, name in enumerate(column_headers):
+        # metcalcpy looks columns up with np.where, which finds the first one with a name
+        indices.setdefault(name, col_idx)
+    return indices
+
+
+def _segment_sums(values, starts, counts):
+    """function for summing each segment of a flat array, skipping nans like np.nansum"""
+    values = np.where(np.isnan(values), 0., values)
+    sums = np.zeros(len(starts))
+    non_empty = counts > 0
+    if np.any(non_empty):
+        sums[non_empty] = np.add.reduceat(values, starts[non_empty])
+    return sums
+
+
+def _segment_nanmeans(values, starts, counts):
+    """function for getting the nan-skipping mean of each segment of a flat array"""
+    valid = _segment_sums(np.where(np.isnan(values), 0., 1.), starts, counts)
+    with np.errstate(all='ignore'):
+        return _segment_sums(values, starts, counts) / valid
+
+
+def _segment_nanstds(values, starts, counts, segments):
+    """function for getting the nan-skipping standard deviation of each segment of a flat array"""
+    valid = _segment_sums(np.where(np.isnan(values), 0., 1.), starts, counts)
+    with np.errstate(all='ignore'):
+        means = _segment_sums(values, starts, counts) / valid
+        deviations = values - means[segments]
+        return np.sqrt(_segment_sums(deviations * deviations, starts, counts) / valid)
+
+
+def _segment_nanmedians(values, starts, counts, segments):
+    """function for getting the nan-skipping median of each segment of a flat array"""
+    # sort within each segment, which leaves the nans at the end of every segment
+    sorted_values = values[np.lexsort((values, segments))]
+    valid = _segment_sums(np.where(np.isnan(values), 0., 1.), starts, counts).astype(np.int64)
+    medians = np.full(len(starts), np.nan)
+    has_values = valid > 0
+    upper = sorted_values[(starts + valid // 2)[has_values]]
+    lower = sorted_values[(starts + (valid - 1) // 2)[has_values]]
+    medians[has_values] = np.where(valid[has_values] % 2 == 1, upper, (lower + upper) / 2)
+    return medians
+
+
+def get_curve_stats(rows, statistic, stat_line_type, app_params):
+    """function for calculating what get_stat returns for every row of a curve in one batch. Returns None
+    if the line type, statistic, or data need the row-by-row path instead."""
+    has_levels = app_params["hasLevels"]
+    agg_method = app_params["aggMethod"]
+    outlier_qc_param = parse_outlier_qc_param(app_params["outliers"])
+    if stat_line_type not in ['scalar', 'vector', 'ctc', 'nbrcnt', 'precalculated'] \
+            or statistic in ['rhist', 'phist', 'relp'] \
+            or (isinstance(outlier_qc_param, tuple) and outlier_qc_param[0] == 'percentile'):
+        # percentile clipping is left to the row-by-row path, which uses numpy's own percentiles
+        return None
+    stat_switch = _stat_switch(stat_line_type)
+    aggregate_only = agg_method in ["Mean statistic", "Median statistic", "Mean statistic weighted by N"]
+    if statistic not in stat_switch and not (stat_line_type == 'precalculated' and aggregate_only):
+        # calculate_stat reports these as errors row by row
+        return None
+    if len(rows) == 0:
+        return []
+
+    try:
+        # parse every row's sub_data at once, keeping track of where each row's sub-values start
+        column_headers = numeric_column_headers(stat_line_type, statistic)
+        numpy_data, sub_secs, sub_levs, counts = decode_rows_sub_data(rows, len(column_headers), has_levels)
+        if isinstance(sub_secs, list):
+            # there were missing secs, which only the row-by-row path knows how to pass through
+            return None
+        segments = np.repeat(np.arange(len(rows)), counts)
+
+        sub_stats = calculate_row_stats(statistic, stat_line_type, numpy_data, column_headers)
+        if sub_stats is None:
+            sub_stats = np.empty([numpy_data.shape[0]])
+            for idx in range(numpy_data.shape[0]):
+                sub_stats[idx] = stat_switch[statistic](numpy_data[[idx], :], column_headers)
+
+        # remove the sub-values that are too far from the rest of their point's sub-values
+        if outlier_qc_param != "all":
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            if isinstance(outlier_qc_param, tuple):
+                medians = _segment_nanmedians(sub_stats, starts, counts, segments)
+                deviations = np.abs(sub_stats - medians[segments])
+                mads = _segment_nanmedians(deviations, starts, counts, segments)
+                keep = ~((deviations > outlier_qc_param[1] * 1.4826 * mads[segments]) & (mads[segments] > 0))
+            else:
+                means = _segment_nanmeans(sub_stats, starts, counts)
+                sd_limits = outlier_qc_param * _segment_nanstds(sub_stats, starts, counts, segments)
+                keep = ~(np.abs(sub_stats - means[segments]) > sd_limits[segments])
+            sub_stats = sub_stats[keep]
+            sub_secs = sub_secs[keep]
+            sub_levs = sub_levs[keep] if has_levels else sub_levs
+            numpy_data = numpy_data[keep]
+            segments = segments[keep]
+            counts = np.bincount(segments, minlength=len(rows))
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        ends = starts + counts
+
+        # calculate the statistic for every point
+        total_index = np.where(column_headers == 'total')[0]
+        if agg_method == "Mean statistic":
+            stats = _segment_nanmeans(sub_stats, starts, counts)
+        elif agg_method == "Median statistic":
+            stats = _segment_nanmedians(sub_stats, starts, counts, segments)
+        elif agg_method == "Mean statistic weighted by N":
+            totals = numpy_data[:, total_index[0]]
+            point_totals = _segment_sums(totals, starts, counts)
+            with np.errstate(all='ignore'):
+                stats = _segment_sums(sub_stats * (totals / point_totals[segments]), starts, counts)
+        else:
+            # METcalcpy is weird about how it calculates totals. This gets what we want here.
+            numpy_data[:, total_index] = 1
+            stats = []
+            for start, end in zip(starts, ends):
+                if stat_line_type == 'ctc':
+                    stats.append(stat_switch[statistic](numpy_data[start:end], column_headers))
+                else:
+                    stats.append(stat_switch[statistic](numpy_data[start:end], column_headers, True))
+    except ValueError:
+        # let the row-by-row path decide what to report
+        return None
+
+    # each row's ctc counts get their integer type back on their own, since only some rows might be missing counts
+    row_data = [_ctc_counts(numpy_data[start:end]) if stat_line_type == 'ctc' else numpy_data[start:end]
+                for start, end in zip(starts, ends)]
+    return [(stats[row_idx], sub_levs[start:end] if has_levels else [], sub_secs[start:end], sub_stats[start:end],
+             row_data[row_idx], column_headers, "")
+            for row_idx, (start, end) in enumerate(zip(starts, ends))]
@@ -0,0 +1,156 @@
+"""
+Compact columnar output for the MATS query utilities.
+
+Instead of one big JSON document, the output is a short JSON header followed by typed arrays:
+
+    8 bytes      magic, b"MATSCOL1"
+    4 bytes      little-endian uint32 length of the JSON header
+    n bytes      JSON header, padded with spaces so that the body starts on an 8 byte boundary
+    the rest     body of little-endian typed arrays, each starting on an 8 byte boundary
+
+Every per-point nested field of a curve (subVals, subSecs, subLevs, subHit, subInterest, ...) is pulled
+out of the header and stored as one flat array of values plus an int32 array of point offsets, so that
+point i's values are values[offsets[i]:offsets[i + 1]]. Points with the 'NaN' placeholder instead of a
+list are flagged in a uint8 missing mask and come back as a real NaN. String fields (subLevs) are
+dictionary-encoded as int32 codes into a list kept in the header. Everything else, including the
+per-point scalars in x, y, etc., stays in the header as regular JSON.
+"""
+import json
+import os
+import sys
+import numpy as np
+
+MAGIC = b"MATSCOL1"
+ALIGNMENT = 8
+
+
+def _pad_length(length):
+    """function for finding how many bytes are needed to get to the next aligned offset"""
+    return (ALIGNMENT - length % ALIGNMENT) % ALIGNMENT
+
+
+def _flatten_nested_field(entries):
+    """function for flattening one per-point field, or returning None if it isn't a nested list field"""
+    if not isinstance(entries, list) or len(entries) == 0:
+        return None
+    flat = []
+    offsets = [0]
+    missing = []
+    has_list = False
+    for entry in entries:
+        if isinstance(entry, (list, tuple, np.ndarray)):
+            flat.extend(entry)
+            has_list = True
+            missing.append(0)
+        elif isinstance(entry, str) and entry == 'NaN':
+            missing.append(1)
+        else:
+            return None
+        offsets.append(len(flat))
+    if not has_list:
+        return None
+    return flat, offsets, missing
+
+
+def _encode_values(flat):
+    """function for turning flattened values into a typed array, plus a level dictionary for strings"""
+    kinds = np.array(flat)
+    if kinds.dtype.kind == 'U' and 'NaN' in kinds:
+        # numeric values with 'NaN' placeholders mixed in can be sent as floats with real NaNs
+        numeric = np.array([np.nan if isinstance(value, str) and value == 'NaN' else value for value in flat])
+        if numeric.dtype.kind in 'iuf':
+            kinds = numeric
+    if kinds.ndim != 1:
+        return None, None
+    if kinds.dtype.kind in 'iu' and (len(kinds) == 0 or (kinds.min() >= np.iinfo(np.int32).min
+                                                         and kinds.max() <= np.iinfo(np.int32).max)):
+        return kinds.astype('<i4'), None
+    if kinds.dtype.kind in 'iuf':
+        return kinds.astype('<f8'), None
+    if kinds.dtype.kind == 'U':
+        # use the original values as the dictionary, since numpy turns mixed ints and strings into strings
+        lookup = {}
+        codes = np.array([lookup.setdefault(value, len(lookup)) for value in flat], dtype='<i4')
+        return codes, list(lookup.keys())
+    return None, None
+
+
+def encode_columnar_output(output, json_encoder=None):
+    """function for encoding the query utilities' output dictionary as a columnar payload"""
+    columns = []
+    arrays = []
+    body_length = 0
+    header_data = []
+    for curve_idx, curve in enumerate(output["data"]):
+        header_curve = {}
+        for field, entries in curve.items():
+            flattened = _flatten_nested_field(entries)
+            values = None
+            if flattened is not None:
+                flat, offsets, missing = flattened
+                values, dictionary = _encode_values(flat)
+            if values is None:
+                header_curve[field] = entries
+                continue
+            column = {"curve": curve_idx, "field": field, "dtype": values.dtype.str[1:], "points": len(missing),
+                      "length": len(values)}
+            if dictionary is not None:
+                column["dictionary"] = dictionary
+            for part, array in (("values", values), ("offsets", np.array(offsets, dtype='<i4')),
+                                ("missing", np.array(missing, dtype='u1'))):
+                column[part + "Offset"] = body_length
+                arrays.append(array.tobytes())
+                body_length += array.nbytes
+                padding = _pad_length(array.nbytes)
+                if padding > 0:
+                    arrays.append(bytes(padding))
+                    body_length += padding
+            columns.append(column)
+        header_data.append(header_curve)
+
+    header = {key: value for key, value in output.items() if key != "data"}
+    header["data"] = header_data
+    header["columns"] = columns
+    header_bytes = json.dumps(header, cls=json_encoder).encode('utf-8')
+    header_bytes += b' ' * _pad_length(len(MAGIC) + 4 + len(header_bytes))
+    return b''.join([MAGIC, np.uint32(len(header_bytes)).astype('<u4').tobytes(), header_bytes] + arrays)
+
+
+def write_columnar_output(payload, output_path=None):
+    """function for writing a columnar payload to a file, or to stdout if no file was given"""
+    if output_path is None:
+        sys.stdout.flush()
+        sys.stdout.buffer.write(payload)
+        sys.stdout.buffer.flush()
+        return
+    # write to a temporary name first, so that a reader never sees a partial payload
+    temp_path = output_path + ".part"
+    with open(temp_path, 'wb') as output_file:
+        output_file.write(payload)
+    os.replace(temp_path, output_path)
+
+
+def decode_columnar_output(payload):
+    """function for reading a columnar payload back into the same dictionary the JSON output gives"""
+    if payload[:len(MAGIC)] != MAGIC:
+        raise ValueError("not a MATS columnar payload")
+    header_length = int(np.frombuffer(payload, dtype='<u4', count=1, offset=len(MAGIC))[0])
+    body_start = len(MAGIC) + 4 + header_length
+    output = json.loads(payload[len(MAGIC) + 4:body_start].decode('utf-8'))
+    for column in output.pop("columns"):
+        points = column["points"]
+        values = np.frombuffer(payload, dtype='<' + column["dtype"], count=column["length"],
+                               offset=body_start + column["valuesOffset"])
+        offsets = np.frombuffer(payload, dtype='<i4', count=points + 1, offset=body_start + column["offsetsOffset"])
+        missing = np.frombuffer(payload, dtype='u1', count=points, offset=body_start + column["missingOffset"])
+        dictionary = column.get("dictionary")
+        entries = []
+        for point in range(points):
+            if missing[point]:
+                entries.append(float('nan'))
+            elif dictionary is not None:
+                entries.append([dictionary[code] for code in values[offsets[point]:offsets[point + 1]]])
+            else:
+                entries.append(values[offsets[point]:offsets[point + 1]].tolist())
+        output["data"][column["curve"]][column["field"]] = entries
+    return output
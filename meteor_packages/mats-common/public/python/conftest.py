@@ -0,0 +1,8 @@
+"""
+pytest setup for the python query tools. They import each other by module name, the way they're run from this
+directory, so the tests get this directory on their path wherever pytest is started from.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
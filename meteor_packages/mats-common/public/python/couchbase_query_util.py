@@ -9,11 +9,26 @@ import numpy as np
 import math
 import json
 import copy
+import operator
+from array import array
 from contextlib import closing
 from parse_query_data import parse_query_data_xy_curve, \
     parse_query_data_histogram, parse_query_data_ensemble, \
         parse_query_data_ensemble_histogram, parse_query_data_contour, \
             parse_query_data_simple_scatter, do_matching
+from columnar_output import encode_columnar_output, write_columnar_output
+from calc_stats import precalculated_sub_data
+
+# the database's missing-value sentinel, which calc_stats decodes as a nan
+MISSING_VALUE = 9999.
+
+# the arithmetic a two-field stat_field can ask for
+STAT_FIELD_OPERATORS = {
+    "minus": operator.sub,
+    "plus": operator.add,
+    "times": operator.mul,
+    "divided by": operator.truediv
+}
 
 class NpEncoder(json.JSONEncoder):
     """class that hopefully allows JSON to encode numpy types"""
@@ -32,6 +47,8 @@ class CBQueryUtil:
     nTimes = []  # one of the four fields to return at the end -- number of sub_secs for each independent variable
     data = []  # one of the four fields to return at the end -- the parsed data structure
     output_JSON = {}  # JSON structure to pass the five output fields back to the MATS JS
+    output_format = "json"  # "json", or "columnar" for the typed-array payload in columnar_output.py
+    output_columnar = b''  # columnar payload to pass the output fields back to the MATS JS
 
     def set_up_output_fields(self, number_of_curves):
         """function for creating an output object for each curve"""
@@ -174,7 +191,20 @@ class CBQueryUtil:
             "nTimes": self.nTimes,
             "error": self.error
         }
-        self.output_JSON = json.dumps(self.output_JSON, cls=NpEncoder)
+        if self.output_format == "columnar":
+            self.output_columnar = encode_columnar_output(self.output_JSON, NpEncoder)
+            self.output_JSON = {}
+        else:
+            self.output_JSON = json.dumps(self.output_JSON, cls=NpEncoder)
+
+    def write_output(self, output_path=None):
+        """function for sending the output to stdout, or for a columnar payload, to a file if one was given"""
+        if self.output_format != "columnar":
+            print(self.output_JSON)
+            return
+        write_columnar_output(self.output_columnar, output_path)
+        if output_path is not None:
+            print(json.dumps({"outputPath": output_path}))
 
 
     def get_date_array(self, idx, cluster, options, line_type, database, date_variable, from_secs, to_secs, vts):
@@ -222,6 +252,30 @@ class CBQueryUtil:
         return these_doc_IDs
 
 
+    @staticmethod
+    def new_sub_data_columns():
+        """function for making empty typed columns to collect a point's sub-values, secs, and levels in"""
+        return {"values": array('d'), "secs": array('q'), "levs": []}
+
+    @staticmethod
+    def append_sub_datum(columns, value, secs, lev):
+        """function for adding one sub-value to a point's columns. A null value goes in as the missing-value
+        sentinel, which the decoding turns into a nan."""
+        columns["values"].append(MISSING_VALUE if value is None else value)
+        columns["secs"].append(int(secs))
+        columns["levs"].append(lev)
+
+    @staticmethod
+    def attach_sub_data_columns(parsed_row, columns):
+        """function for giving a parsed row the decoded arrays of its columns, in place of a sub_data string"""
+        numpy_data, sub_secs, sub_levs = precalculated_sub_data(columns["values"], columns["secs"], columns["levs"])
+        unique_secs = np.unique(sub_secs)
+        parsed_row["nTimes"] = len(unique_secs)
+        parsed_row["min_secs"] = int(unique_secs[0])
+        parsed_row["max_secs"] = int(unique_secs[-1])
+        parsed_row["stat"] = 0  # dummy value, change from null to number to show that we do have a result, though
+        parsed_row["decoded_sub_data"] = (numpy_data, sub_secs, sub_levs)
+
     def query_db(self, cluster, options):
         """function for querying the database and sending the returned data to the parser"""
         idx = 0
@@ -238,9 +292,10 @@ class CBQueryUtil:
             to_secs = query["toSecs"]
             vts = query["vts"].replace("'", "").split(",")
             fcsts = query["fcsts"]
-            levels = query["levels"]
+            levels = set(query["levels"])
             versions = query["versions"]
             storms = query["storms"]
+            stat_operator = STAT_FIELD_OPERATORS.get(stat_field[2]) if isinstance(stat_field, list) else None
 
             date_array = self.get_date_array(idx, cluster, options, line_type, database, date_variable, from_secs, to_secs, vts)
             doc_IDs = self.get_doc_IDs(doc_ID_template, versions, date_array, storms)
@@ -267,9 +322,7 @@ class CBQueryUtil:
                             "nTimes": 0,
                             "min_secs": sys.float_info.max,
                             "max_secs": sys.float_info.min,
-                            "stat": "null",
-                            "sub_data": "",
-                            "sub_secs": set()
+                            "stat": "null"
                         }
                         parsed_rows.append(row_bits)
                 elif plot_type == 'Threshold':
@@ -279,67 +332,48 @@ class CBQueryUtil:
                 else:
                     ind_var = 'avtime'
 
+                # dieoffs have one set of columns per forecast, everything else has one per row
+                dieoff_columns = [self.new_sub_data_columns() for forecast in fcsts] if plot_type == "Dieoff" else []
                 for row in rows:
                     if plot_type != "Dieoff":
                         parsed_row = {
                             "nTimes": 0,
                             "min_secs": sys.float_info.max,
                             "max_secs": sys.float_info.min,
-                            "stat": "null",
-                            "sub_data": np.nan,
+                            "stat": "null"
                         }
                         parsed_row[ind_var] = row[ind_var]
-                        sub_data = ""
-                        sub_secs = set()
+                        columns = self.new_sub_data_columns()
                     for datum in row["data"]:
-                        didx = 0
-                        for forecast in fcsts:
-                            if forecast in datum[2] and datum[2][forecast]["level"] in levels:
-                                data_snippet = ""
-                                if isinstance(stat_field, list) and stat_field[0] in datum[2][forecast] and stat_field[1] in datum[2][forecast]:
-                                    if stat_field[2] == "minus":
-                                        data_snippet = str(datum[2][forecast][stat_field[0]] - datum[2][forecast][stat_field[1]]) + ";9999;" + str(datum[0]) + ";" + datum[1]
-                                    elif stat_field[2] == "plus":
-                                        data_snippet = str(datum[2][forecast][stat_field[0]] + datum[2][forecast][stat_field[1]]) + ";9999;" + str(datum[0]) + ";" + datum[1]
-                                    elif stat_field[2] == "times":
-                                        data_snippet = str(datum[2][forecast][stat_field[0]] * datum[2][forecast][stat_field[1]]) + ";9999;" + str(datum[0]) + ";" + datum[1]
-                                    elif stat_field[2] == "divided by":
-                                        data_snippet = str(datum[2][forecast][stat_field[0]] / datum[2][forecast][stat_field[1]]) + ";9999;" + str(datum[0]) + ";" + datum[1]
-                                elif not isinstance(stat_field, list) and stat_field in datum[2][forecast]:
-                                    data_snippet = str(datum[2][forecast][stat_field]) + ";9999;" + str(datum[0]) + ";" + datum[1]
-                                if len(data_snippet):
-                                    if plot_type == "Dieoff":
-                                        if len(parsed_rows[didx]["sub_data"]):
-                                            parsed_rows[didx]["sub_data"] = parsed_rows[didx]["sub_data"] + "," + data_snippet
-                                        else:
-                                            parsed_rows[didx]["sub_data"] = data_snippet
-                                        parsed_rows[didx]["sub_secs"].add(int(datum[0]))
-                                    else:
-                                        if len(sub_data):
-                                            sub_data = sub_data + "," + data_snippet
-                                        else:
-                                            sub_data = data_snippet
-                                        sub_secs.add(int(datum[0]))
-                            didx = didx + 1
-                    if plot_type != "Dieoff":
-                        if len(sub_data):
-                            parsed_row["nTimes"] = len(sub_secs)
-                            parsed_row["min_secs"] = min(sub_secs)
-                            parsed_row["max_secs"] = max(sub_secs)
-                            parsed_row["stat"] = 0 # dummy value, change from null to number to show that we do have a result, though
-                            parsed_row["sub_data"] = sub_data
-                            parsed_rows.append(parsed_row)
+                        for didx, forecast in enumerate(fcsts):
+                            forecast_data = datum[2].get(forecast)
+                            if forecast_data is None or forecast_data["level"] not in levels:
+                                continue
+                            if stat_operator is not None:
+                                if stat_field[0] not in forecast_data or stat_field[1] not in forecast_data:
+                                    continue
+                                first_value = forecast_data[stat_field[0]]
+                                second_value = forecast_data[stat_field[1]]
+                                value = None if first_value is None or second_value is None \
+                                    else stat_operator(first_value, second_value)
+                            elif isinstance(stat_field, list) or stat_field not in forecast_data:
+                                continue
+                            else:
+                                value = forecast_data[stat_field]
+                            self.append_sub_datum(dieoff_columns[didx] if plot_type == "Dieoff" else columns,
+                                                  value, datum[0], datum[1])
+                    if plot_type != "Dieoff" and len(columns["values"]):
+                        self.attach_sub_data_columns(parsed_row, columns)
+                        parsed_rows.append(parsed_row)
 
                 if plot_type == "Dieoff":
-                    for parsed_row in parsed_rows:
-                        if len(parsed_row["sub_data"]):
-                            parsed_row["nTimes"] = len(parsed_row["sub_secs"])
-                            parsed_row["min_secs"] = min(parsed_row["sub_secs"])
-                            parsed_row["max_secs"] = max(parsed_row["sub_secs"])
-                            parsed_row["stat"] = 0 # dummy value, change from null to number to show that we do have a result, though
-                        else:
-                            parsed_rows.remove(parsed_row)
-                
+                    for parsed_row, columns in zip(parsed_rows, dieoff_columns):
+                        if len(columns["values"]):
+                            self.attach_sub_data_columns(parsed_row, columns)
+                    # only keep the forecasts that had data
+                    parsed_rows = [parsed_row for parsed_row, columns in zip(parsed_rows, dieoff_columns)
+                                   if len(columns["values"])]
+
                 if len(parsed_rows):
                     if plot_type == 'Histogram':
                         return_obj = parse_query_data_histogram(idx, parsed_rows, query["statLineType"], query["statistic"],
@@ -376,7 +410,8 @@ class CBQueryUtil:
 
     def get_options(self, args):
         """process 'c' style options - using getopt - usage describes options"""
-        usage = ["(h)ost=", "(u)ser=", "(p)assword=", "(b)ucket=", "(s)cope=", "(c)ollection=", "(q)uery_array="]
+        usage = ["(h)ost=", "(u)ser=", "(p)assword=", "(b)ucket=", "(s)cope=", "(c)ollection=", "(q)uery_array=",
+                 "(f)ormat=", "(o)utput="]
         host = None
         user = None
         password = None
@@ -384,9 +419,11 @@ class CBQueryUtil:
         scope = None
         collection = None
         query_array = None
+        output_format = "json"
+        output_path = None
 
         try:
-            opts, args = getopt.getopt(args[1:], "h:u:p:b:s:c:q:", usage)
+            opts, args = getopt.getopt(args[1:], "h:u:p:b:s:c:q:f:o:", usage)
         except getopt.GetoptError as err:
             # print help information and exit:
             print(str(err))  # will print something like "option -a not recognized"
@@ -410,6 +447,14 @@ class CBQueryUtil:
                 collection = a
             elif o == "-q":
                 query_array = json.loads(a)
+            elif o == "-f":
+                if a not in ("json", "columnar"):
+                    print("unknown output format " + a)
+                    print(usage)
+                    sys.exit(2)
+                output_format = a
+            elif o == "-o":
+                output_path = a
             else:
                 assert False, "unhandled option"
         # make sure none were left out...
@@ -423,7 +468,9 @@ class CBQueryUtil:
             "bucket": bucket,
             "scope": scope,
             "collection": collection,
-            "query_array": query_array
+            "query_array": query_array,
+            "output_format": output_format,
+            "output_path": output_path
         }
         return options
 
@@ -448,5 +495,6 @@ if __name__ == '__main__':
         cbqutil.error = return_obj["error"]
         cbqutil.n0 = return_obj["n0"]
         cbqutil.nTimes = return_obj["nTimes"]
+    cbqutil.output_format = options["output_format"]
     cbqutil.construct_output_json(options["query_array"][0]["appParams"]["plotType"], options["query_array"])
-    print(cbqutil.output_JSON)
+    cbqutil.write_output(options["output_path"])
@@ -0,0 +1,78 @@
+"""
+Developer tool for measuring how long the python entry points take to start up. Each measurement runs in a
+fresh interpreter, so nothing is already imported. Besides the plain imports, it times loading the
+statistic functions for each line type, which is when the metcalcpy modules get imported.
+
+usage: python import_benchmark.py [-r repeats] [-o output_file]
+"""
+import getopt
+import json
+import subprocess
+import sys
+import time
+import os
+
+ENTRY_POINTS = ['mysql_query_util', 'couchbase_query_util', 'python_ctc_error', 'parse_query_data', 'calc_stats']
+LINE_TYPES = ['precalculated', 'ctc', 'nbrcnt', 'scalar', 'vector', 'ecnt', 'mode_single', 'mode_pair']
+
+TIMER = """
+import sys, time
+sys.path.insert(0, {script_dir!r})
+start = time.perf_counter()
+{statement}
+print(time.perf_counter() - start)
+"""
+
+
+def time_statement(statement, repeats):
+    """function for timing a statement in fresh interpreters, returning the best time or the error it raised"""
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    times = []
+    for _ in range(repeats):
+        result = subprocess.run([sys.executable, '-c', TIMER.format(script_dir=script_dir, statement=statement)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return None, result.stderr.strip().splitlines()[-1]
+        times.append(float(result.stdout.strip().splitlines()[-1]))
+    return min(times), ""
+
+
+def run_benchmark(repeats):
+    """function for timing every entry point import, and the cold start of every line type"""
+    records = []
+    for entry_point in ENTRY_POINTS:
+        seconds, error = time_statement('import ' + entry_point, repeats)
+        records.append({"name": "import " + entry_point, "seconds": seconds, "error": error})
+    for line_type in LINE_TYPES:
+        statement = 'import mysql_query_util\nimport calc_stats\ncalc_stats._stat_switch(' + repr(line_type) + ')'
+        seconds, error = time_statement(statement, repeats)
+        records.append({"name": "cold start " + line_type, "seconds": seconds, "error": error})
+    return records
+
+
+if __name__ == '__main__':
+    usage = ["(r)epeats=", "(o)utput="]
+    repeats = 3
+    output_file = None
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "r:o:", usage)
+    except getopt.GetoptError as err:
+        print(str(err))
+        print(usage)
+        sys.exit(2)
+    for o, a in opts:
+        if o == "-r":
+            repeats = max(1, int(a))
+        elif o == "-o":
+            output_file = a
+    records = run_benchmark(repeats)
+    for record in records:
+        if record["seconds"] is None:
+            print("%-32s failed: %s" % (record["name"], record["error"]))
+        else:
+            print("%-32s %8.3f s" % (record["name"], record["seconds"]))
+    if output_file is not None:
+        # keep a history, so that start-up regressions are easy to spot
+        with open(output_file, 'a') as history:
+            history.write(json.dumps({"time": time.time(), "python": sys.version.split()[0],
+                                      "repeats": repeats, "records": records}) + "\n")
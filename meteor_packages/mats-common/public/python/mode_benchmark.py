@@ -0,0 +1,105 @@
+"""
+Developer tool for measuring how long the paired-object MODE statistics take on large synthetic object sets.
+Every mode_header_id gets the same number of forecast and observation objects, and every forecast object is
+paired with every observation object, so the number of pairs grows with the square of the objects per header.
+Besides decoding the sub_data and each statistic on its own, it times OTS and MCD back to back on the same
+point, which is where the greedy matching is shared.
+
+usage: python mode_benchmark.py [-p pairs] [-n objects_per_header] [-r repeats] [-o output_file]
+"""
+import getopt
+import json
+import sys
+import time
+import numpy as np
+
+import mode_stats
+from calc_stats import decode_mode_pair_sub_data, MODE_PAIR_DTYPE
+
+COLUMN_HEADERS = np.asarray(MODE_PAIR_DTYPE.names)
+
+STATISTICS = [
+    ('OTS', [mode_stats.calculate_ots]),
+    ('MCD', [mode_stats.calculate_mcd]),
+    ('OTS + MCD', [mode_stats.calculate_ots, mode_stats.calculate_mcd]),
+    ('MMI', [mode_stats.calculate_mmi]),
+    ('CSI', [mode_stats.calculate_mode_csi]),
+    ('OFB', [mode_stats.calculate_ofb]),
+]
+
+
+def make_sub_data(n_pairs, n_objects, seed=0):
+    """function for making a synthetic mode_pair sub_data string with at least n_pairs pairs"""
+    rng = np.random.default_rng(seed)
+    n_headers = max(1, -(-n_pairs // (n_objects * n_objects)))
+    sub_data = []
+    for header in range(n_headers):
+        for f_object in range(1, n_objects + 1):
+            for o_object in range(1, n_objects + 1):
+                pair = [str(header + 1000), 'F%03d_O%03d' % (f_object, o_object)]
+                shared = [str(round(rng.random(), 4)), str(round(rng.random() * 100, 2))]
+                sub_data.append(';'.join(pair + ['F%03d' % f_object, 'CF%03d' % f_object] + shared +
+                                         [str(rng.integers(1, 1000)), '0.5', '40.1', '-105.2', '1600000000']))
+                sub_data.append(';'.join(pair + ['O%03d' % o_object, 'CO%03d' % o_object] + shared +
+                                         [str(rng.integers(1, 1000)), '0.5', '40.3', '-105.0', '1600000000']))
+    return ','.join(sub_data)
+
+
+def time_statistics(functions, numpy_data, repeats):
+    """function for timing a set of statistics on the same point, returning the best time"""
+    times = []
+    for _ in range(repeats):
+        # start cold every time, since a real point's pairs haven't been matched yet
+        mode_stats._cached_greedy_matches.cache_clear()
+        start = time.perf_counter()
+        for function in functions:
+            function(numpy_data, COLUMN_HEADERS)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def run_benchmark(n_pairs, n_objects, repeats):
+    """function for timing the decoding and every paired-object statistic on a synthetic point"""
+    sub_data = make_sub_data(n_pairs, n_objects)
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        numpy_data = decode_mode_pair_sub_data(sub_data, False)[0]
+        times.append(time.perf_counter() - start)
+    records = [{"name": "decode", "pairs": numpy_data.shape[0], "objects": n_objects, "seconds": min(times)}]
+    for name, functions in STATISTICS:
+        records.append({"name": name, "pairs": numpy_data.shape[0], "objects": n_objects,
+                        "seconds": time_statistics(functions, numpy_data, repeats)})
+    return records
+
+
+if __name__ == '__main__':
+    usage = ["(p)airs=", "(n)objects=", "(r)epeats=", "(o)utput="]
+    n_pairs = 10000
+    n_objects = 100
+    repeats = 3
+    output_file = None
+    try:
+        opts, args = getopt.getopt(sys.argv[1:], "p:n:r:o:", usage)
+    except getopt.GetoptError as err:
+        print(str(err))
+        print(usage)
+        sys.exit(2)
+    for o, a in opts:
+        if o == "-p":
+            n_pairs = max(1, int(a))
+        elif o == "-n":
+            n_objects = max(1, int(a))
+        elif o == "-r":
+            repeats = max(1, int(a))
+        elif o == "-o":
+            output_file = a
+    records = run_benchmark(n_pairs, n_objects, repeats)
+    for record in records:
+        print("%-16s %8d pairs %6d objects %8.3f s" % (record["name"], record["pairs"], record["objects"],
+                                                       record["seconds"]))
+    if output_file is not None:
+        # keep a history, so that regressions are easy to spot
+        with open(output_file, 'a') as history:
+            history.write(json.dumps({"time": time.time(), "python": sys.version.split()[0],
+                                      "repeats": repeats, "records": records}) + "\n")
@@ -1,48 +1,94 @@
+from functools import lru_cache
 import numpy as np
 
 
+def _object_indices(header_codes, n_headers, sub_ids):
+    """helper function for MODE calculations"""
+    # number the objects within each mode_header_id
+    id_codes = np.unique(sub_ids, return_inverse=True)[1].reshape(-1)
+    n_ids = int(id_codes.max()) + 1
+    unique_objects, object_codes = np.unique(header_codes * n_ids + id_codes, return_inverse=True)
+    object_headers = unique_objects // n_ids
+    n_objects = np.bincount(object_headers, minlength=n_headers)
+    object_index = np.arange(len(unique_objects)) - (np.cumsum(n_objects) - n_objects)[object_headers]
+    return object_index[object_codes.reshape(-1)], object_index, object_headers, n_objects
+
+
 def _get_interest2d(sub_interest, sub_mode_header_id, sub_pair_fid, sub_pair_oid):
     """helper function for MODE calculations"""
     # set up 2-dimensional interest arrays for calculating MODE stats
-    # need a separate 2d array for each mode_header_id
-    unique_mode_headers = list(set(sub_mode_header_id))
-    mode_header_lookup = {}
-    mode_index_lookup = {}
-    interest_2d_arrays = {}
-    for unique_header in unique_mode_headers:
-        mode_header_lookup[str(unique_header)] = {
-            "lookup_f_index": 0,
-            "lookup_o_index": 0
-        }
-    for i in range(0, len(sub_interest)):
-        # create indices for different mode_header_ids
-        this_mode_header_id = str(sub_mode_header_id[i])
-        if this_mode_header_id not in mode_index_lookup.keys():
-            mode_index_lookup[this_mode_header_id] = {}
-        this_fid = sub_pair_fid[i]
-        this_oid = sub_pair_oid[i]
-        if this_fid not in mode_index_lookup[this_mode_header_id].keys():
-            mode_index_lookup[this_mode_header_id][this_fid] = \
-                mode_header_lookup[this_mode_header_id]["lookup_f_index"]
-            mode_header_lookup[this_mode_header_id]["lookup_f_index"] = \
-                mode_header_lookup[this_mode_header_id]["lookup_f_index"] + 1
-        if this_oid not in mode_index_lookup[this_mode_header_id].keys():
-            mode_index_lookup[this_mode_header_id][this_oid] = \
-                mode_header_lookup[this_mode_header_id]["lookup_o_index"]
-            mode_header_lookup[this_mode_header_id]["lookup_o_index"] = \
-                mode_header_lookup[this_mode_header_id]["lookup_o_index"] + 1
-    for unique_header in unique_mode_headers:
-        this_mode_header_id = str(unique_header)
-        interest_2d_arrays[this_mode_header_id] = \
-            np.zeros((mode_header_lookup[this_mode_header_id]["lookup_f_index"],
-                      mode_header_lookup[this_mode_header_id]["lookup_o_index"]), dtype=np.float)
-    for i in range(0, len(sub_interest)):
-        this_mode_header_id = str(sub_mode_header_id[i])
-        this_fid = sub_pair_fid[i]
-        this_oid = sub_pair_oid[i]
-        interest_2d_arrays[this_mode_header_id][mode_index_lookup[this_mode_header_id][this_fid],
-                                                mode_index_lookup[this_mode_header_id][this_oid]] = sub_interest[i]
-    return interest_2d_arrays, mode_header_lookup
+    # need a separate 2d array for each mode_header_id, so they're laid end to end in one flat array,
+    # once row by row and once column by column, so that every row or column reduction is a single reduceat
+    unique_headers, header_codes = np.unique(sub_mode_header_id, return_inverse=True)
+    header_codes = header_codes.reshape(-1)
+    pair_f_index, f_index, f_headers, n_f = _object_indices(header_codes, len(unique_headers), sub_pair_fid)
+    pair_o_index, o_index, o_headers, n_o = _object_indices(header_codes, len(unique_headers), sub_pair_oid)
+    block_starts = np.concatenate(([0], np.cumsum(n_f * n_o)))
+
+    # when a pair shows up more than once, the last one wins
+    row_positions = block_starts[header_codes] + pair_f_index * n_o[header_codes] + pair_o_index
+    column_positions = block_starts[header_codes] + pair_o_index * n_f[header_codes] + pair_f_index
+    last_pairs = len(row_positions) - 1 - np.unique(row_positions[::-1], return_index=True)[1]
+    interest_rows = np.zeros(block_starts[-1], dtype=np.float64)
+    interest_rows[row_positions[last_pairs]] = sub_interest[last_pairs]
+    interest_columns = np.zeros(block_starts[-1], dtype=np.float64)
+    interest_columns[column_positions[last_pairs]] = sub_interest[last_pairs]
+
+    # where each forecast object's row and each observation object's column starts
+    row_starts = block_starts[f_headers] + f_index * n_o[f_headers]
+    column_starts = block_starts[o_headers] + o_index * n_f[o_headers]
+    return interest_rows, row_starts, interest_columns, column_starts
+
+
+def _greedy_matches(sub_interest, sub_mode_header_id, sub_pair_fid, sub_pair_oid):
+    """helper function for MODE calculations. Returns the indices of the pairs that get matched, in the order
+    they were matched. The same point's pairs are usually matched again for each MODE stat requested, so
+    the matches are cached on the pairs' contents."""
+    return _cached_greedy_matches(sub_interest.tobytes(), sub_mode_header_id.dtype.str, sub_mode_header_id.tobytes(),
+                                  sub_pair_fid.dtype.str, sub_pair_fid.tobytes(),
+                                  sub_pair_oid.dtype.str, sub_pair_oid.tobytes())
+
+
+@lru_cache(maxsize=32)
+def _cached_greedy_matches(interest_bytes, header_dtype, header_bytes, fid_dtype, fid_bytes, oid_dtype, oid_bytes):
+    """helper function for MODE calculations"""
+    sub_interest = np.frombuffer(interest_bytes, dtype=np.float64)
+    header_codes = np.unique(np.frombuffer(header_bytes, dtype=header_dtype), return_inverse=True)[1].reshape(-1)
+    # number every forecast and observation object, so that being matched is a flag rather than a list search.
+    # objects are only the same within a mode_header_id.
+    f_objects = np.unique(np.frombuffer(fid_bytes, dtype=fid_dtype), return_inverse=True)[1].reshape(-1)
+    f_objects = np.unique(header_codes * (int(f_objects.max()) + 1) + f_objects, return_inverse=True)[1].reshape(-1)
+    o_objects = np.unique(np.frombuffer(oid_bytes, dtype=oid_dtype), return_inverse=True)[1].reshape(-1)
+    o_objects = np.unique(header_codes * (int(o_objects.max()) + 1) + o_objects, return_inverse=True)[1].reshape(-1)
+    # once every header has run out of forecast or observation objects, nothing else can match
+    n_f = np.bincount(header_codes[np.unique(f_objects, return_index=True)[1]])
+    n_o = np.bincount(header_codes[np.unique(o_objects, return_index=True)[1]], minlength=len(n_f))
+    max_matches = int(np.minimum(n_f, n_o).sum())
+
+    # Sort the pair_interest array but keep that sorted interest linked with the pair object IDs
+    # reverse the indices array so that it goes descending from maximum
+    indices = np.argsort(sub_interest)[::-1]
+    f_matched = bytearray(int(f_objects.max()) + 1)
+    o_matched = bytearray(int(o_objects.max()) + 1)
+    matches = []
+    for pair, f_object, o_object in zip(indices.tolist(), f_objects[indices].tolist(), o_objects[indices].tolist()):
+        if not f_matched[f_object] and not o_matched[o_object]:
+            f_matched[f_object] = 1
+            o_matched[o_object] = 1
+            matches.append(pair)
+            if len(matches) == max_matches:
+                break
+    matches = np.asarray(matches, dtype=np.int64)
+    # the cached array is shared, so nothing may change it
+    matches.flags.writeable = False
+    return matches
+
+
+def _mode_interest2d(numpy_data):
+    """helper function for MODE calculations"""
+    # mode_pair sub_data is a structured array, with the ids already integer-coded
+    return _get_interest2d(numpy_data['interest'], numpy_data['mode_header_id'], numpy_data['object_f_id'],
+                           numpy_data['object_o_id'])
 
 
 def _gc_dist(lon1, lat1, lon2, lat2):
@@ -58,130 +104,90 @@ def _gc_dist(lon1, lat1, lon2, lat2):
     return distance
 
 
-def _calculate_mode_ctc(statistic, numpy_data, column_headers):
-    """function for calculating contingency table stats from MET MODE output"""
+def _mode_ctc_counts(numpy_data, column_headers, thresholds):
+    """helper function for MODE calculations"""
+    interest_rows, row_starts, interest_columns, column_starts = _mode_interest2d(numpy_data)
+    # an object matches at a threshold if its best interest does, so every threshold only needs the maxima.
+    # fmax skips nans, which never match anything.
+    max_rows = np.fmax.reduceat(interest_rows, row_starts)
+    max_columns = np.fmax.reduceat(interest_columns, column_starts)
+    thresholds = np.asarray(thresholds, dtype=np.float64).reshape(-1, 1)
+
+    # Populate contingency table for matched objects, one row per threshold
+    # an observation object is a hit if any forecast object matches it, and a miss otherwise
+    n_hit = np.count_nonzero(max_columns >= thresholds, axis=1)
+    n_miss = len(column_starts) - n_hit
+    # If no observation object matches a forecast object, then the forecast object is a false alarm
+    n_fa = len(row_starts) - np.count_nonzero(max_rows > thresholds, axis=1)
+    return n_hit, n_miss, n_fa
+
+
+def _mode_ctc_stats(statistic, n_hit, n_miss, n_fa):
+    """helper function for MODE calculations"""
+    if statistic == "CSI (Critical Success Index)":
+        numerators, denominators = n_hit, n_hit + n_fa + n_miss
+    elif statistic == "PODy (Probability of positive detection)":
+        numerators, denominators = n_hit, n_hit + n_miss
+    elif statistic == "FAR (False Alarm Ratio)":
+        numerators, denominators = n_fa, n_hit + n_fa
+    else:
+        return ['null'] * len(n_hit)
+    return [int(numerator) / int(denominator) if denominator > 0 else 'null'
+            for numerator, denominator in zip(numerators, denominators)]
+
+
+def _calculate_mode_ctc(statistic, numpy_data, column_headers, match_int=0.70):
+    """function for calculating contingency table stats from MET MODE output. match_int is the interest
+    threshold, 0.70 by default like in METplus MODE, or a list of thresholds to get a list of stats back."""
     error = ""
+    thresholds = np.atleast_1d(match_int)
     try:
-        interest_idx = np.where(column_headers == 'interest')[0]
-        pair_fid_idx = np.where(column_headers == 'object_f_id')[0]
-        pair_oid_idx = np.where(column_headers == 'object_o_id')[0]
-        mode_header_id_idx = np.where(column_headers == 'mode_header_id')[0]
-
         if numpy_data.shape[0] > 0:
-            interest_2d_arrays, mode_header_lookup = _get_interest2d(numpy_data[:, interest_idx].flatten().astype(float),
-                                                                     numpy_data[:, mode_header_id_idx].flatten(),
-                                                                     numpy_data[:, pair_fid_idx].flatten(),
-                                                                     numpy_data[:, pair_oid_idx].flatten())
-            # Populate contingency table for matched objects
-            n_hit = 0
-            n_miss = 0
-            n_fa = 0
-            match_int = 0.70  # default interest threshold in METplus MODE
-            for key in interest_2d_arrays:
-                interest_2d = interest_2d_arrays[key]
-                max_f_index = mode_header_lookup[key]["lookup_f_index"]
-                max_o_index = mode_header_lookup[key]["lookup_o_index"]
-                for o in range(0, max_o_index):
-                    found_hit = False
-                    for f in range(0, max_f_index):
-                        # hit
-                        if interest_2d[f, o] >= match_int:
-                            n_hit += 1
-                            found_hit = True
-                            break  # stop looking for other forecast objects that match to this observation one
-                    if not found_hit:  # if we made it all the way through the f-loop without getting a hit, count a miss
-                        n_miss += 1
-                # Now search through the forecast objects to see if there were any false alarms
-                for f in range(0, max_f_index):
-                    found_hit = False
-                    for o in range(0, max_o_index):
-                        if interest_2d[f, o] > match_int:
-                            found_hit = True
-                            break
-                    # If, after searching through all observation objects, we didn't get a match,
-                    # then the forecast object is a false alarm
-                    if not found_hit:
-                        n_fa += 1
-
-            if statistic == "CSI (Critical Success Index)":
-                if n_hit + n_miss + n_fa > 0:
-                    ctc = n_hit / (n_hit + n_fa + n_miss)
-                else:
-                    ctc = 'null'
-            elif statistic == "PODy (Probability of positive detection)":
-                if n_hit + n_miss > 0:
-                    ctc = n_hit / (n_hit + n_miss)
-                else:
-                    ctc = 'null'
-            elif statistic == "FAR (False Alarm Ratio)":
-                if n_hit + n_fa > 0:
-                    ctc = n_fa / (n_hit + n_fa)
-                else:
-                    ctc = 'null'
-            else:
-                ctc = 'null'
+            ctc = _mode_ctc_stats(statistic, *_mode_ctc_counts(numpy_data, column_headers, thresholds))
         else:
-            ctc = 'null'
+            ctc = ['null'] * len(thresholds)
     except TypeError as e:
         error = "Error calculating ctc: " + str(e)
-        ctc = 'null'
+        ctc = ['null'] * len(thresholds)
     except ValueError as e:
         error = "Error calculating ctc: " + str(e)
-        ctc = 'null'
+        ctc = ['null'] * len(thresholds)
+    if np.ndim(match_int) == 0:
+        ctc = ctc[0]
     return ctc, error
 
 
+def calculate_mode_ctc_sweep(numpy_data, column_headers, thresholds):
+    """function for calculating MODE CSI, PODy, and FAR at every one of a list of interest thresholds at once"""
+    statistics = ["CSI (Critical Success Index)", "PODy (Probability of positive detection)",
+                  "FAR (False Alarm Ratio)"]
+    try:
+        if numpy_data.shape[0] > 0:
+            counts = _mode_ctc_counts(numpy_data, column_headers, thresholds)
+            return {statistic: _mode_ctc_stats(statistic, *counts) for statistic in statistics}
+    except TypeError:
+        pass
+    except ValueError:
+        pass
+    return {statistic: ['null'] * len(thresholds) for statistic in statistics}
+
+
 def calculate_ots(numpy_data, column_headers):
     """function for calculating object threat score from MET MODE output"""
     error = ""
     try:
-        interest_idx = np.where(column_headers == 'interest')[0]
-        pair_fid_idx = np.where(column_headers == 'object_f_id')[0]
-        pair_oid_idx = np.where(column_headers == 'object_o_id')[0]
-        mode_header_id_idx = np.where(column_headers == 'mode_header_id')[0]
-        f_area_idx = np.where(column_headers == 'f_area')[0]
-        o_area_idx = np.where(column_headers == 'o_area')[0]
-
-        sub_interest = numpy_data[:, interest_idx].flatten().astype(float)
-        sub_pair_fid = numpy_data[:, pair_fid_idx].flatten()
-        sub_pair_oid = numpy_data[:, pair_oid_idx].flatten()
-        sub_mode_header_id = numpy_data[:, mode_header_id_idx].flatten()
-        sub_f_area = numpy_data[:, f_area_idx].flatten().astype(float)
-        sub_o_area = numpy_data[:, o_area_idx].flatten().astype(float)
-
-        ots_sum = 0.0
+        sub_interest = numpy_data['interest']
+        sub_pair_fid = numpy_data['object_f_id']
+        sub_pair_oid = numpy_data['object_o_id']
+        sub_mode_header_id = numpy_data['mode_header_id']
+        sub_f_area = numpy_data['f_area']
+        sub_o_area = numpy_data['o_area']
+
         if len(sub_pair_fid) > 0 and len(sub_pair_oid) > 0:
-            # Sort the pair_interest array but keep that sorted interest linked with the pair object IDs
-            indices = np.argsort(sub_interest)
-            # reverse the indices array so that it goes descending from maximum
-            indices = indices[::-1]
-            sorted_int = sub_interest[indices]
-            sorted_fid = sub_pair_fid[indices]
-            sorted_oid = sub_pair_oid[indices]
-            sorted_mode_header = sub_mode_header_id[indices]
-            sorted_f_area = sub_f_area[indices]
-            sorted_o_area = sub_o_area[indices]
-            matched_fid = {}
-            matched_oid = {}
-            all_f_areas = []
-            all_o_areas = []
-            for i in range(0, len(sub_interest)):
-                this_mode_header_id = str(sorted_mode_header[i])
-                this_fid = sorted_fid[i]
-                this_oid = sorted_oid[i]
-                f_area = sorted_f_area[i]
-                o_area = sorted_o_area[i]
-                if this_mode_header_id not in matched_fid.keys():
-                    matched_fid[this_mode_header_id] = []
-                    matched_oid[this_mode_header_id] = []
-                if (this_fid not in matched_fid[this_mode_header_id]) and (
-                        this_oid not in matched_oid[this_mode_header_id]):
-                    ots_sum += sorted_int[i] * (f_area + o_area)
-                    matched_fid[this_mode_header_id].append(this_fid)
-                    matched_oid[this_mode_header_id].append(this_oid)
-                    all_f_areas.append(f_area)
-                    all_o_areas.append(o_area)
-            ots = ots_sum / (sum(all_f_areas) + sum(all_o_areas))
+            matches = _greedy_matches(sub_interest, sub_mode_header_id, sub_pair_fid, sub_pair_oid)
+            # add up in match order, the same as a running sum would
+            ots_sum = np.add.accumulate(sub_interest[matches] * (sub_f_area[matches] + sub_o_area[matches]))[-1]
+            ots = ots_sum / (np.add.accumulate(sub_f_area[matches])[-1] + np.add.accumulate(sub_o_area[matches])[-1])
         else:
             ots = 'null'
     except TypeError as e:
@@ -197,22 +203,12 @@ def calculate_mmi(numpy_data, column_headers):
     """function for calculating median of maximum interest from MET MODE output"""
     error = ""
     try:
-        interest_idx = np.where(column_headers == 'interest')[0]
-        pair_fid_idx = np.where(column_headers == 'object_f_id')[0]
-        pair_oid_idx = np.where(column_headers == 'object_o_id')[0]
-        mode_header_id_idx = np.where(column_headers == 'mode_header_id')[0]
-
         if numpy_data.shape[0] > 0:
-            interest_2d_arrays, mode_header_lookup = _get_interest2d(numpy_data[:, interest_idx].flatten().astype(float),
-                                                                     numpy_data[:, mode_header_id_idx].flatten(),
-                                                                     numpy_data[:, pair_fid_idx].flatten(),
-                                                                     numpy_data[:, pair_oid_idx].flatten())
-            max_int_array = np.empty(0, dtype=np.float)
-            for key in interest_2d_arrays:
-                interest_2d = interest_2d_arrays[key]
-                max_int = np.amax(interest_2d, axis=1)
-                max_interest = np.append(max_int, np.amax(interest_2d, axis=0))
-                max_int_array = np.append(max_int_array, max_interest)
+            interest_rows, row_starts, interest_columns, column_starts = \
+                _mode_interest2d(numpy_data)
+            # the maximum interest of every forecast object and every observation object
+            max_int_array = np.concatenate((np.maximum.reduceat(interest_rows, row_starts),
+                                            np.maximum.reduceat(interest_columns, column_starts)))
             mmi = np.median(max_int_array)
         else:
             mmi = 'null'
@@ -229,22 +225,12 @@ def calculate_ofb(numpy_data, column_headers):
     """function for calculating object frequency bias from MET MODE output"""
     error = ""
     try:
-        interest_idx = np.where(column_headers == 'interest')[0]
-        pair_fid_idx = np.where(column_headers == 'object_f_id')[0]
-        pair_oid_idx = np.where(column_headers == 'object_o_id')[0]
-        mode_header_id_idx = np.where(column_headers == 'mode_header_id')[0]
-
         if numpy_data.shape[0] > 0:
-            interest_2d_arrays, mode_header_lookup = _get_interest2d(numpy_data[:, interest_idx].flatten().astype(float),
-                                                                     numpy_data[:, mode_header_id_idx].flatten(),
-                                                                     numpy_data[:, pair_fid_idx].flatten(),
-                                                                     numpy_data[:, pair_oid_idx].flatten())
+            interest_rows, row_starts, interest_columns, column_starts = \
+                _mode_interest2d(numpy_data)
             # Sum the numbers of forecast and observed objects
-            n_f = 0
-            n_o = 0
-            for key in mode_header_lookup:
-                n_f = n_f + mode_header_lookup[key]["lookup_f_index"]
-                n_o = n_o + mode_header_lookup[key]["lookup_o_index"]
+            n_f = len(row_starts)
+            n_o = len(column_starts)
             ofb = n_f / n_o
         else:
             ofb = 'null'
@@ -260,47 +246,18 @@ def calculate_ofb(numpy_data, column_headers):
 def calculate_mcd(numpy_data, column_headers):
     """function for calculating mean centroid distance from MET MODE output"""
     error = ""
-    total_error_array = []
     try:
-        interest_idx = np.where(column_headers == 'interest')[0]
-        pair_fid_idx = np.where(column_headers == 'object_f_id')[0]
-        pair_oid_idx = np.where(column_headers == 'object_o_id')[0]
-        mode_header_id_idx = np.where(column_headers == 'mode_header_id')[0]
-        cent_dist_idx = np.where(column_headers == 'centroid_dist')[0]
-
-        sub_interest = numpy_data[:, interest_idx].flatten().astype(float)
-        sub_pair_fid = numpy_data[:, pair_fid_idx].flatten()
-        sub_pair_oid = numpy_data[:, pair_oid_idx].flatten()
-        sub_mode_header_id = numpy_data[:, mode_header_id_idx].flatten()
-        sub_cent_dist = numpy_data[:, cent_dist_idx].flatten().astype(float)
+        sub_interest = numpy_data['interest']
+        sub_pair_fid = numpy_data['object_f_id']
+        sub_pair_oid = numpy_data['object_o_id']
+        sub_mode_header_id = numpy_data['mode_header_id']
+        sub_cent_dist = numpy_data['centroid_dist']
 
         if len(sub_pair_fid) > 0 and len(sub_pair_oid) > 0:
             # Mean distance calculated in a general sense using the same method as for OTS
             # this method does not require object "matches"
-            # Sort the pair_interest array but keep that sorted interest linked with the pair object IDs
-            indices = np.argsort(sub_interest)
-            # reverse the indices array so that it goes descending from maximum
-            indices = indices[::-1]
-            sorted_fid = sub_pair_fid[indices]
-            sorted_oid = sub_pair_oid[indices]
-            sorted_mode_header = sub_mode_header_id[indices]
-            sorted_cent_dist = sub_cent_dist[indices]
-
-            matched_fid = {}
-            matched_oid = {}
-            for i in range(0, len(sub_interest)):
-                this_mode_header_id = str(sorted_mode_header[i])
-                this_fid = sorted_fid[i]
-                this_oid = sorted_oid[i]
-                this_cent_dist = sorted_cent_dist[i]
-                if this_mode_header_id not in matched_fid.keys():
-                    matched_fid[this_mode_header_id] = []
-                    matched_oid[this_mode_header_id] = []
-                if (this_fid not in matched_fid[this_mode_header_id]) and (this_oid not in matched_oid[this_mode_header_id]):
-                    matched_fid[this_mode_header_id].append(this_fid)
-                    matched_oid[this_mode_header_id].append(this_oid)
-                    total_error_array.append(float(this_cent_dist))
-            mcd = sum(total_error_array) / len(total_error_array)
+            matches = _greedy_matches(sub_interest, sub_mode_header_id, sub_pair_fid, sub_pair_oid)
+            mcd = float(np.add.accumulate(sub_cent_dist[matches])[-1]) / len(matches)
         else:
             mcd = 'null'
     except TypeError as e:
@@ -312,10 +269,10 @@ def calculate_mcd(numpy_data, column_headers):
     return mcd
 
 
-def calculate_mode_csi(numpy_data, column_headers):
+def calculate_mode_csi(numpy_data, column_headers, match_int=0.70):
     """function for calculating CSI from MET MODE output"""
     try:
-        csi, error = _calculate_mode_ctc("CSI (Critical Success Index)", numpy_data, column_headers)
+        csi, error = _calculate_mode_ctc("CSI (Critical Success Index)", numpy_data, column_headers, match_int)
     except TypeError as e:
         error = "Error calculating mode csi: " + str(e)
         csi = 'null'
@@ -325,10 +282,10 @@ def calculate_mode_csi(numpy_data, column_headers):
     return csi
 
 
-def calculate_mode_far(numpy_data, column_headers):
+def calculate_mode_far(numpy_data, column_headers, match_int=0.70):
     """function for calculating FAR from MET MODE output"""
     try:
-        far, error = _calculate_mode_ctc("FAR (False Alarm Ratio)", numpy_data, column_headers)
+        far, error = _calculate_mode_ctc("FAR (False Alarm Ratio)", numpy_data, column_headers, match_int)
     except TypeError as e:
         error = "Error calculating mode far: " + str(e)
         far = 'null'
@@ -338,10 +295,11 @@ def calculate_mode_far(numpy_data, column_headers):
     return far
 
 
-def calculate_mode_pody(numpy_data, column_headers):
+def calculate_mode_pody(numpy_data, column_headers, match_int=0.70):
     """function for calculating PODy from MET MODE output"""
     try:
-        pody, error = _calculate_mode_ctc("PODy (Probability of positive detection)", numpy_data, column_headers)
+        pody, error = _calculate_mode_ctc("PODy (Probability of positive detection)", numpy_data, column_headers,
+                                          match_int)
     except TypeError as e:
         error = "Error calculating mode pody: " + str(e)
         pody = 'null'
@@ -1,15 +1,32 @@
 import getopt
+import os
 import sys
+import socketserver
 import pymysql
 import pymysql.cursors
 import numpy as np
 import json
-import copy
+import queue
+import threading
+from bisect import bisect_left
+from calc_stats import numeric_column_headers, resolve_statistics, read_mode_interest_param, sub_data_array
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from contextlib import closing
 from parse_query_data import parse_query_data_xy_curve, \
     parse_query_data_histogram, parse_query_data_ensemble, \
         parse_query_data_ensemble_histogram, parse_query_data_contour, \
-            parse_query_data_simple_scatter, do_matching
+            parse_query_data_simple_scatter, do_matching, reduce_streamed_row, \
+                decode_query_rows, attach_decoded_sub_data
+from columnar_output import encode_columnar_output, write_columnar_output
+from mode_stats import calculate_mode_ctc_sweep
+from query_cache import QueryCache
+
+# plot types whose parsers can use rows that were reduced to their statistics as they streamed in
+STREAMED_PLOT_TYPES = ['ValidTime', 'GridScale', 'Profile', 'DailyModelCycle', 'TimeSeries', 'Dieoff', 'Threshold',
+                       'YearToYear', 'Contour']
+# plot types whose parsers can return several statistics from one query
+MULTI_STAT_PLOT_TYPES = STREAMED_PLOT_TYPES + ['Histogram']
+
 
 class NpEncoder(json.JSONEncoder):
     """class that hopefully allows JSON to encode numpy types"""
@@ -28,141 +45,186 @@ class QueryUtil:
     nTimes = []  # one of the four fields to return at the end -- number of sub_secs for each independent variable
     data = []  # one of the four fields to return at the end -- the parsed data structure
     output_JSON = {}  # JSON structure to pass the five output fields back to the MATS JS
+    output_format = "json"  # "json", or "columnar" for the typed-array payload in columnar_output.py
+    output_columnar = b''  # columnar payload to pass the output fields back to the MATS JS
+    stream_rows = False  # whether to reduce rows to their statistics as they stream in from an unbuffered cursor
+    query_cache = None  # on-disk cache of decoded rows, if a cache directory was given
+    cache_scope = ""  # the database the cached rows came from, so that different databases never share entries
+    multi_stats = []  # for each curve, the parsed output of each statistic requested besides the main one
+
+    def new_output_curve(self):
+        """function for creating an empty output object for one curve"""
+        return {
+            "x": [],
+            "y": [],
+            "z": [],
+            "n": [],
+            "binVals": [],
+            "error_x": [],
+            "error_y": [],
+            "subData": [],
+            "subHeaders": [],
+            "subVals": [],
+            "subSecs": [],
+            "subLevs": [],
+            "subDataX": [],
+            "subHeadersX": [],
+            "subValsX": [],
+            "subSecsX": [],
+            "subLevsX": [],
+            "subDataY": [],
+            "subHeadersY": [],
+            "subValsY": [],
+            "subSecsY": [],
+            "subLevsY": [],
+            "subInterest": [],
+            "subHit": [],
+            "subFa": [],
+            "subMiss": [],
+            "subCn": [],
+            "stats": [],
+            "text": [],
+            "xTextOutput": [],
+            "yTextOutput": [],
+            "zTextOutput": [],
+            "nTextOutput": [],
+            "hitTextOutput": [],
+            "faTextOutput": [],
+            "missTextOutput": [],
+            "cnTextOutput": [],
+            "minDateTextOutput": [],
+            "maxDateTextOutput": [],
+            "threshold_all": [],
+            "oy_all": [],
+            "on_all": [],
+            "nForecast": [],
+            "nMatched": [],
+            "nSimple": [],
+            "nTotal": [],
+            "sample_climo": 0,
+            "auc": 0,
+            "glob_stats": {
+                "mean": 0,
+                "minDate": 0,
+                "maxDate": 0,
+                "n": 0
+            },
+            "bin_stats": [],
+            "xmin": sys.float_info.max,
+            "xmax": -1 * sys.float_info.max,
+            "ymin": sys.float_info.max,
+            "ymax": -1 * sys.float_info.max,
+            "zmin": sys.float_info.max,
+            "zmax": -1 * sys.float_info.max,
+            "sum": 0
+        }
 
     def set_up_output_fields(self, number_of_curves):
         """function for creating an output object for each curve"""
+        # start from empty fields, because a worker reuses this object for many requests
+        self.data = []
+        self.n0 = []
+        self.nTimes = []
+        self.error = []
         for i in range(0, number_of_curves):
-            self.data.append({
-                "x": [],
-                "y": [],
-                "z": [],
-                "n": [],
-                "binVals": [],
-                "error_x": [],
-                "error_y": [],
-                "subData": [],
-                "subHeaders": [],
-                "subVals": [],
-                "subSecs": [],
-                "subLevs": [],
-                "subDataX": [],
-                "subHeadersX": [],
-                "subValsX": [],
-                "subSecsX": [],
-                "subLevsX": [],
-                "subDataY": [],
-                "subHeadersY": [],
-                "subValsY": [],
-                "subSecsY": [],
-                "subLevsY": [],
-                "subInterest": [],
-                "subHit": [],
-                "subFa": [],
-                "subMiss": [],
-                "subCn": [],
-                "stats": [],
-                "text": [],
-                "xTextOutput": [],
-                "yTextOutput": [],
-                "zTextOutput": [],
-                "nTextOutput": [],
-                "hitTextOutput": [],
-                "faTextOutput": [],
-                "missTextOutput": [],
-                "cnTextOutput": [],
-                "minDateTextOutput": [],
-                "maxDateTextOutput": [],
-                "threshold_all": [],
-                "oy_all": [],
-                "on_all": [],
-                "nForecast": [],
-                "nMatched": [],
-                "nSimple": [],
-                "nTotal": [],
-                "sample_climo": 0,
-                "auc": 0,
-                "glob_stats": {
-                    "mean": 0,
-                    "minDate": 0,
-                    "maxDate": 0,
-                    "n": 0
-                },
-                "bin_stats": [],
-                "xmin": sys.float_info.max,
-                "xmax": -1 * sys.float_info.max,
-                "ymin": sys.float_info.max,
-                "ymax": -1 * sys.float_info.max,
-                "zmin": sys.float_info.max,
-                "zmax": -1 * sys.float_info.max,
-                "sum": 0
-            })
+            self.data.append(self.new_output_curve())
             self.n0.append([])
             self.nTimes.append([])
             self.error.append("")
+        self.multi_stats = [{} for _ in range(number_of_curves)]
+
+    def trim_sub_data(self, curve, plot_type, stat_line_type, mode_interest=None):
+        """function for keeping only the sub-data a curve's plot type needs. If a mode_pair curve asked for more than
+        one interest threshold, its MODE CSI, PODy, and FAR at each of them are saved from the sub-data too."""
+        # only save relevant sub-data
+        if plot_type in ['ValidTime', 'GridScale', 'Profile', 'DailyModelCycle', 'TimeSeries',
+                         'Dieoff', 'Threshold', 'YearToYear']:
+            if stat_line_type == 'mode_pair':
+                if mode_interest is not None and len(mode_interest) > 1:
+                    curve["interestSweep"] = self.sweep_mode_interest(curve, mode_interest)
+                for j in range(len(curve["subData"])):
+                    if curve["subHeaders"][j] == 'NaN' or len(curve["subHeaders"][j]) == 0:
+                        curve["subInterest"].append('NaN')
+                    else:
+                        try:
+                            interest_idx = curve["subHeaders"][j].index('interest')
+                            curve["subInterest"].append([float(a[interest_idx]) for a in curve["subData"][j]])
+                        except Exception as e:
+                            curve["subInterest"].append('NaN')
+            elif stat_line_type == 'mode_single':
+                for j in range(len(curve["subData"])):
+                    if curve["subHeaders"][j] == 'NaN' or len(curve["subHeaders"][j]) == 0:
+                        curve["nForecast"].append(0)
+                        curve["nMatched"].append(0)
+                        curve["nSimple"].append(0)
+                        curve["nTotal"].append(0)
+                    else:
+                        try:
+                            forecast_idx = curve["subHeaders"][j].index('fcst_flag')
+                            matched_idx = curve["subHeaders"][j].index('matched_flag')
+                            simple_idx = curve["subHeaders"][j].index('simple_flag')
+                            curve["nForecast"].append(sum([int(a[forecast_idx]) for a in curve["subData"][j]]))
+                            curve["nMatched"].append(sum([int(a[matched_idx]) for a in curve["subData"][j]]))
+                            curve["nSimple"].append(sum([int(a[simple_idx]) for a in curve["subData"][j]]))
+                            curve["nTotal"].append(len([int(a[forecast_idx]) for a in curve["subData"][j]]))
+                        except Exception as e:
+                            curve["nForecast"].append(0)
+                            curve["nMatched"].append(0)
+                            curve["nSimple"].append(0)
+                            curve["nTotal"].append(0)
+            elif stat_line_type == 'ctc':
+                for j in range(len(curve["subData"])):
+                    if curve["subHeaders"][j] == 'NaN' or len(curve["subHeaders"][j]) == 0:
+                        curve["subHit"].append('NaN')
+                        curve["subFa"].append('NaN')
+                        curve["subMiss"].append('NaN')
+                        curve["subCn"].append('NaN')
+                    else:
+                        try:
+                            hit_idx = curve["subHeaders"][j].index('fy_oy')
+                            fa_idx = curve["subHeaders"][j].index('fy_on')
+                            miss_idx = curve["subHeaders"][j].index('fn_oy')
+                            cn_idx = curve["subHeaders"][j].index('fn_on')
+                            curve["subHit"].append([int(a[hit_idx]) for a in curve["subData"][j]])
+                            curve["subFa"].append([int(a[fa_idx]) for a in curve["subData"][j]])
+                            curve["subMiss"].append([int(a[miss_idx]) for a in curve["subData"][j]])
+                            curve["subCn"].append([int(a[cn_idx]) for a in curve["subData"][j]])
+                        except Exception as e:
+                            curve["subHit"].append('NaN')
+                            curve["subFa"].append('NaN')
+                            curve["subMiss"].append('NaN')
+                            curve["subCn"].append('NaN')
+
+        curve["subHeaders"] = []
+        curve["subData"] = []
+
+    def sweep_mode_interest(self, curve, mode_interest):
+        """function for calculating a mode_pair curve's MODE CSI, PODy, and FAR at every interest threshold, with
+        one pass over each point's interest matrices"""
+        sweep = {"thresholds": mode_interest}
+        for j in range(len(curve["subData"])):
+            if curve["subHeaders"][j] == 'NaN' or len(curve["subHeaders"][j]) == 0:
+                point_stats = calculate_mode_ctc_sweep(sub_data_array([], 'mode_pair'), np.empty(0), mode_interest)
+            else:
+                point_stats = calculate_mode_ctc_sweep(sub_data_array(curve["subData"][j], 'mode_pair'),
+                                                       np.asarray(curve["subHeaders"][j]), mode_interest)
+            for statistic, stats in point_stats.items():
+                sweep.setdefault(statistic, []).append(stats)
+        return sweep
 
     def construct_output_json(self, plot_type, queries):
         """function for constructing and jsonifying a dictionary of the output variables"""
         for i in range(len(self.data)):
-            stat_line_type = queries[i]["statLineType"]
-            # only save relevant sub-data
-            if plot_type in ['ValidTime', 'GridScale', 'Profile', 'DailyModelCycle', 'TimeSeries',
-                             'Dieoff', 'Threshold', 'YearToYear']:
-                if stat_line_type == 'mode_pair':
-                    for j in range(len(self.data[i]["subData"])):
-                        if self.data[i]["subHeaders"][j] == 'NaN' or len(self.data[i]["subHeaders"][j]) == 0:
-                            self.data[i]["subInterest"].append('NaN')
-                        else:
-                            try:
-                                interest_idx = self.data[i]["subHeaders"][j].index('interest')
-                                self.data[i]["subInterest"].append([float(a[interest_idx]) for a in self.data[i]["subData"][j]])
-                            except Exception as e:
-                                self.data[i]["subInterest"].append('NaN')
-                elif stat_line_type == 'mode_single':
-                    for j in range(len(self.data[i]["subData"])):
-                        if self.data[i]["subHeaders"][j] == 'NaN' or len(self.data[i]["subHeaders"][j]) == 0:
-                            self.data[i]["nForecast"].append(0)
-                            self.data[i]["nMatched"].append(0)
-                            self.data[i]["nSimple"].append(0)
-                            self.data[i]["nTotal"].append(0)
-                        else:
-                            try:
-                                forecast_idx = self.data[i]["subHeaders"][j].index('fcst_flag')
-                                matched_idx = self.data[i]["subHeaders"][j].index('matched_flag')
-                                simple_idx = self.data[i]["subHeaders"][j].index('simple_flag')
-                                self.data[i]["nForecast"].append(sum([int(a[forecast_idx]) for a in self.data[i]["subData"][j]]))
-                                self.data[i]["nMatched"].append(sum([int(a[matched_idx]) for a in self.data[i]["subData"][j]]))
-                                self.data[i]["nSimple"].append(sum([int(a[simple_idx]) for a in self.data[i]["subData"][j]]))
-                                self.data[i]["nTotal"].append(len([int(a[forecast_idx]) for a in self.data[i]["subData"][j]]))
-                            except Exception as e:
-                                self.data[i]["nForecast"].append(0)
-                                self.data[i]["nMatched"].append(0)
-                                self.data[i]["nSimple"].append(0)
-                                self.data[i]["nTotal"].append(0)
-                elif stat_line_type == 'ctc':
-                    for j in range(len(self.data[i]["subData"])):
-                        if self.data[i]["subHeaders"][j] == 'NaN' or len(self.data[i]["subHeaders"][j]) == 0:
-                            self.data[i]["subHit"].append('NaN')
-                            self.data[i]["subFa"].append('NaN')
-                            self.data[i]["subMiss"].append('NaN')
-                            self.data[i]["subCn"].append('NaN')
-                        else:
-                            try:
-                                hit_idx = self.data[i]["subHeaders"][j].index('fy_oy')
-                                fa_idx = self.data[i]["subHeaders"][j].index('fy_on')
-                                miss_idx = self.data[i]["subHeaders"][j].index('fn_oy')
-                                cn_idx = self.data[i]["subHeaders"][j].index('fn_on')
-                                self.data[i]["subHit"].append([int(a[hit_idx]) for a in self.data[i]["subData"][j]])
-                                self.data[i]["subFa"].append([int(a[fa_idx]) for a in self.data[i]["subData"][j]])
-                                self.data[i]["subMiss"].append([int(a[miss_idx]) for a in self.data[i]["subData"][j]])
-                                self.data[i]["subCn"].append([int(a[cn_idx]) for a in self.data[i]["subData"][j]])
-                            except Exception as e:
-                                self.data[i]["subHit"].append('NaN')
-                                self.data[i]["subFa"].append('NaN')
-                                self.data[i]["subMiss"].append('NaN')
-                                self.data[i]["subCn"].append('NaN')
-
-            self.data[i]["subHeaders"] = []
-            self.data[i]["subData"] = []
+            mode_interest = None
+            if queries[i]["statLineType"] == 'mode_pair':
+                mode_interest, error = read_mode_interest_param(queries[i]["appParams"])
+                if mode_interest is None:
+                    self.error[i] = error
+            self.trim_sub_data(self.data[i], plot_type, queries[i]["statLineType"], mode_interest)
+            if len(self.multi_stats[i]) > 0:
+                for stat_output in self.multi_stats[i].values():
+                    self.trim_sub_data(stat_output["data"], plot_type, queries[i]["statLineType"])
+                self.data[i]["multiStats"] = self.multi_stats[i]
 
         self.output_JSON = {
             "data": self.data,
@@ -170,71 +232,228 @@ class QueryUtil:
             "nTimes": self.nTimes,
             "error": self.error
         }
-        self.output_JSON = json.dumps(self.output_JSON, cls=NpEncoder)
+        if self.output_format == "columnar":
+            self.output_columnar = encode_columnar_output(self.output_JSON, NpEncoder)
+            self.output_JSON = {}
+        else:
+            self.output_JSON = json.dumps(self.output_JSON, cls=NpEncoder)
 
-    def query_db(self, cursor, query_array):
-        """function for querying the database and sending the returned data to the parser"""
-        idx = 0
-        return_obj = {"data": self.data, "error": self.error, "n0": self.n0, "nTimes": self.nTimes}
-        for query in query_array:
-            statement = query["statement"]
-            results_full = []
-            try:
-                if query["appParams"]["plotType"] == 'SimpleScatter':
-                    # there are two queries
-                    cursor.execute(statement[0])
-                    results_x = cursor.fetchall()
-                    cursor.execute(statement[1])
-                    results_y = cursor.fetchall()
-
-                    #combine the results
-                    current_y = 0
-                    for result_x in results_x:
-                        bin_val = result_x["binVal"]
-                        for idx_y in range(current_y, len(results_y)):
-                            result_y = results_y[idx_y]
-                            if bin_val == result_y["binVal"]:
-                                result_full = copy.deepcopy(result_x)
-                                result_full["nY"] = result_y["nY"]
-                                result_full["fbarY"] = result_y["fbarY"]
-                                result_full["obarY"] = result_y["obarY"]
-                                result_full["sub_dataY"] = result_y["sub_dataY"]
-                                results_full.append(result_full)
-                                current_y = idx_y + 1
-                                break
-                else:
-                    cursor.execute(statement)
-            except pymysql.Error as e:
-                self.error[idx] = "Error executing query: " + str(e)
+    def write_output(self, output_path=None):
+        """function for sending the output to stdout, or for a columnar payload, to a file if one was given"""
+        if self.output_format != "columnar":
+            print(self.output_JSON)
+            return
+        write_columnar_output(self.output_columnar, output_path)
+        if output_path is not None:
+            print(json.dumps({"outputPath": output_path}))
+
+    def fetch_results(self, cursor, query, pool=None):
+        """function for running a curve's statement(s) and returning the row count and fetched rows"""
+        statement = query["statement"]
+        if query["appParams"]["plotType"] == 'SimpleScatter':
+            # there are two queries
+            if pool is not None:
+                # run them at the same time on two of the pool's connections
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    future_x = executor.submit(self.fetch_pooled_statement, pool, statement[0])
+                    future_y = executor.submit(self.fetch_pooled_statement, pool, statement[1])
+                    results_x = future_x.result()[1]
+                    rowcount, results_y = future_y.result()
             else:
-                if cursor.rowcount == 0:
-                    self.error[idx] = "INFO:0 data records found"
-                else:
-                    if query["appParams"]["plotType"] == 'Histogram':
-                        return_obj = parse_query_data_histogram(idx, cursor.fetchall(), query["statLineType"], query["statistic"],
+                cursor.execute(statement[0])
+                results_x = cursor.fetchall()
+                cursor.execute(statement[1])
+                results_y = cursor.fetchall()
+                rowcount = cursor.rowcount
+            return rowcount, join_scatter_results(results_x, results_y)
+        cached = self.get_cached_results(query)
+        if cached is not None:
+            return cached
+        cursor.execute(statement)
+        if cursor.rowcount == 0:
+            return 0, []
+        rowcount, results = cursor.rowcount, cursor.fetchall()
+        return rowcount, self.cache_results(query, results)
+
+    def cache_key(self, query):
+        """function for getting a curve's query cache key, or None if its rows aren't cached"""
+        if self.query_cache is None or query["appParams"]["plotType"] not in STREAMED_PLOT_TYPES \
+                or query["statLineType"] in ['mode_single', 'mode_pair']:
+            return None
+        # the statistic only matters through the columns the sub_data is decoded into
+        layout = [query["statLineType"], len(numeric_column_headers(query["statLineType"], query["statistic"])),
+                  query["appParams"]["hasLevels"]]
+        return self.query_cache.make_key(self.cache_scope, query["statement"], layout)
+
+    def get_cached_results(self, query):
+        """function for getting a curve's row count and rows from the query cache, or None on a miss"""
+        key = self.cache_key(query)
+        if key is None:
+            return None
+        cached = self.query_cache.get(key)
+        if cached is None:
+            return None
+        rows, numpy_data, sub_secs, sub_levs, counts = cached
+        return len(rows), attach_decoded_sub_data(rows, numpy_data, sub_secs, sub_levs, counts)
+
+    def cache_results(self, query, results):
+        """function for storing a curve's decoded rows in the query cache, returning the rows to parse"""
+        key = self.cache_key(query)
+        if key is None or len(results) == 0:
+            return results
+        decoded = decode_query_rows(results, query["statLineType"], query["statistic"],
+                                    query["appParams"]["hasLevels"])
+        if decoded is None:
+            return results
+        self.query_cache.put(key, results, *decoded)
+        # parse from the decoded arrays too, so that a miss and a hit go through the same code
+        return attach_decoded_sub_data(results, *decoded)
+
+    def fetch_streamed_results(self, cursor, query):
+        """function for running a curve's statement on an unbuffered server-side cursor, calculating each row's
+        statistic as it arrives so that only one raw sub_data string is held in memory at a time"""
+        cached = self.get_cached_results(query)
+        if cached is not None:
+            return cached
+        with closing(cursor.connection.cursor(pymysql.cursors.SSDictCursor)) as stream_cursor:
+            stream_cursor.execute(query["statement"])
+            results = [reduce_streamed_row(row, query["statistic"], query["statLineType"], query["appParams"])
+                       for row in stream_cursor]
+        return len(results), results
+
+    def parse_results(self, idx, query, rowcount, results, return_obj):
+        """function for sending one curve's returned data to the right parser"""
+        if rowcount == 0:
+            return_obj["error"][idx] = "INFO:0 data records found"
+        else:
+            if query["appParams"]["plotType"] == 'Histogram':
+                return_obj = parse_query_data_histogram(idx, results, query["statLineType"], query["statistic"],
                                                         query["appParams"], return_obj)
-                    elif query["appParams"]["plotType"] == 'Contour':
-                        return_obj = parse_query_data_contour(idx, cursor.fetchall(), query["statLineType"], query["statistic"],
+            elif query["appParams"]["plotType"] == 'Contour':
+                return_obj = parse_query_data_contour(idx, results, query["statLineType"], query["statistic"],
                                                       query["appParams"], return_obj)
-                    elif query["appParams"]["plotType"] == 'SimpleScatter':
-                        return_obj = parse_query_data_simple_scatter(idx, results_full, query["statLineType"], query["statistic"],
+            elif query["appParams"]["plotType"] == 'SimpleScatter':
+                return_obj = parse_query_data_simple_scatter(idx, results, query["statLineType"], query["statistic"],
                                                              query["appParams"], return_obj)
-                    elif query["appParams"]["plotType"] == 'Reliability' or query["appParams"]["plotType"] == 'ROC' or \
-                            query["appParams"]["plotType"] == 'PerformanceDiagram':
-                        return_obj = parse_query_data_ensemble(idx, cursor.fetchall(), query["appParams"], return_obj)
-                    elif query["appParams"]["plotType"] == 'EnsembleHistogram':
-                        return_obj = parse_query_data_ensemble_histogram(idx, cursor.fetchall(), query["statLineType"],
+            elif query["appParams"]["plotType"] == 'Reliability' or query["appParams"]["plotType"] == 'ROC' or \
+                    query["appParams"]["plotType"] == 'PerformanceDiagram':
+                return_obj = parse_query_data_ensemble(idx, results, query["appParams"], return_obj)
+            elif query["appParams"]["plotType"] == 'EnsembleHistogram':
+                return_obj = parse_query_data_ensemble_histogram(idx, results, query["statLineType"],
                                                                  query["statistic"], query["appParams"], return_obj)
-                    else:
-                        return_obj = parse_query_data_xy_curve(idx, cursor.fetchall(), query["statLineType"], query["statistic"],
+            else:
+                return_obj = parse_query_data_xy_curve(idx, results, query["statLineType"], query["statistic"],
                                                        query["appParams"], query["fcsts"], query["vts"], return_obj)
-            idx = idx + 1
+        return return_obj
+
+    def extra_statistics(self, query):
+        """function for finding the statistics a curve asked for besides its main one"""
+        if "statistics" not in query or query["appParams"]["plotType"] not in MULTI_STAT_PLOT_TYPES:
+            return []
+        return resolve_statistics(query["statistics"], query["statistic"], query["statLineType"])
+
+    def parse_multi_stat_results(self, idx, query, rowcount, results, return_obj):
+        """function for parsing a curve's rows for its main statistic and then for each extra one. The sub_data is
+        decoded once up front, so every statistic after the first only pays for its own calculation."""
+        statistics = self.extra_statistics(query)
+        if len(statistics) > 0 and rowcount > 0 and query["statLineType"] not in ['mode_single', 'mode_pair']:
+            decoded = decode_query_rows(results, query["statLineType"], query["statistic"],
+                                        query["appParams"]["hasLevels"])
+            if decoded is not None:
+                attach_decoded_sub_data(results, *decoded)
+        return_obj = self.parse_results(idx, query, rowcount, results, return_obj)
+        number_of_curves = len(return_obj["data"])
+        for statistic in statistics:
+            # parse into a scratch output, so that only this curve's fields are touched
+            stat_obj = {"data": [self.new_output_curve() if i == idx else None for i in range(number_of_curves)],
+                        "error": [""] * number_of_curves,
+                        "n0": [[] for _ in range(number_of_curves)],
+                        "nTimes": [[] for _ in range(number_of_curves)]}
+            try:
+                stat_obj = self.parse_results(idx, dict(query, statistic=statistic), rowcount, results, stat_obj)
+            except Exception as e:
+                # one extra statistic failing shouldn't take down the curve's other statistics
+                stat_obj["error"][idx] = "Error calculating " + statistic + ": " + str(e)
+            self.multi_stats[idx][statistic] = {field: stat_obj[field][idx] for field in stat_obj}
+        return return_obj
 
+    def match_multi_stats(self, query_array):
+        """function for matching each extra statistic across the curves, the same as the main statistic"""
+        shared_statistics = [statistic for statistic in self.multi_stats[0]
+                             if all(statistic in curve_stats for curve_stats in self.multi_stats)]
+        for statistic in shared_statistics:
+            stat_obj = {field: [curve_stats[statistic][field] for curve_stats in self.multi_stats]
+                        for field in ["data", "error", "n0", "nTimes"]}
+            stat_obj = do_matching({"query_array": [dict(query, statistic=statistic) for query in query_array]},
+                                   stat_obj)
+            for idx, curve_stats in enumerate(self.multi_stats):
+                curve_stats[statistic] = {field: stat_obj[field][idx] for field in stat_obj}
+
+    def store_return_obj(self, return_obj):
+        """function for copying the parsed fields back onto the query util"""
         self.data = return_obj["data"]
         self.error = return_obj["error"]
         self.n0 = return_obj["n0"]
         self.nTimes = return_obj["nTimes"]
 
+    def query_db(self, cursor, query_array, pool=None):
+        """function for querying the database and sending the returned data to the parser"""
+        return_obj = {"data": self.data, "error": self.error, "n0": self.n0, "nTimes": self.nTimes}
+        for idx, query in enumerate(query_array):
+            try:
+                # a row reduced as it streams in only has one statistic, so multi-statistic curves are buffered
+                if self.stream_rows and query["appParams"]["plotType"] in STREAMED_PLOT_TYPES \
+                        and len(self.extra_statistics(query)) == 0:
+                    rowcount, results = self.fetch_streamed_results(cursor, query)
+                else:
+                    rowcount, results = self.fetch_results(cursor, query, pool)
+            except pymysql.Error as e:
+                self.error[idx] = "Error executing query: " + str(e)
+            else:
+                return_obj = self.parse_multi_stat_results(idx, query, rowcount, results, return_obj)
+        self.store_return_obj(return_obj)
+
+    def fetch_pooled_statement(self, pool, statement):
+        """function for running one statement on a connection borrowed from the pool"""
+        cnx = pool.acquire()
+        try:
+            with closing(cnx.cursor()) as cursor:
+                self.set_up_session(cursor, pool.options)
+                cursor.execute(statement)
+                return cursor.rowcount, cursor.fetchall()
+        finally:
+            pool.release(cnx)
+
+    def fetch_pooled_results(self, pool, query):
+        """function for running one curve's statement(s) on a connection borrowed from the pool"""
+        cnx = pool.acquire()
+        try:
+            with closing(cnx.cursor()) as cursor:
+                self.set_up_session(cursor, pool.options)
+                # the curves already hold the pool's connections, so a scatter curve's x and y run one after another
+                return self.fetch_results(cursor, query)
+        finally:
+            pool.release(cnx)
+
+    def query_db_concurrent(self, pool, query_array):
+        """function for querying the database for all curves at once and parsing each curve as it arrives"""
+        return_obj = {"data": self.data, "error": self.error, "n0": self.n0, "nTimes": self.nTimes}
+        with ThreadPoolExecutor(max_workers=min(pool.max_size, len(query_array))) as executor:
+            futures = {executor.submit(self.fetch_pooled_results, pool, query): idx
+                       for idx, query in enumerate(query_array)}
+            # only the round trips run on the threads -- metcalcpy toggles the global
+            # warnings filters, so the parsing has to stay on this thread
+            for future in as_completed(futures):
+                idx = futures[future]
+                try:
+                    rowcount, results = future.result()
+                except pymysql.Error as e:
+                    self.error[idx] = "Error executing query: " + str(e)
+                else:
+                    return_obj = self.parse_multi_stat_results(idx, query_array[idx], rowcount, results,
+                                                               return_obj)
+        self.store_return_obj(return_obj)
+
     def validate_options(self, options):
         """makes sure all expected options were indeed passed in"""
         assert True, options.host is not None and options.port is not None and options.user is not None \
@@ -243,7 +462,9 @@ class QueryUtil:
 
     def get_options(self, args):
         """process 'c' style options - using getopt - usage describes options"""
-        usage = ["(h)ost=", "(P)ort=", "(u)ser=", "(p)assword=", "(d)atabase=", "(t)imeout=", "(q)uery_array="]
+        usage = ["(h)ost=", "(P)ort=", "(u)ser=", "(p)assword=", "(d)atabase=", "(t)imeout=", "(q)uery_array=",
+                 "(w)orker", "(S)ocket=", "(c)oncurrency=", "(f)ormat=", "(o)utput=",
+                 "(s)tream", "(C)ache_dir=", "(T)tl=", "(M)ax_cache_mb="]
         host = None
         port = None
         user = None
@@ -251,9 +472,18 @@ class QueryUtil:
         database = None
         timeout = 300
         query_array = None
+        worker = False
+        socket_path = None
+        concurrency = 1
+        output_format = "json"
+        output_path = None
+        stream = False
+        cache_dir = None
+        cache_ttl = 8 * 3600
+        cache_max_mb = 1024
 
         try:
-            opts, args = getopt.getopt(args[1:], "h:p:u:P:d:t:q:", usage)
+            opts, args = getopt.getopt(args[1:], "h:p:u:P:d:t:q:wS:c:f:o:sC:T:M:", usage)
         except getopt.GetoptError as err:
             # print help information and exit:
             print(str(err))  # will print something like "option -a not recognized"
@@ -277,11 +507,34 @@ class QueryUtil:
                 timeout = int(a)
             elif o == "-q":
                 query_array = json.loads(a)
+            elif o == "-w":
+                worker = True
+            elif o == "-S":
+                worker = True
+                socket_path = a
+            elif o == "-c":
+                concurrency = max(1, int(a))
+            elif o == "-f":
+                if a not in ("json", "columnar"):
+                    print("unknown output format " + a)
+                    print(usage)
+                    sys.exit(2)
+                output_format = a
+            elif o == "-o":
+                output_path = a
+            elif o == "-s":
+                stream = True
+            elif o == "-C":
+                cache_dir = a
+            elif o == "-T":
+                cache_ttl = int(a)
+            elif o == "-M":
+                cache_max_mb = int(a)
             else:
                 assert False, "unhandled option"
         # make sure none were left out...
         assert True, host is not None and port is not None and user is not None and password is not None \
-                     and database is not None and query_array is not None
+                     and database is not None and (query_array is not None or worker)
         options = {
             "host": host,
             "port": port,
@@ -289,34 +542,221 @@ class QueryUtil:
             "password": password,
             "database": database,
             "timeout": timeout,
-            "query_array": query_array
+            "query_array": query_array,
+            "worker": worker,
+            "socket_path": socket_path,
+            "concurrency": concurrency,
+            "output_format": output_format,
+            "output_path": output_path,
+            "stream": stream,
+            "cache_dir": cache_dir,
+            "cache_ttl": cache_ttl,
+            "cache_max_mb": cache_max_mb
         }
         return options
 
+    def connect(self, options):
+        """function for opening a connection to the database"""
+        return pymysql.Connect(host=options["host"], port=options["port"], user=options["user"],
+                               passwd=options["password"],
+                               db=options["database"], charset='utf8',
+                               cursorclass=pymysql.cursors.DictCursor)
+
+    def set_up_session(self, cursor, options):
+        """function for setting the session variables the queries depend on"""
+        cursor.execute('set group_concat_max_len = 4294967295')
+        cursor.execute('set session wait_timeout = ' + str(options["timeout"]))
+
+    def make_pool(self, cnx, options):
+        """function for wrapping the main connection in a pool when concurrent curves were requested"""
+        if options["concurrency"] > 1:
+            return ConnectionPool(self, options, options["concurrency"], cnx)
+        return None
+
+    def set_up_cache(self, options):
+        """function for opening the query cache, if a cache directory was given"""
+        if options["cache_dir"] is not None:
+            self.query_cache = QueryCache(options["cache_dir"], options["cache_ttl"],
+                                          options["cache_max_mb"] * 1024 * 1024)
+            self.cache_scope = str(options["host"]) + ":" + str(options["port"]) + "/" + str(options["database"])
+
+    def process_queries(self, cursor, query_array, pool=None):
+        """function for querying, matching, and jsonifying the results for one query_array"""
+        self.set_up_output_fields(len(query_array))
+        # streamed rows are reduced on the thread that parses them, so streaming curves are queried one at a time
+        if pool is not None and len(query_array) > 1 and not self.stream_rows:
+            self.query_db_concurrent(pool, query_array)
+        else:
+            # a scatter curve runs its x and y statements on the pool's connections, leaving the cursor idle
+            self.query_db(cursor, query_array, pool)
+        if query_array[0]["appParams"]["matching"]:
+            return_obj = do_matching({"query_array": query_array},
+                                     {"data": self.data, "error": self.error, "n0": self.n0, "nTimes": self.nTimes})
+            self.store_return_obj(return_obj)
+            self.match_multi_stats(query_array)
+        self.construct_output_json(query_array[0]["appParams"]["plotType"], query_array)
+        return self.output_JSON
+
     def do_query(self, options):
         """function for validating options and passing them to the query function"""
         self.validate_options(options)
-        cnx = pymysql.Connect(host=options["host"], port=options["port"], user=options["user"],
-                              passwd=options["password"],
-                              db=options["database"], charset='utf8',
-                              cursorclass=pymysql.cursors.DictCursor)
-        with closing(cnx.cursor()) as cursor:
-            cursor.execute('set group_concat_max_len = 4294967295')
-            cursor.execute('set session wait_timeout = ' + str(options["timeout"]))
-            self.query_db(cursor, options["query_array"])
-        cnx.close()
+        self.stream_rows = options["stream"]
+        self.set_up_cache(options)
+        cnx = self.connect(options)
+        pool = self.make_pool(cnx, options)
+        try:
+            with closing(cnx.cursor()) as cursor:
+                self.set_up_session(cursor, options)
+                self.process_queries(cursor, options["query_array"], pool)
+        finally:
+            if pool is not None:
+                pool.close()
+            else:
+                cnx.close()
+
+    def handle_worker_request(self, cnx, options, request, pool=None):
+        """function for answering one JSON-lines worker request with the same payload as the one-shot CLI"""
+        try:
+            request = json.loads(request)
+            query_array = request["query_array"] if isinstance(request, dict) else request
+            # a columnar payload can't share the JSON-lines stream, so it goes to the file named in the request
+            self.output_format = request.get("format", "json") if isinstance(request, dict) else "json"
+            # the server may have dropped an idle connection, so make sure it's still there
+            cnx.ping(reconnect=True)
+            with closing(cnx.cursor()) as cursor:
+                self.set_up_session(cursor, options)
+                output = self.process_queries(cursor, query_array, pool)
+            if self.output_format == "columnar":
+                write_columnar_output(self.output_columnar, request["outputPath"])
+                return json.dumps({"outputPath": request["outputPath"]})
+            return output
+        except Exception as e:
+            return json.dumps({"workerError": "Error processing worker request: " + str(e)})
+
+    def serve_stream(self, cnx, options, in_stream, out_stream, pool=None):
+        """function for answering JSON-lines requests until the input stream closes"""
+        for line in in_stream:
+            if len(line.strip()) == 0:
+                continue
+            out_stream.write(self.handle_worker_request(cnx, options, line, pool) + "\n")
+            out_stream.flush()
+
+    def run_worker(self, options):
+        """function for keeping the imports and the db connection warm across many query_array requests"""
+        self.validate_options(options)
+        self.stream_rows = options["stream"]
+        self.set_up_cache(options)
+        cnx = self.connect(options)
+        pool = self.make_pool(cnx, options)
+        try:
+            if options["socket_path"] is None:
+                self.serve_stream(cnx, options, sys.stdin, sys.stdout, pool)
+            else:
+                qutil = self
+
+                class WorkerRequestHandler(socketserver.StreamRequestHandler):
+                    """handler that answers the JSON-lines requests sent over one socket connection"""
+                    def handle(self):
+                        text_in = (line.decode('utf-8') for line in self.rfile)
+                        text_out = WorkerSocketWriter(self.wfile)
+                        qutil.serve_stream(cnx, options, text_in, text_out, pool)
+
+                if os.path.exists(options["socket_path"]):
+                    os.remove(options["socket_path"])
+                with socketserver.UnixStreamServer(options["socket_path"], WorkerRequestHandler) as server:
+                    server.serve_forever()
+        finally:
+            if pool is not None:
+                pool.close()
+            else:
+                cnx.close()
+
+
+def join_scatter_results(results_x, results_y):
+    """function for adding the y fields of each scatter bin to the x row with the same binVal. Each x row takes
+    the first y row with its binVal after the last one matched, the same as an ordered scan through the y rows."""
+    y_indices = {}
+    for idx_y, result_y in enumerate(results_y):
+        y_indices.setdefault(result_y["binVal"], []).append(idx_y)
+    results_full = []
+    current_y = 0
+    for result_x in results_x:
+        candidates = y_indices.get(result_x["binVal"], [])
+        candidate_idx = bisect_left(candidates, current_y)
+        if candidate_idx == len(candidates):
+            continue
+        idx_y = candidates[candidate_idx]
+        result_y = results_y[idx_y]
+        # the x rows aren't used anywhere else, so add the y fields in place instead of copying sub_data
+        result_x["nY"] = result_y["nY"]
+        result_x["fbarY"] = result_y["fbarY"]
+        result_x["obarY"] = result_y["obarY"]
+        result_x["sub_dataY"] = result_y["sub_dataY"]
+        results_full.append(result_x)
+        current_y = idx_y + 1
+    return results_full
+
+
+class ConnectionPool:
+    """class that lends out up to max_size database connections, opening more only as they are needed"""
+    def __init__(self, qutil, options, max_size, cnx=None):
+        self.qutil = qutil
+        self.options = options
+        self.max_size = max_size
+        self.idle = queue.LifoQueue()
+        self.opened = []
+        self.lock = threading.Lock()
+        if cnx is not None:
+            self.opened.append(cnx)
+            self.idle.put(cnx)
+
+    def acquire(self):
+        """hands out an idle connection, opens a new one if under the cap, or waits for one to come back"""
+        try:
+            cnx = self.idle.get_nowait()
+        except queue.Empty:
+            with self.lock:
+                if len(self.opened) < self.max_size:
+                    cnx = self.qutil.connect(self.options)
+                    self.opened.append(cnx)
+                    return cnx
+            cnx = self.idle.get()
+        # the server may have dropped an idle connection, so make sure it's still there
+        cnx.ping(reconnect=True)
+        return cnx
+
+    def release(self, cnx):
+        """returns a connection to the pool"""
+        self.idle.put(cnx)
+
+    def close(self):
+        """closes every connection the pool has opened"""
+        for cnx in self.opened:
+            try:
+                cnx.close()
+            except pymysql.Error:
+                pass
+        self.opened = []
+
+
+class WorkerSocketWriter:
+    """class that lets the worker write text lines to a socket's binary stream"""
+    def __init__(self, wfile):
+        self.wfile = wfile
+
+    def write(self, text):
+        self.wfile.write(text.encode('utf-8'))
+
+    def flush(self):
+        self.wfile.flush()
 
 
 if __name__ == '__main__':
     qutil = QueryUtil()
     options = qutil.get_options(sys.argv)
-    qutil.set_up_output_fields(len(options["query_array"]))
-    qutil.do_query(options)
-    if options["query_array"][0]["appParams"]["matching"]:
-        return_obj = do_matching(options, {"data": qutil.data, "error": qutil.error, "n0": qutil.n0, "nTimes": qutil.nTimes})
-        qutil.data = return_obj["data"]
-        qutil.error = return_obj["error"]
-        qutil.n0 = return_obj["n0"]
-        qutil.nTimes = return_obj["nTimes"]
-    qutil.construct_output_json(options["query_array"][0]["appParams"]["plotType"], options["query_array"])
-    print(qutil.output_JSON)
+    if options["worker"]:
+        qutil.run_worker(options)
+    else:
+        qutil.output_format = options["output_format"]
+        qutil.do_query(options)
+        qutil.write_output(options["output_path"])
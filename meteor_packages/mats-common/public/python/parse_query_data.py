@@ -1,9 +1,13 @@
 import numpy as np
 import sys
-import math
 import re
-from calc_stats import get_stat, calculate_stat
+from calc_stats import get_stat, get_curve_stats, calculate_stat, decode_rows_sub_data, numeric_column_headers, \
+    parse_outlier_qc_param, read_mode_interest_param, sub_data_array
 from calc_ens_stats import get_ens_stat
+from itertools import compress
+
+# room for this many distinct levels in a sec-lev matching key
+_LEVEL_KEY_SLOTS = 1 << 20
 
 
 def _null_point(data, di, plot_type, stat_var_name, has_levels):
@@ -37,36 +41,61 @@ def _null_point(data, di, plot_type, stat_var_name, has_levels):
             data["subLevs"][di] = 'NaN'
 
 
-def _add_null_point(data, di, plot_type, ind_var_name, new_ind_var, stat_var_name, has_levels):
-    """function to add an additional null point on a graph"""
-    di = int(di)
-    data[ind_var_name].insert(di, new_ind_var)
-    data[stat_var_name].insert(di, 'null')
-    if plot_type == "PerformanceDiagram" or plot_type == "ROC":
-        data["oy_all"].insert(di, [])
-        data["on_all"].insert(di, [])
-    if len(data['error_' + stat_var_name]) > 0:
-        data['error_' + stat_var_name].insert(di, 'null')
-    if plot_type == "SimpleScatter":
-        data["y"][di].insert(di, 'null')
-        data["subDataX"][di].insert(di, [])
-        data["subDataY"][di].insert(di, [])
-        data["subHeadersX"][di].insert(di, [])
-        data["subHeadersY"][di].insert(di, [])
-        data["subValsX"][di].insert(di, [])
-        data["subValsY"][di].insert(di, [])
-        data["subSecsX"][di].insert(di, [])
-        data["subSecsY"][di].insert(di, [])
-        if has_levels:
-            data["subLevsX"][di].insert(di, [])
-            data["subLevsY"][di].insert(di, [])
-    else:
-        data['subData'].insert(di, [])
-        data['subHeaders'].insert(di, [])
-        data['subVals'].insert(di, [])
-        data['subSecs'].insert(di, [])
-        if has_levels:
-            data['subLevs'].insert(di, [])
+def _fill_time_gaps(data, ind_vars, time_interval, regular, vts, fcsts, has_levels):
+    """function to add null points on a time series graph wherever a cycle is missing"""
+    if len(ind_vars) < 2 or time_interval <= 0:
+        return
+    day_in_milli_seconds = 24 * 3600 * 1000
+    times = np.asarray(ind_vars, dtype=np.int64)
+    float_times = times.astype(np.float64)
+
+    # lay out the time grid between every pair of neighboring points
+    cycles_missing = np.ceil((float_times[1:] - float_times[:-1]) / time_interval).astype(np.int64) - 1
+    cycles_missing = np.maximum(cycles_missing, 0)
+    gaps = np.repeat(np.arange(len(cycles_missing)), cycles_missing)
+    if len(gaps) == 0:
+        return
+    steps = np.arange(len(gaps)) - np.repeat(np.cumsum(cycles_missing) - cycles_missing, cycles_missing) + 1
+    new_times = times[gaps] + steps * time_interval
+
+    if not regular:
+        # if it's not a regular model, we only want to add a null point if
+        # this is an init time that should have had a forecast.
+        cadences = (new_times % day_in_milli_seconds).astype(np.float64)
+        expected = np.zeros(len(new_times), dtype=bool)
+        for fcst in fcsts:
+            this_cadence = cadences - float(fcst) * 3600 * 1000
+            # check to see if cycle time was on a previous day -- if so, need to
+            # wrap around 00Z to get current hour of day (cycle time)
+            wrapped = this_cadence < 0
+            this_cadence[wrapped] = this_cadence[wrapped] \
+                + np.ceil(-1 * this_cadence[wrapped] / day_in_milli_seconds) * day_in_milli_seconds
+            expected |= np.isin(this_cadence, vts)
+        gaps = gaps[expected]
+        new_times = new_times[expected]
+        if len(gaps) == 0:
+            return
+
+    # every existing point moves down by the number of nulls added before it, and the nulls fill in the rest
+    nulls_before = np.concatenate(([0], np.cumsum(np.bincount(gaps, minlength=len(times) - 1))))
+    point_positions = (np.arange(len(times)) + nulls_before).tolist()
+    is_point = np.zeros(len(times) + len(gaps), dtype=bool)
+    is_point[point_positions] = True
+    null_positions = np.flatnonzero(~is_point).tolist()
+
+    null_fields = {'x': new_times.tolist(), 'y': ['null'] * len(gaps)}
+    if len(data['error_y']) > 0:
+        null_fields['error_y'] = ['null'] * len(gaps)
+    sub_fields = ['subData', 'subHeaders', 'subVals', 'subSecs'] + (['subLevs'] if has_levels else [])
+    for field in sub_fields:
+        null_fields[field] = [[] for _ in gaps]
+    for field, null_values in null_fields.items():
+        values = [None] * len(is_point)
+        for position, value in zip(point_positions, data[field]):
+            values[position] = value
+        for position, value in zip(null_positions, null_values):
+            values[position] = value
+        data[field][:] = values
 
 
 def _remove_point(data, di, plot_type, stat_var_name, has_levels):
@@ -115,6 +144,135 @@ def _is_number(s):
         return False
 
 
+def _to_list(values):
+    """function for converting a numpy array to a list so that it can be jsonified"""
+    return values.tolist() if not isinstance(values, list) else values
+
+
+def _non_finite_sub_values(sub_vals_all):
+    """function for finding the nans and infs in every point's float sub-values at once, by point index"""
+    float_indices = [d_idx for d_idx, sub_values in enumerate(sub_vals_all)
+                     if isinstance(sub_values, np.ndarray) and sub_values.ndim == 1 and sub_values.dtype.kind == 'f']
+    if len(float_indices) == 0:
+        return float_indices, {}
+    lengths = [len(sub_vals_all[d_idx]) for d_idx in float_indices]
+    bad_values = np.flatnonzero(~np.isfinite(np.concatenate([sub_vals_all[d_idx] for d_idx in float_indices])))
+    if len(bad_values) == 0:
+        return float_indices, {}
+    # map each bad value back to its point, and to its position within that point's sub-values
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    bad_points = np.searchsorted(offsets, bad_values, side='right') - 1
+    bad_value_indices = {}
+    for point, bad_value in zip(bad_points.tolist(), bad_values.tolist()):
+        bad_value_indices.setdefault(float_indices[point], []).append(bad_value - int(offsets[point]))
+    return float_indices, bad_value_indices
+
+
+def _flatten_sub_arrays(sub_arrays):
+    """function for joining the sub-arrays of every row into one list, with a single tolist when they stack"""
+    if len(sub_arrays) > 0 and all(isinstance(sub_array, np.ndarray) and sub_array.ndim > 0 for sub_array in sub_arrays) \
+            and len({(sub_array.shape[1:], sub_array.dtype) for sub_array in sub_arrays}) == 1:
+        return np.concatenate(sub_arrays).tolist()
+    return [item for sub_array in sub_arrays for item in _to_list(sub_array)]
+
+
+def _ensemble_bin_slots(bin_numbers):
+    """function for finding which bin entry each ensemble row adds to, and which rows start a new entry"""
+    bins = np.asarray(bin_numbers, dtype=np.int64)
+    previous_max = np.concatenate(([0], np.maximum.accumulate(bins)[:-1])) if len(bins) > 0 else bins
+    first_rows = bins > previous_max
+    if np.all(bins >= 1) and np.all(bins[first_rows] == previous_max[first_rows] + 1):
+        # the usual case, where each bin shows up after the one before it
+        return bins - 1, first_rows
+    # otherwise a new bin goes at the end of the entries so far, just like appending to a list
+    slots = []
+    first_rows = []
+    n_slots = 0
+    for bin_number in bin_numbers:
+        first_rows.append(n_slots < bin_number)
+        if n_slots < bin_number:
+            slots.append(n_slots)
+            n_slots = n_slots + 1
+        else:
+            slots.append(range(n_slots)[bin_number - 1])
+    return np.asarray(slots, dtype=np.int64), np.asarray(first_rows, dtype=bool)
+
+
+def _data_exists(row, stat_line_type):
+    """function to check if a returned row has data for its line type"""
+    if stat_line_type == 'scalar':
+        return row['fbar'] != "null" and row['fbar'] != "NULL"
+    elif stat_line_type == 'vector':
+        return row['ufbar'] != "null" and row['ufbar'] != "NULL"
+    elif stat_line_type == 'ctc':
+        return row['fy_oy'] != "null" and row['fy_oy'] != "NULL"
+    elif stat_line_type == 'nbrcnt':
+        return row['fss'] != "null" and row['fss'] != "NULL"
+    elif stat_line_type == 'mode_pair':
+        return row['interest'] != "null" and row['interest'] != "NULL"
+    elif stat_line_type == 'mode_single':
+        return row['area'] != "null" and row['area'] != "NULL"
+    else:
+        return row['stat'] != "null" and row['stat'] != "NULL"
+
+
+def reduce_streamed_row(row, statistic, stat_line_type, app_params):
+    """function for calculating a row's statistic as soon as it streams in from the database, so that its raw
+    sub_data string can be released right away. The parsers use the stored result instead of calling get_stat."""
+    try:
+        data_exists = 'sub_data' in row and _data_exists(row, stat_line_type)
+    except KeyError:
+        # this row doesn't look like what the line type expects, so leave it for the parser to deal with
+        data_exists = False
+    if data_exists:
+        # the x-y curve parser calculates its stats in a batch, so use the same batch code for its rows
+        row_stats = get_curve_stats([row], statistic, stat_line_type, app_params) \
+            if app_params["plotType"] != 'Contour' else None
+        row['streamed_stat'] = row_stats[0] if row_stats is not None \
+            else get_stat(row, statistic, stat_line_type, app_params)
+        del row['sub_data']
+    return row
+
+
+def decode_query_rows(rows, stat_line_type, statistic, has_levels):
+    """function for decoding the sub_data of every row that has data, for the query cache. Returns the arrays and
+    each row's number of sub-values, or None if the rows can't be decoded in bulk."""
+    try:
+        data_rows = [row for row in rows if 'sub_data' in row and _data_exists(row, stat_line_type)]
+        if len(data_rows) == 0:
+            return None
+        numpy_data, sub_secs, sub_levs, data_counts = decode_rows_sub_data(
+            data_rows, len(numeric_column_headers(stat_line_type, statistic)), has_levels)
+    except (KeyError, ValueError):
+        return None
+    if isinstance(sub_secs, list):
+        # there were missing secs, which only the row-by-row path knows how to pass through
+        return None
+    data_counts = iter(data_counts.tolist())
+    counts = [next(data_counts) if 'sub_data' in row and _data_exists(row, stat_line_type) else 0 for row in rows]
+    return numpy_data, sub_secs, sub_levs, counts
+
+
+def attach_decoded_sub_data(rows, numpy_data, sub_secs, sub_levs, counts):
+    """function for replacing each row's sub_data string with its slices of the decoded arrays"""
+    start = 0
+    for row, count in zip(rows, counts):
+        if count == 0:
+            continue
+        row['decoded_sub_data'] = (numpy_data[start:start + count], sub_secs[start:start + count],
+                                   sub_levs[start:start + count] if len(sub_levs) > 0 else [])
+        row.pop('sub_data', None)
+        start += count
+    return rows
+
+
+def _get_row_stat(row, statistic, stat_line_type, app_params):
+    """function for getting a row's statistic, using the one calculated as it streamed in if there is one"""
+    if 'streamed_stat' in row:
+        return row['streamed_stat']
+    return get_stat(row, statistic, stat_line_type, app_params)
+
+
 def parse_query_data_xy_curve(idx, query_data, stat_line_type, statistic, app_params, fcsts, vts, return_obj):
     """function for parsing the data returned by an x-y curve query"""
     # initialize local variables
@@ -151,6 +309,12 @@ def parse_query_data_xy_curve(idx, query_data, stat_line_type, statistic, app_pa
         vts = []
         regular = True
 
+    # calculate the stats for every row with data in one batch, if this line type and statistic allow it.
+    # rows that were streamed in from the database already have theirs.
+    batch_stats = get_curve_stats([row for row in query_data if 'streamed_stat' not in row
+                                   and _data_exists(row, stat_line_type)], statistic, stat_line_type, app_params)
+    batch_idx = 0
+
     # loop through the query results and store the returned values
     row_idx = 0
     for row in query_data:
@@ -172,20 +336,7 @@ def parse_query_data_xy_curve(idx, query_data, stat_line_type, statistic, app_pa
         else:
             ind_var = int(row['avtime'])
 
-        if stat_line_type == 'scalar':
-            data_exists = row['fbar'] != "null" and row['fbar'] != "NULL"
-        elif stat_line_type == 'vector':
-            data_exists = row['ufbar'] != "null" and row['ufbar'] != "NULL"
-        elif stat_line_type == 'ctc':
-            data_exists = row['fy_oy'] != "null" and row['fy_oy'] != "NULL"
-        elif stat_line_type == 'nbrcnt':
-            data_exists = row['fss'] != "null" and row['fss'] != "NULL"
-        elif stat_line_type == 'mode_pair':
-            data_exists = row['interest'] != "null" and row['interest'] != "NULL"
-        elif stat_line_type == 'mode_single':
-            data_exists = row['area'] != "null" and row['area'] != "NULL"
-        else:
-            data_exists = row['stat'] != "null" and row['stat'] != "NULL"
+        data_exists = _data_exists(row, stat_line_type)
         if hasattr(row, 'n0'):
             return_obj['n0'][idx].append(int(row['n0']))
         else:
@@ -199,8 +350,16 @@ def parse_query_data_xy_curve(idx, query_data, stat_line_type, statistic, app_pa
         if data_exists:
             ind_var_min = ind_var if ind_var < ind_var_min else ind_var_min
             ind_var_max = ind_var if ind_var > ind_var_max else ind_var_max
-            stat, sub_levs, sub_secs, sub_values, sub_data, sub_headers, return_obj['error'][idx] \
-                = get_stat(row, statistic, stat_line_type, app_params)
+            if 'streamed_stat' in row:
+                stat, sub_levs, sub_secs, sub_values, sub_data, sub_headers, return_obj['error'][idx] \
+                    = row['streamed_stat']
+            elif batch_stats is not None:
+                stat, sub_levs, sub_secs, sub_values, sub_data, sub_headers, return_obj['error'][idx] \
+                    = batch_stats[batch_idx]
+                batch_idx = batch_idx + 1
+            else:
+                stat, sub_levs, sub_secs, sub_values, sub_data, sub_headers, return_obj['error'][idx] \
+                    = get_stat(row, statistic, stat_line_type, app_params)
             if stat == 'null' or not _is_number(stat):
                 # there's bad data at this point
                 stat = 'null'
@@ -218,21 +377,6 @@ def parse_query_data_xy_curve(idx, query_data, stat_line_type, statistic, app_pa
             sub_data = 'NaN'
             sub_headers = 'NaN'
 
-        # deal with missing forecast cycles for dailyModelCycle plot type
-        if plot_type == 'DailyModelCycle' and row_idx > 0 and (
-                int(ind_var) - int(query_data[row_idx - 1]['avtime'] * 1000)) > 3600 * 24 * 1000:
-            cycles_missing = math.ceil(
-                int(ind_var) - int(query_data[row_idx - 1]['avtime'] * 1000) / (3600 * 24 * 1000)) - 1
-            for missing_cycle in reversed(range(1, cycles_missing + 1)):
-                curve_ind_vars.append(ind_var - 3600 * 24 * 1000 * missing_cycle)
-                curve_stats.append('null')
-                sub_data_all.append('NaN')
-                sub_headers_all.append('NaN')
-                sub_vals_all.append('NaN')
-                sub_secs_all.append('NaN')
-                if has_levels:
-                    sub_levs_all.append('NaN')
-
         # store parsed data for later
         curve_ind_vars.append(ind_var)
         curve_stats.append(stat)
@@ -246,14 +390,19 @@ def parse_query_data_xy_curve(idx, query_data, stat_line_type, statistic, app_pa
         # we successfully processed a cycle, so increment both indices
         row_idx = row_idx + 1
 
-    # make sure lists are definitely sorted by the float ind_var values, instead of their former strings
+    # make sure lists are definitely sorted by the float ind_var values, instead of their former strings.
+    # profiles have their levels sorted as strings, so this fixes them too. points with the same ind_var are
+    # ordered by their stats, as the old tuple sort did, with null stats last.
+    tie_stats = np.asarray([np.nan if stat == 'null' else stat for stat in curve_stats], dtype=np.float64)
+    order = np.lexsort((tie_stats, np.asarray(curve_ind_vars, dtype=np.float64))).tolist()
+    curve_ind_vars = [curve_ind_vars[i] for i in order]
+    curve_stats = [curve_stats[i] for i in order]
+    sub_data_all = [sub_data_all[i] for i in order]
+    sub_headers_all = [sub_headers_all[i] for i in order]
+    sub_vals_all = [sub_vals_all[i] for i in order]
+    sub_secs_all = [sub_secs_all[i] for i in order]
     if has_levels:
-        curve_ind_vars, curve_stats, sub_data_all, sub_headers_all, sub_vals_all, sub_secs_all, sub_levs_all = zip(
-            *sorted(zip(curve_ind_vars, curve_stats, sub_data_all, sub_headers_all, sub_vals_all, sub_secs_all,
-            sub_levs_all)))
-    else:
-        curve_ind_vars, curve_stats, sub_data_all, sub_headers_all, sub_vals_all, sub_secs_all = zip(
-            *sorted(zip(curve_ind_vars, curve_stats, sub_data_all, sub_headers_all, sub_vals_all, sub_secs_all)))
+        sub_levs_all = [sub_levs_all[i] for i in order]
 
     n0_max = max(return_obj['n0'][idx])
     n_times_max = max(return_obj['nTimes'][idx])
@@ -262,118 +411,81 @@ def parse_query_data_xy_curve(idx, query_data, stat_line_type, statistic, app_pa
     dep_var_min = sys.float_info.max
     dep_var_max = -1 * sys.float_info.max
 
-    # profiles have the levels sorted as strings, not numbers. Need to fix that
-    if plot_type == 'Profile':
-        curve_stats = [x for _, x in sorted(zip(curve_ind_vars, curve_stats))]
-        sub_data_all = [x for _, x in sorted(zip(curve_ind_vars, sub_data_all))]
-        sub_headers_all = [x for _, x in sorted(zip(curve_ind_vars, sub_headers_all))]
-        sub_vals_all = [x for _, x in sorted(zip(curve_ind_vars, sub_vals_all))]
-        sub_secs_all = [x for _, x in sorted(zip(curve_ind_vars, sub_secs_all))]
-        sub_levs_all = [x for _, x in sorted(zip(curve_ind_vars, sub_levs_all))]
-        curve_ind_vars = sorted(curve_ind_vars)
-
+    # each point looks up the first point with its ind_var, and uses the n0 and nTimes at that position
+    first_indices = {}
+    for d_idx, ind_var in enumerate(curve_ind_vars):
+        first_indices.setdefault(ind_var, d_idx)
+    # flag the points without a stat, or with too many missing sub-values, all at once
+    null_stats = [isinstance(stat, str) and stat == 'null' for stat in curve_stats]
+    incomplete = (np.asarray(return_obj['nTimes'][idx]) < completeness_qc_param * n_times_max).tolist()
+    # JSON can't deal with numpy nans in subarrays for some reason, so we'll make them string NaNs
+    float_indices, bad_value_indices = _non_finite_sub_values(sub_vals_all)
+    float_indices = set(float_indices)
+
+    curve_data = return_obj['data'][idx]
     for ind_var in curve_ind_vars:
         # the reason we need to loop through everything again is to add in nulls
         # for any bad data points along the curve.
-        d_idx = curve_ind_vars.index(ind_var)
-        this_n0 = return_obj['n0'][idx][d_idx]
-        this_n_times = return_obj['nTimes'][idx][d_idx]
+        d_idx = first_indices[ind_var]
         # add a null if there were too many missing sub-values
-        if curve_stats[d_idx] == 'null' or this_n_times < completeness_qc_param * n_times_max:
+        if null_stats[d_idx] or incomplete[d_idx]:
             if not hide_gaps:
                 if plot_type == 'Profile':
                     # profile has the stat first, and then the ind_var. The others have ind_var and then stat.
                     # this is in the pattern of x-plotted-variable, y-plotted-variable.
-                    return_obj['data'][idx]['x'].append('null')
-                    return_obj['data'][idx]['y'].append(ind_var)
-                    return_obj['data'][idx]['error_x'].append('null')
+                    curve_data['x'].append('null')
+                    curve_data['y'].append(ind_var)
+                    curve_data['error_x'].append('null')
                 else:
-                    return_obj['data'][idx]['x'].append(ind_var)
-                    return_obj['data'][idx]['y'].append('null')
-                    return_obj['data'][idx]['error_y'].append('null')
-                return_obj['data'][idx]['subData'].append('NaN')
-                return_obj['data'][idx]['subHeaders'].append('NaN')
-                return_obj['data'][idx]['subVals'].append('NaN')
-                return_obj['data'][idx]['subSecs'].append('NaN')
+                    curve_data['x'].append(ind_var)
+                    curve_data['y'].append('null')
+                    curve_data['error_y'].append('null')
+                curve_data['subData'].append('NaN')
+                curve_data['subHeaders'].append('NaN')
+                curve_data['subVals'].append('NaN')
+                curve_data['subSecs'].append('NaN')
                 if has_levels:
-                    return_obj['data'][idx]['subLevs'].append('NaN')
+                    curve_data['subLevs'].append('NaN')
                 # We use string NaNs instead of numerical NaNs because the JSON encoder
                 # can't figure out what to do with np.nan or float('nan')
         else:
             # put the data in our final data dictionary, converting the numpy arrays to lists so we can jsonify
             loop_sum += curve_stats[d_idx]
-            list_data = sub_data_all[d_idx].tolist() \
-                if not isinstance(sub_data_all[d_idx], list) \
-                else sub_data_all[d_idx]
-            list_headers = sub_headers_all[d_idx].tolist() \
-                if not isinstance(sub_headers_all[d_idx], list) \
-                else sub_headers_all[d_idx]
-            list_vals = sub_vals_all[d_idx].tolist() \
-                if not isinstance(sub_vals_all[d_idx], list) \
-                else sub_vals_all[d_idx]
-            list_secs = sub_secs_all[d_idx].tolist() \
-                if not isinstance(sub_secs_all[d_idx], list) \
-                else sub_secs_all[d_idx]
-            if has_levels:
-                list_levs = sub_levs_all[d_idx].tolist() \
-                    if not isinstance(sub_levs_all[d_idx], list) \
-                    else sub_levs_all[d_idx]
-            else:
-                list_levs = []
-
-            # JSON can't deal with numpy nans in subarrays for some reason, so we make them string NaNs
-            bad_value_indices = [index for index, value in enumerate(list_vals) if not _is_number(value)]
-            for bad_value_index in sorted(bad_value_indices, reverse=True):
+            list_data = _to_list(sub_data_all[d_idx])
+            list_headers = _to_list(sub_headers_all[d_idx])
+            list_vals = _to_list(sub_vals_all[d_idx])
+            if d_idx not in float_indices:
+                bad_value_indices[d_idx] = [index for index, value in enumerate(list_vals) if not _is_number(value)]
+            for bad_value_index in bad_value_indices.get(d_idx, []):
                 list_vals[bad_value_index] = 'NaN'
+            list_secs = _to_list(sub_secs_all[d_idx])
+            list_levs = _to_list(sub_levs_all[d_idx]) if has_levels else []
 
             # store data
             if plot_type == 'Profile':
                 # profile has the stat first, and then the ind_var. The others have ind_var and then stat.
                 # this is in the pattern of x-plotted-variable, y-plotted-variable.
-                return_obj['data'][idx]['x'].append(curve_stats[d_idx])
-                return_obj['data'][idx]['y'].append(ind_var)
-                return_obj['data'][idx]['error_x'].append('null')
+                curve_data['x'].append(curve_stats[d_idx])
+                curve_data['y'].append(ind_var)
+                curve_data['error_x'].append('null')
             else:
-                return_obj['data'][idx]['x'].append(ind_var)
-                return_obj['data'][idx]['y'].append(curve_stats[d_idx])
-                return_obj['data'][idx]['error_y'].append('null')
-            return_obj['data'][idx]['subData'].append(list_data)
-            return_obj['data'][idx]['subHeaders'].append(list_headers)
-            return_obj['data'][idx]['subVals'].append(list_vals)
-            return_obj['data'][idx]['subSecs'].append(list_secs)
+                curve_data['x'].append(ind_var)
+                curve_data['y'].append(curve_stats[d_idx])
+                curve_data['error_y'].append('null')
+            curve_data['subData'].append(list_data)
+            curve_data['subHeaders'].append(list_headers)
+            curve_data['subVals'].append(list_vals)
+            curve_data['subSecs'].append(list_secs)
             if has_levels:
-                return_obj['data'][idx]['subLevs'].append(list_levs)
+                curve_data['subLevs'].append(list_levs)
             dep_var_min = curve_stats[d_idx] if curve_stats[d_idx] < dep_var_min else dep_var_min
             dep_var_max = curve_stats[d_idx] if curve_stats[d_idx] > dep_var_max else dep_var_max
 
-    # add in any missing times in the time series
+    # add in any missing times in the time series, or missing forecast cycles for dailyModelCycle plot type
     if plot_type == 'TimeSeries' and not hide_gaps:
-        day_in_milli_seconds = 24 * 3600 * 1000
-        for d_idx in range(len(curve_ind_vars)-2, -1, -1):
-            lower_ind_var = curve_ind_vars[d_idx]
-            upper_ind_var = curve_ind_vars[d_idx + 1]
-            cycles_missing = math.ceil((float(upper_ind_var) - float(lower_ind_var)) / time_interval) - 1
-            for missing_idx in range(cycles_missing, 0, -1):
-                new_time = lower_ind_var + (missing_idx * time_interval)
-                if not regular:
-                    # if it's not a regular model, we only want to add a null point if
-                    # this is an init time that should have had a forecast.
-                    for fcst in fcsts:
-                        this_cadence = (new_time % day_in_milli_seconds)
-                        # check to see if cycle time was on a previous day -- if so, need to
-                        # wrap around 00Z to get current hour of day (cycle time)
-                        if float(this_cadence) - (float(fcst) * 3600 * 1000) < 0:
-                            number_of_days_back = math.ceil(-1 * (float(this_cadence)
-                                            - (float(fcst) * 3600 * 1000)) / day_in_milli_seconds)
-                            this_cadence = (float(this_cadence) - (float(fcst) * 3600 * 1000)
-                                            + number_of_days_back * day_in_milli_seconds)
-                        else:
-                            this_cadence = (float(this_cadence) - (float(fcst) * 3600 * 1000))
-                        if this_cadence in vts:
-                            _add_null_point(return_obj['data'][idx], d_idx + 1, plot_type, 'x', new_time, 'y', has_levels)
-                            break; # don't need more than one null in a gap
-                else:
-                    _add_null_point(return_obj['data'][idx], d_idx + 1, plot_type, 'x', new_time, 'y', has_levels)
+        _fill_time_gaps(return_obj['data'][idx], curve_ind_vars, time_interval, regular, vts, fcsts, has_levels)
+    elif plot_type == 'DailyModelCycle' and not hide_gaps:
+        _fill_time_gaps(return_obj['data'][idx], curve_ind_vars, 24 * 3600 * 1000, True, [], [], has_levels)
 
     if plot_type == 'Profile':
         return_obj['data'][idx]['xmin'] = dep_var_min
@@ -439,28 +551,23 @@ def parse_query_data_histogram(idx, query_data, stat_line_type, statistic, app_p
                     sub_levs = np.delete(sub_levs, bad_value_indices)
 
             # store parsed data for later
-            list_data = sub_data.tolist() if not isinstance(sub_data, list) else sub_data
-            sub_data_all.append(list_data)
-            list_headers = sub_headers.tolist() if not isinstance(sub_headers, list) else sub_headers
-            sub_headers_all.append(list_headers)
-            list_vals = sub_values.tolist() if not isinstance(sub_values, list) else sub_values
-            sub_vals_all.append(list_vals)
-            list_secs = sub_secs.tolist() if not isinstance(sub_secs, list) else sub_secs
-            sub_secs_all.append(list_secs)
+            sub_data_all.append(sub_data)
+            sub_headers_all.append(sub_headers)
+            sub_vals_all.append(sub_values)
+            sub_secs_all.append(sub_secs)
             if has_levels:
-                list_levs = sub_levs.tolist() if not isinstance(sub_levs, list) else sub_levs
-                sub_levs_all.append(list_levs)
+                sub_levs_all.append(sub_levs)
 
         # we successfully processed a cycle, so increment both indices
         row_idx = row_idx + 1
 
     # we don't have bins yet, so we want all of the data in one array
-    return_obj['data'][idx]['subData'] = [item for sublist in sub_data_all for item in sublist]
-    return_obj['data'][idx]['subHeaders'] = [item for sublist in sub_headers_all for item in sublist]
-    return_obj['data'][idx]['subVals'] = [item for sublist in sub_vals_all for item in sublist]
-    return_obj['data'][idx]['subSecs'] = [item for sublist in sub_secs_all for item in sublist]
+    return_obj['data'][idx]['subData'] = _flatten_sub_arrays(sub_data_all)
+    return_obj['data'][idx]['subHeaders'] = _flatten_sub_arrays(sub_headers_all)
+    return_obj['data'][idx]['subVals'] = _flatten_sub_arrays(sub_vals_all)
+    return_obj['data'][idx]['subSecs'] = _flatten_sub_arrays(sub_secs_all)
     if has_levels:
-        return_obj['data'][idx]['subLevs'] = [item for sublist in sub_levs_all for item in sublist]
+        return_obj['data'][idx]['subLevs'] = _flatten_sub_arrays(sub_levs_all)
     
     return return_obj
 
@@ -504,22 +611,23 @@ def parse_query_data_ensemble_histogram(idx, query_data, stat_line_type, statist
                     sub_levs_all.append([])
 
             else:
-                list_data = sub_data.tolist() if not isinstance(sub_data, list) else sub_data
-                list_headers = sub_headers.tolist() if not isinstance(sub_headers, list) else sub_headers
-                list_vals = sub_values.tolist() if not isinstance(sub_values, list) else sub_values
-                list_secs = sub_secs.tolist() if not isinstance(sub_secs, list) else sub_secs
-                if has_levels:
-                    list_levs = sub_levs.tolist() if not isinstance(sub_levs, list) else sub_levs
+                list_data = _to_list(sub_data)
+                list_headers = _to_list(sub_headers)
+                list_vals = _to_list(sub_values)
+                list_secs = _to_list(sub_secs)
+                list_levs = _to_list(sub_levs) if has_levels else []
 
                 # JSON can't deal with numpy nans in subarrays for some reason, so we remove them
                 # Don 't need them for matching because histograms don't do Overall Statistic
-                bad_value_indices = [index for index, value in enumerate(list_vals) if not _is_number(value)]
-                for bad_value_index in sorted(bad_value_indices, reverse=True):
-                    del list_data[bad_value_index]
-                    del list_vals[bad_value_index]
-                    del list_secs[bad_value_index]
-                    if has_levels:
-                        del list_levs[bad_value_index]
+                if isinstance(sub_values, np.ndarray) and sub_values.dtype.kind == 'f':
+                    good_values = np.isfinite(sub_values).tolist()
+                else:
+                    good_values = [_is_number(value) for value in list_vals]
+                if not all(good_values):
+                    list_data = list(compress(list_data, good_values))
+                    list_vals = list(compress(list_vals, good_values))
+                    list_secs = list(compress(list_secs, good_values))
+                    list_levs = list(compress(list_levs, good_values))
 
                 # store parsed data
                 bins.append(bin_number)
@@ -555,13 +663,12 @@ def parse_query_data_ensemble(idx, query_data, app_params, return_obj):
     """function for parsing the data returned by an ensemble query"""
     # initialize local variables
     plot_type = app_params["plotType"]
-    threshold_all = []
-    oy_all = []
-    on_all = []
-    total_times = []
-    total_values = []
-    observed_total = 0
-    forecast_total = 0
+    bin_numbers = []
+    thresholds = []
+    oys = []
+    ons = []
+    numbers_times = []
+    numbers_values = []
 
     # loop through the query results and store the returned values
     for row in query_data:
@@ -569,40 +676,31 @@ def parse_query_data_ensemble(idx, query_data, app_params, return_obj):
             'oy_i'] != "NULL"
 
         if data_exists:
-            bin_number = int(row['bin_number'])
-            threshold = row['threshold']
-            oy = int(row['oy_i'])
-            on = int(row['on_i'])
-            number_times = int(row['nTimes'])
+            bin_numbers.append(int(row['bin_number']))
+            thresholds.append(row['threshold'])
+            oys.append(int(row['oy_i']))
+            ons.append(int(row['on_i']))
+            numbers_times.append(int(row['nTimes']))
             if hasattr(row, 'n0'):
-                number_values = int(row['n0'])
+                numbers_values.append(int(row['n0']))
             else:
-                number_values = int(row['nTimes'])
-
-            # we must add up all of the observed and not-observed values for each probability bin
-            observed_total = observed_total + oy
-            forecast_total = forecast_total + oy + on
-
-            if len(oy_all) < bin_number:
-                oy_all.append(oy)
-            else:
-                oy_all[bin_number - 1] = oy_all[bin_number - 1] + oy
-            if len(on_all) < bin_number:
-                on_all.append(on)
-            else:
-                on_all[bin_number - 1] = on_all[bin_number - 1] + on
-            if len(total_times) < bin_number:
-                total_times.append(on)
-            else:
-                total_times[bin_number - 1] = total_times[bin_number - 1] + number_times
-            if len(total_values) < bin_number:
-                total_values.append(on)
-            else:
-                total_values[bin_number - 1] = total_values[bin_number - 1] + number_values
-            if len(threshold_all) < bin_number:
-                threshold_all.append(threshold)
-            else:
-                continue
+                numbers_values.append(int(row['nTimes']))
+
+    # we must add up all of the observed and not-observed values for each probability bin
+    slots, first_rows = _ensemble_bin_slots(bin_numbers)
+    n_bins = int(np.count_nonzero(first_rows))
+    oy = np.asarray(oys, dtype=np.int64)
+    on = np.asarray(ons, dtype=np.int64)
+    observed_total = int(oy.sum())
+    forecast_total = int(oy.sum() + on.sum())
+    oy_all = np.bincount(slots, weights=oy, minlength=n_bins).astype(np.int64).tolist()
+    on_all = np.bincount(slots, weights=on, minlength=n_bins).astype(np.int64).tolist()
+    # each bin's times and values start off with the on count of its first row
+    total_times = np.bincount(slots, weights=np.where(first_rows, on, numbers_times),
+                              minlength=n_bins).astype(np.int64).tolist()
+    total_values = np.bincount(slots, weights=np.where(first_rows, on, numbers_values),
+                               minlength=n_bins).astype(np.int64).tolist()
+    threshold_all = [thresholds[row_idx] for row_idx in np.flatnonzero(first_rows).tolist()]
 
     # this function deals with pct and pct_thresh tables
     ens_stats = get_ens_stat(plot_type, forecast_total, observed_total, on_all, oy_all, threshold_all,
@@ -631,16 +729,13 @@ def parse_query_data_contour(idx, query_data, stat_line_type, statistic, app_par
     # initialize local variables
     has_levels = app_params["hasLevels"]
     agg_method = app_params["aggMethod"]
-    curve_stat_lookup = {}
-    curve_n_lookup = {}
+    # get rid of any non-numeric characters
+    non_float = re.compile(r'[^\d.]+')
 
     # loop through the query results and store the returned values
     for row in query_data:
-        # get rid of any non-numeric characters
-        non_float = re.compile(r'[^\d.]+')
         row_x_val = float(non_float.sub('', str(row['xVal']))) if str(row['xVal']) != 'NA' else 0.
         row_y_val = float(non_float.sub('', str(row['yVal']))) if str(row['yVal']) != 'NA' else 0.
-        stat_key = str(row_x_val) + '_' + str(row_y_val)
         data_exists = False
         if stat_line_type == 'scalar':
             data_exists = row['fbar'] != "null" and row['fbar'] != "NULL"
@@ -655,7 +750,7 @@ def parse_query_data_contour(idx, query_data, stat_line_type, statistic, app_par
 
         if data_exists:
             stat, sub_levs, sub_secs, sub_values, sub_data, sub_headers, return_obj['error'][idx] \
-                = get_stat(row, statistic, stat_line_type, app_params)
+                = _get_row_stat(row, statistic, stat_line_type, app_params)
             if stat == 'null' or not _is_number(stat):
                 # there's bad data at this point
                 continue
@@ -694,36 +789,43 @@ def parse_query_data_contour(idx, query_data, stat_line_type, statistic, app_par
 
         return_obj['data'][idx]['minDateTextOutput'].append(min_date)
         return_obj['data'][idx]['maxDateTextOutput'].append(max_date)
-        curve_stat_lookup[stat_key] = stat
-        curve_n_lookup[stat_key] = n
 
     # get the unique x and y values and sort the stats into the 2D z array accordingly
-    return_obj['data'][idx]['x'] = sorted(list(set(return_obj['data'][idx]['xTextOutput'])))
-    return_obj['data'][idx]['y'] = sorted(list(set(return_obj['data'][idx]['yTextOutput'])))
-
-    loop_sum = 0
-    n_points = 0
-    zmin = sys.float_info.max
-    zmax = -1 * sys.float_info.max
-    for curr_y in return_obj['data'][idx]['y']:
-        curr_y_stat_array = []
-        curr_y_n_array = []
-        for curr_x in return_obj['data'][idx]['x']:
-            curr_stat_key = str(curr_x) + '_' + str(curr_y)
-            if curr_stat_key in curve_stat_lookup:
-                curr_stat = curve_stat_lookup[curr_stat_key]
-                curr_n = curve_n_lookup[curr_stat_key]
-                loop_sum = loop_sum + curr_stat
-                n_points = n_points + 1
-                curr_y_stat_array.append(curr_stat)
-                curr_y_n_array.append(curr_n)
-                zmin = curr_stat if curr_stat < zmin else zmin
-                zmax = curr_stat if curr_stat > zmax else zmax
-            else:
-                curr_y_stat_array.append('null')
-                curr_y_n_array.append(0)
-        return_obj['data'][idx]['z'].append(curr_y_stat_array)
-        return_obj['data'][idx]['n'].append(curr_y_n_array)
+    x_vals, x_indices = np.unique(np.asarray(return_obj['data'][idx]['xTextOutput'], dtype=np.float64),
+                                  return_inverse=True)
+    y_vals, y_indices = np.unique(np.asarray(return_obj['data'][idx]['yTextOutput'], dtype=np.float64),
+                                  return_inverse=True)
+    return_obj['data'][idx]['x'] = x_vals.tolist()
+    return_obj['data'][idx]['y'] = y_vals.tolist()
+
+    # each cell gets the stat of the last row with its x and y, and cells without one stay null
+    cells = y_indices.reshape(-1) * len(x_vals) + x_indices.reshape(-1)
+    unique_cells, last_in_reverse = np.unique(cells[::-1], return_index=True)
+    stats = return_obj['data'][idx]['zTextOutput']
+    ns = return_obj['data'][idx]['nTextOutput']
+    last_rows = len(cells) - 1 - last_in_reverse
+    cell_rows = [(cell, row_idx) for cell, row_idx in zip(unique_cells.tolist(), last_rows.tolist())
+                 if not isinstance(stats[row_idx], str)]
+    z = np.full(len(y_vals) * len(x_vals), 'null', dtype=object)
+    n_grid = np.zeros(len(y_vals) * len(x_vals), dtype=object)
+    for cell, row_idx in cell_rows:
+        z[cell] = stats[row_idx]
+        n_grid[cell] = ns[row_idx]
+    return_obj['data'][idx]['z'] = z.reshape(len(y_vals), len(x_vals)).tolist()
+    return_obj['data'][idx]['n'] = n_grid.reshape(len(y_vals), len(x_vals)).tolist()
+
+    # the cells are in row order, so the first min and max and the running sum match a walk through the grid
+    cell_stats = [stats[row_idx] for _, row_idx in cell_rows]
+    n_points = len(cell_stats)
+    if n_points > 0:
+        cell_values = np.asarray(cell_stats, dtype=np.float64)
+        zmin = cell_stats[int(np.argmin(cell_values))]
+        zmax = cell_stats[int(np.argmax(cell_values))]
+        loop_sum = np.add.accumulate(cell_values)[-1]
+    else:
+        zmin = sys.float_info.max
+        zmax = -1 * sys.float_info.max
+        loop_sum = 0
 
     # calculate statistics
     return_obj['data'][idx]['xmin'] = return_obj['data'][idx]['x'][0]
@@ -748,7 +850,7 @@ def parse_query_data_simple_scatter(idx, results, stat_line_type, statistic, app
     statistic_y = statistic[1]
     has_levels = app_params["hasLevels"]
     agg_method = app_params["aggMethod"]
-    outlier_qc_param = "all" if app_params["outliers"] == "all" else int(app_params["outliers"])
+    outlier_qc_param = parse_outlier_qc_param(app_params["outliers"])
 
     # loop through the query results and store the returned values
     for row in results:
@@ -844,6 +946,15 @@ def parse_query_data_simple_scatter(idx, results, stat_line_type, statistic, app
 
     return return_obj
 
+def _sec_lev_keys(secs, levs, lev_codes):
+    """function for encoding sub-value secs, or sec-lev pairs, as integer keys that numpy set operations can match"""
+    keys = np.asarray(secs, dtype=np.int64)
+    if levs is None:
+        return keys
+    codes = np.asarray([lev_codes.setdefault(lev, len(lev_codes)) for lev in levs], dtype=np.int64)
+    return keys * _LEVEL_KEY_SLOTS + codes
+
+
 def do_matching(options, return_obj):
     """function for matching data in the output object"""
     sub_secs_raw = {}
@@ -854,8 +965,6 @@ def do_matching(options, return_obj):
     independent_var_has_point = []
     sub_intersections_object = {}
     sub_intersections_array = []
-    sub_sec_intersection_object = {}
-    sub_sec_intersection_array = []
 
     plot_type = options["query_array"][0]["appParams"]["plotType"]
     has_levels = options["query_array"][0]["appParams"]["hasLevels"]
@@ -926,46 +1035,22 @@ def do_matching(options, return_obj):
     matching_independent_vars = list(matching_independent_vars)
     matching_independent_has_point = list(matching_independent_has_point)
 
+    # sec-lev pairs are matched as integer keys, which all curves share one level dictionary to build
+    lev_codes = {} if has_levels else None
     if remove_non_matching_ind_vars:
-        if has_levels:
-            # loop over each common non-null independentVar value
-            for fi in range(0, len(matching_independent_vars)):
-                curr_independent_var = matching_independent_vars[fi]
-                sub_intersections_object[curr_independent_var] = []
-                curr_sub_intersections = []
-                for si in range(0, len(sub_secs[0][curr_independent_var])):
-                    # fill current intersection array with sec-lev pairs from the first curve
-                    curr_sub_intersections.append(
-                        [sub_secs[0][curr_independent_var][si], sub_levs[0][curr_independent_var][si]])
-                # loop over every curve after the first
-                for curve_index in range(1, curves_length):
-                    temp_sub_intersections = []
-                    for si in range(0, len(sub_secs[curve_index][curr_independent_var])):
-                        # create an individual sec-lev pair for each index in the subSecs and subLevs arrays
-                        temp_pair = [sub_secs[curve_index][curr_independent_var][si],
-                                        sub_levs[curve_index][curr_independent_var][si]]
-                        # see if the individual sec-lev pair matches a pair from the current intersection array
-                        if temp_pair in curr_sub_intersections:
-                            # store matching pairs
-                            temp_sub_intersections.append(temp_pair)
-                    # replace current intersection array with array of only pairs that matched from this loop through.
-                    curr_sub_intersections = temp_sub_intersections
-                # store the final intersecting subSecs array for this common non-null independentVar value
-                sub_intersections_object[curr_independent_var] = curr_sub_intersections
-        else:
-            # loop over each common non - null independentVar value
-            for fi in range(0, len(matching_independent_vars)):
-                curr_independent_var = matching_independent_vars[fi]
-                # fill current subSecs intersection array with subSecs from the first curve
-                curr_sub_sec_intersection = sub_secs[0][curr_independent_var]
-                # loop over every curve after the first
-                for curve_index in range(1, curves_length):
-                    # keep taking the intersection of the current subSecs intersection array with each curve's subSecs array for this independentVar value
-                    curr_sub_sec_intersection = list(
-                        set.intersection(set(curr_sub_sec_intersection),
-                                            set(sub_secs[curve_index][curr_independent_var])))
-                # store the final intersecting subSecs array for this common non-null independentVar value
-                sub_sec_intersection_object[curr_independent_var] = curr_sub_sec_intersection
+        # loop over each common non-null independentVar value
+        for curr_independent_var in matching_independent_vars:
+            # fill current intersection array with sec(-lev) keys from the first curve
+            curr_sub_intersection = _sec_lev_keys(sub_secs[0][curr_independent_var],
+                                                  sub_levs[0][curr_independent_var] if has_levels else None,
+                                                  lev_codes)
+            # loop over every curve after the first, keeping only the keys that this curve also has
+            for curve_index in range(1, curves_length):
+                curr_sub_intersection = np.intersect1d(curr_sub_intersection, _sec_lev_keys(
+                    sub_secs[curve_index][curr_independent_var],
+                    sub_levs[curve_index][curr_independent_var] if has_levels else None, lev_codes))
+            # store the final intersecting keys for this common non-null independentVar value
+            sub_intersections_object[curr_independent_var] = curr_sub_intersection
     else:
         # pull all subSecs and subLevs out of their bins, and back into one main array
         for curve_index in range(0, curves_length):
@@ -983,32 +1068,11 @@ def do_matching(options, return_obj):
             if has_levels:
                 sub_levs[curve_index] = [item for sublist in sub_levs_raw[curve_index] for item in sublist]
 
-        if has_levels:
-            # determine which seconds and levels are present in all curves
-            for si in range(0, len(sub_secs[0])):
-                # fill current intersection array with sec-lev pairs from the first curve
-                sub_intersections_array.append([sub_secs[0][si], sub_levs[0][si]])
-            # loop over every curve after the first
-            for curve_index in range(1, curves_length):
-                temp_sub_intersections = []
-                for si in range(0, len(sub_secs[curve_index])):
-                    # create an individual sec-lev pair for each index in the subSecs and subLevs arrays
-                    temp_pair = [sub_secs[curve_index][si], sub_levs[curve_index][si]]
-                    # see if the individual sec-lev pair matches a pair from the current intersection array
-                    if temp_pair in sub_intersections_array:
-                        # store matching pairs
-                        temp_sub_intersections.append(temp_pair)
-                # replace current intersection array with array of only pairs that matched from this loop through
-                sub_intersections_array = temp_sub_intersections
-        else:
-            # determine which seconds are present in all curves
-            # fill current subSecs intersection array with subSecs from the first curve
-            sub_sec_intersection_array = sub_secs[0]
-            # loop over every curve after the first
-            for curve_index in range(1, curves_length):
-                # keep taking the intersection of the current subSecs intersection array with each curve's subSecs array
-                sub_sec_intersection_array = list(
-                    set.intersection(set(sub_sec_intersection_array), set(sub_secs[curve_index])))
+        # determine which seconds (and levels) are present in all curves
+        sub_intersections_array = _sec_lev_keys(sub_secs[0], sub_levs[0] if has_levels else None, lev_codes)
+        for curve_index in range(1, curves_length):
+            sub_intersections_array = np.intersect1d(sub_intersections_array, _sec_lev_keys(
+                sub_secs[curve_index], sub_levs[curve_index] if has_levels else None, lev_codes))
 
     # remove non-matching independentVars and subSecs
     for curve_index in range(0, curves_length):
@@ -1081,49 +1145,40 @@ def do_matching(options, return_obj):
                 new_sub_levs_x = []
                 new_sub_levs_y = []
 
-                # loop over all subSecs for this independentVar
-                for si in range(0, len(sub_secs)):
+                # keep the subValues only if their associated subSec / subLev is common to all curves for this
+                # independentVar
+                if remove_non_matching_ind_vars:
+                    curr_sub_intersection = sub_intersections_object[curr_independent_var]
+                else:
+                    curr_sub_intersection = sub_intersections_array
+                if len(sub_secs) > 0:
+                    keep = np.isin(_sec_lev_keys(sub_secs, sub_levs if has_levels else None, lev_codes),
+                                   curr_sub_intersection)
+                    new_sub_data = list(compress(sub_data, keep))
+                    new_sub_values = list(compress(sub_values, keep))
+                    new_sub_secs = list(compress(sub_secs, keep))
                     if has_levels:
-                        # create sec-lev pair for each sub value
-                        temp_pair = [sub_secs[si], sub_levs[si]]
-                    # keep the subValue only if its associated subSec / subLev is common to all curves for this independentVar
-                    if (not remove_non_matching_ind_vars and
-                        ((not has_levels and sub_secs[si] in sub_sec_intersection_array)
-                            or (has_levels and temp_pair in sub_intersections_array))) or \
-                            (remove_non_matching_ind_vars and
-                                ((not has_levels and sub_secs[si] in sub_sec_intersection_object[curr_independent_var])
-                                or (has_levels and temp_pair in sub_intersections_object[curr_independent_var]))):
-                        new_sub_data.append(sub_data[si])
-                        new_sub_values.append(sub_values[si])
-                        new_sub_secs.append(sub_secs[si])
-                        if has_levels:
-                            new_sub_levs.append(sub_levs[si])
-
-                # if we have x-related sub_secs, loop over those
-                for si in range(0, len(sub_secs_x)):
+                        new_sub_levs = list(compress(sub_levs, keep))
+
+                # if we have x-related sub_secs, filter those
+                if len(sub_secs_x) > 0:
+                    keep = np.isin(_sec_lev_keys(sub_secs_x, sub_levs_x if has_levels else None, lev_codes),
+                                   sub_intersections_object[curr_independent_var])
+                    new_sub_data_x = list(compress(sub_data_x, keep))
+                    new_sub_values_x = list(compress(sub_values_x, keep))
+                    new_sub_secs_x = list(compress(sub_secs_x, keep))
                     if has_levels:
-                        # create sec-lev pair for each x-sub value
-                        temp_pair_x = [sub_secs_x[si], sub_levs_x[si]]
-                    if (not has_levels and sub_secs_x[si] in sub_sec_intersection_object[curr_independent_var]) \
-                            or (has_levels and temp_pair_x in sub_intersections_object[curr_independent_var]):
-                        new_sub_data_x.append(sub_data_x[si])
-                        new_sub_values_x.append(sub_values_x[si])
-                        new_sub_secs_x.append(sub_secs_x[si])
-                        if has_levels:
-                            new_sub_levs_x.append(sub_levs_x[si])
-
-                # if we have y-related sub_secs, loop over those
-                for si in range(0, len(sub_secs_y)):
+                        new_sub_levs_x = list(compress(sub_levs_x, keep))
+
+                # if we have y-related sub_secs, filter those
+                if len(sub_secs_y) > 0:
+                    keep = np.isin(_sec_lev_keys(sub_secs_y, sub_levs_y if has_levels else None, lev_codes),
+                                   sub_intersections_object[curr_independent_var])
+                    new_sub_data_y = list(compress(sub_data_y, keep))
+                    new_sub_values_y = list(compress(sub_values_y, keep))
+                    new_sub_secs_y = list(compress(sub_secs_y, keep))
                     if has_levels:
-                        # create sec-lev pair for each y-sub value
-                        temp_pair_y = [sub_secs_y[si], sub_levs_y[si]]
-                    if (not has_levels and sub_secs_y[si] in sub_sec_intersection_object[curr_independent_var]) \
-                            or (has_levels and temp_pair_y in sub_intersections_object[curr_independent_var]):
-                        new_sub_data_y.append(sub_data_y[si])
-                        new_sub_values_y.append(sub_values_y[si])
-                        new_sub_secs_y.append(sub_secs_y[si])
-                        if has_levels:
-                            new_sub_levs_y.append(sub_levs_y[si])
+                        new_sub_levs_y = list(compress(sub_levs_y, keep))
 
                 if len(new_sub_secs) == 0 and len(new_sub_secs_x) == 0 and len(new_sub_secs_y) == 0:
                     # no matching sub-values, so null the point
@@ -1159,6 +1214,15 @@ def do_matching(options, return_obj):
                 statistic = options["query_array"][curve_index]["statistic"]
                 stat_line_type = options["query_array"][curve_index]["statLineType"]
                 agg_method = options["query_array"][curve_index]["appParams"]["aggMethod"]
+                mode_interest = 0.70
+                if 'mode_pair' in stat_line_type:
+                    mode_interest, stat_error = read_mode_interest_param(
+                        options["query_array"][curve_index]["appParams"])
+                    if mode_interest is None:
+                        return_obj['error'][curve_index] = stat_error
+                        _null_point(data, di, plot_type, stat_var_name, has_levels)
+                        continue
+                    mode_interest = mode_interest[0]
 
                 if plot_type == "SimpleScatter":
                     statistic = statistic.split('__vs__')
@@ -1173,12 +1237,12 @@ def do_matching(options, return_obj):
 
                     sub_stats_x, sub_secs_x, sub_levs_x, numpy_data_x, stat_x, stat_error = calculate_stat(
                         statistic_x, stat_line_type, agg_method, "all",
-                        np.asarray(data["subDataX"][di]), np.asarray(data["subHeadersX"][di]),
+                        sub_data_array(data["subDataX"][di], stat_line_type), np.asarray(data["subHeadersX"][di]),
                         np.asarray(data["subSecsX"][di]), sub_lev_arg_x)
                     data["x"][di] = stat_x
                     sub_stats_y, sub_secs_y, sub_levs_y, numpy_data_y, stat_y, stat_error = calculate_stat(
                         statistic_y, stat_line_type, agg_method, "all",
-                        np.asarray(data["subDataY"][di]), np.asarray(data["subHeadersY"][di]),
+                        sub_data_array(data["subDataY"][di], stat_line_type), np.asarray(data["subHeadersY"][di]),
                         np.asarray(data["subSecsY"][di]), sub_lev_arg_y)
                     data["y"][di] = stat_y
                     if stat_error != '':
@@ -1191,8 +1255,8 @@ def do_matching(options, return_obj):
 
                     sub_stats, sub_secs, sub_levs, numpy_data, stat, stat_error = calculate_stat(
                         statistic, stat_line_type, agg_method, "all",
-                        np.asarray(data["subData"][di]), np.asarray(data["subHeaders"][di]),
-                        np.asarray(data["subSecs"][di]), sub_lev_arg)
+                        sub_data_array(data["subData"][di], stat_line_type), np.asarray(data["subHeaders"][di]),
+                        np.asarray(data["subSecs"][di]), sub_lev_arg, mode_interest)
                     data[stat_var_name][di] = stat
                     if stat_error != '':
                         return_obj['error'][curve_index] = stat_error
@@ -2,6 +2,7 @@ import getopt
 import sys
 import numpy as np
 import json
+from concurrent.futures import ProcessPoolExecutor
 
 
 class CTCErrorUtil:
@@ -260,15 +261,13 @@ class CTCErrorUtil:
             stat = 'null'
         return stat
 
-    def test_null_hypothesis(self, statistic, minuend_data, subtrahend_data):
+    def test_null_hypothesis(self, statistic, minuend_data, subtrahend_data, random_state=np.random):
         """function for determining the length of error bars on ctc difference curves"""
         try:
             # pre-calculate random indices
             max_tries = 1000
             max_length = len(minuend_data["hit"]) if len(minuend_data["hit"]) > len(subtrahend_data["hit"]) else len(subtrahend_data["hit"])
-            length_indices = range(max_length)
-            rand_indices = np.random.randint(2, size=(max_tries, max_length))
-            other_indices = 1-rand_indices
+            rand_indices = random_state.randint(2, size=(max_tries, max_length))
 
             # make sure input data arrays are the same length
             if len(minuend_data["hit"]) < max_length:
@@ -287,35 +286,32 @@ class CTCErrorUtil:
                     subtrahend_data["miss"].append(0)
                     subtrahend_data["cn"].append(0)
 
-            # store input data in easy-access numpy arrays to eliminate the need to loop over length
-            all_hits = np.transpose(np.asarray([minuend_data["hit"], subtrahend_data["hit"]]))
-            all_fas = np.transpose(np.asarray([minuend_data["fa"], subtrahend_data["fa"]]))
-            all_misses = np.transpose(np.asarray([minuend_data["miss"], subtrahend_data["miss"]]))
-            all_cns = np.transpose(np.asarray([minuend_data["cn"], subtrahend_data["cn"]]))
-            all_diffs = []
-
-            for j in range(0, max_tries):
-                perm_m_hit = all_hits[length_indices, rand_indices[j, :]]
-                perm_m_fa = all_fas[length_indices, rand_indices[j, :]]
-                perm_m_miss = all_misses[length_indices, rand_indices[j, :]]
-                perm_m_cn = all_cns[length_indices, rand_indices[j, :]]
-                perm_s_hit = all_hits[length_indices, other_indices[j, :]]
-                perm_s_fa = all_fas[length_indices, other_indices[j, :]]
-                perm_s_miss = all_misses[length_indices, other_indices[j, :]]
-                perm_s_cn = all_cns[length_indices, other_indices[j, :]]
-
-                perm_m_stat = self.calculate_ctc_stat(statistic, int(np.sum(perm_m_hit)), int(np.sum(perm_m_fa)), int(np.sum(perm_m_miss)), int(np.sum(perm_m_cn)), len(perm_m_hit))
-                perm_s_stat = self.calculate_ctc_stat(statistic, int(np.sum(perm_s_hit)), int(np.sum(perm_s_fa)), int(np.sum(perm_s_miss)), int(np.sum(perm_s_cn)), len(perm_s_hit))
-                perm_diff = perm_m_stat - perm_s_stat
-                all_diffs.append(perm_diff)
-
-            all_diffs.sort()
+            # store input data as hit/fa/miss/cn columns in easy-access numpy arrays
+            minuend_counts = np.transpose(np.asarray([minuend_data["hit"], minuend_data["fa"],
+                                                      minuend_data["miss"], minuend_data["cn"]]))
+            subtrahend_counts = np.transpose(np.asarray([subtrahend_data["hit"], subtrahend_data["fa"],
+                                                         subtrahend_data["miss"], subtrahend_data["cn"]]))
+
+            # a permutation takes the subtrahend's counts wherever its random index is 1, so the permuted minuend sums
+            # for every try come from one matrix product, and the permuted subtrahend sums are whatever is left over
+            perm_m_sums = (np.sum(minuend_counts, axis=0)
+                           + rand_indices @ (subtrahend_counts - minuend_counts)).astype(np.int64)
+            perm_s_sums = np.sum(minuend_counts + subtrahend_counts, axis=0).astype(np.int64) - perm_m_sums
+
+            # a zero denominator in any try has to bail out to the except below, like it does for python ints
+            with np.errstate(divide='raise', invalid='raise'):
+                perm_m_stat = self.calculate_ctc_stat(statistic, perm_m_sums[:, 0], perm_m_sums[:, 1],
+                                                      perm_m_sums[:, 2], perm_m_sums[:, 3], max_length)
+                perm_s_stat = self.calculate_ctc_stat(statistic, perm_s_sums[:, 0], perm_s_sums[:, 1],
+                                                      perm_s_sums[:, 2], perm_s_sums[:, 3], max_length)
+                all_diffs = np.sort(np.broadcast_to(perm_m_stat - perm_s_stat, (max_tries,)))
+
             i_min = int(max_tries * 0.025)
             i_max = int(max_tries * 0.975)
             bot_95 = all_diffs[i_min]
             top_95 = all_diffs[i_max]
             ci_length = (top_95-bot_95)/2  # length of 95th percentile confidence interval. Divide by 1.96 for standard error.
-            return ci_length
+            return float(ci_length)
         except:
             # if we have a null point on the graph with no sub-values, 
             # it will error out. In that case, return a 0 for error length.
@@ -327,13 +323,16 @@ class CTCErrorUtil:
 
     def get_options(self, args):
         """process 'c' style options - using getopt - usage describes options"""
-        usage = ["(S)tatistic=", "(m)inuend_data", "(s)ubtrahend_data"]
+        usage = ["(S)tatistic=", "(m)inuend_data", "(s)ubtrahend_data", "(b)atch", "(j)obs=", "(r)andom_seed="]
         statistic = None
         minuend_data = None
         subtrahend_data = None
+        batch = False
+        jobs = 1
+        seed = None
 
         try:
-            opts, args = getopt.getopt(args[1:], "S:m:s:", usage)
+            opts, args = getopt.getopt(args[1:], "S:m:s:bj:r:", usage)
         except getopt.GetoptError as err:
             # print help information and exit:
             print(str(err))  # will print something like "option -a not recognized"
@@ -349,26 +348,75 @@ class CTCErrorUtil:
                 minuend_data = json.loads(a)
             elif o == "-s":
                 subtrahend_data = json.loads(a)
+            elif o == "-b":
+                batch = True
+            elif o == "-j":
+                jobs = max(1, int(a))
+            elif o == "-r":
+                seed = int(a)
             else:
                 assert False, "unhandled option"
         # make sure none were left out...
-        assert True, statistic is not None and minuend_data is not None and subtrahend_data is not None
+        assert True, batch or (statistic is not None and minuend_data is not None and subtrahend_data is not None)
         options = {
             "statistic": statistic,
             "minuend_data": minuend_data,
-            "subtrahend_data": subtrahend_data
+            "subtrahend_data": subtrahend_data,
+            "batch": batch,
+            "jobs": jobs,
+            "seed": seed
         }
         return options
 
     def calc_error_stats(self, options):
         """function for validating options and passing them to the null hypothesis tester"""
         self.validate_options(options)
+        if options["seed"] is not None:
+            np.random.seed(options["seed"])
         self.error_length = self.test_null_hypothesis(options["statistic"], options["minuend_data"], options["subtrahend_data"])
 
+    def calc_batch_error_stats(self, options, tasks):
+        """function for calculating the error lengths of a list of tasks, optionally across a process pool"""
+        # forked pool workers all inherit the global random state, so every task gets its own instead
+        seed_sequences = np.random.SeedSequence().spawn(len(tasks))
+        random_states = [task_random_state(task.get("seed", options["seed"]), seed_sequence)
+                         for task, seed_sequence in zip(tasks, seed_sequences)]
+        if options["jobs"] > 1 and len(tasks) > 1:
+            with ProcessPoolExecutor(max_workers=options["jobs"]) as executor:
+                results = list(executor.map(calc_task_error_stats, tasks, random_states,
+                                            chunksize=max(1, len(tasks) // (options["jobs"] * 4))))
+        else:
+            results = [calc_task_error_stats(task, random_state) for task, random_state in zip(tasks, random_states)]
+        self.output_JSON = json.dumps(results)
+
+
+def task_random_state(seed, seed_sequence):
+    """function for making a batch task's random state. A seeded task draws exactly what a single-shot run with the
+    same seed would, and an unseeded one gets an independent stream from its own spawned seed sequence."""
+    if seed is not None:
+        return np.random.RandomState(seed)
+    return np.random.RandomState(np.random.MT19937(seed_sequence))
+
+
+def calc_task_error_stats(task, random_state):
+    """function for calculating one batch task's error length with its own random state"""
+    ctc_util = CTCErrorUtil()
+    error_length = ctc_util.test_null_hypothesis(task["statistic"], task["minuend_data"], task["subtrahend_data"],
+                                                 random_state)
+    return {
+        "error_length": error_length,
+        "error": ctc_util.error
+    }
+
 
 if __name__ == '__main__':
     ctc_util = CTCErrorUtil()
     options = ctc_util.get_options(sys.argv)
-    ctc_util.calc_error_stats(options)
-    ctc_util.construct_output_json()
+    if options["batch"]:
+        # the tasks are too big for argv, so they come in on stdin as a JSON list of
+        # {"statistic": ..., "minuend_data": ..., "subtrahend_data": ..., "seed" (optional): ...}
+        ctc_util.calc_batch_error_stats(options, json.load(sys.stdin))
+    else:
+        ctc_util.calc_error_stats(options)
+        ctc_util.construct_output_json()
     print(ctc_util.output_JSON)
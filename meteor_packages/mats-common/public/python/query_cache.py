@@ -0,0 +1,135 @@
+"""
+On-disk cache of decoded query results for the MATS query utilities.
+
+Replotting a curve with a different statistic (RMSE -> bias -> MSE) usually runs the exact same SQL, since the
+partial sums don't depend on the statistic. This cache keeps each query's rows with their sub_data already decoded
+into numpy arrays, keyed by the normalized statement, the database, and the layout of the decoded columns, so that a
+replot can skip both the database and the string parsing. Each entry is a directory holding:
+
+    rows.json        the rows without their sub_data, plus how many sub-values each row has
+    numpy_data.npy   the decoded sub-values of every row, one after another
+    sub_secs.npy     their secs
+    sub_levs.npy     their levels, if the query has levels
+
+The .npy files are memory-mapped on a hit. Entries expire after a time-to-live, and the least recently used entries
+are evicted once the cache grows past its size limit.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from decimal import Decimal
+import numpy as np
+
+
+class _RowEncoder(json.JSONEncoder):
+    """class that encodes the types pymysql returns that JSON can't, so that they come back as the same types"""
+    def default(self, obj):
+        if isinstance(obj, Decimal):
+            return {"__decimal__": str(obj)}
+        if isinstance(obj, np.integer):
+            return int(obj)
+        if isinstance(obj, np.floating):
+            return float(obj)
+        return json.JSONEncoder.default(self, obj)
+
+
+def _decode_row_value(obj):
+    """function for restoring the values _RowEncoder had to encode"""
+    if "__decimal__" in obj:
+        return Decimal(obj["__decimal__"])
+    return obj
+
+
+class QueryCache:
+    """class that stores and looks up the decoded rows of a query on disk"""
+    def __init__(self, cache_dir, ttl=8 * 3600, max_bytes=1024 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def make_key(self, scope, statement, layout):
+        """function for hashing a database scope, a normalized statement, and the decoded column layout into a key"""
+        normalized = re.sub(r'\s+', ' ', str(statement)).strip()
+        return hashlib.sha256(json.dumps([scope, normalized, layout]).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """function for loading a cached entry as its rows and memory-mapped arrays, or None on a miss"""
+        entry_dir = os.path.join(self.cache_dir, key)
+        rows_path = os.path.join(entry_dir, 'rows.json')
+        try:
+            with open(rows_path) as rows_file:
+                entry = json.load(rows_file, object_hook=_decode_row_value)
+            if time.time() - entry["created"] > self.ttl:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+                return None
+            numpy_data = np.load(os.path.join(entry_dir, 'numpy_data.npy'), mmap_mode='r')
+            sub_secs = np.load(os.path.join(entry_dir, 'sub_secs.npy'), mmap_mode='r')
+            levs_path = os.path.join(entry_dir, 'sub_levs.npy')
+            sub_levs = np.load(levs_path, mmap_mode='r') if os.path.exists(levs_path) else []
+            # mark the entry as recently used, for the eviction
+            os.utime(rows_path)
+        except (OSError, ValueError, KeyError):
+            # missing, half-evicted, or unreadable entries are just misses
+            return None
+        return entry["rows"], numpy_data, sub_secs, sub_levs, entry["counts"]
+
+    def put(self, key, rows, numpy_data, sub_secs, sub_levs, counts):
+        """function for storing a query's rows and decoded arrays, then evicting entries to stay under the limit"""
+        try:
+            # rows without data keep their sub_data, since there's nothing decoded to replace it
+            encoded_rows = json.dumps({"created": time.time(), "counts": [int(count) for count in counts],
+                                       "rows": [{field: value for field, value in row.items()
+                                                 if field != 'sub_data' or count == 0}
+                                                for row, count in zip(rows, counts)]}, cls=_RowEncoder)
+        except TypeError:
+            # some column has a type we can't store, so this query just doesn't get cached
+            return
+        # build the entry in a temporary directory and rename it into place, so readers never see half an entry
+        temp_dir = tempfile.mkdtemp(prefix='.tmp_', dir=self.cache_dir)
+        try:
+            np.save(os.path.join(temp_dir, 'numpy_data.npy'), numpy_data)
+            np.save(os.path.join(temp_dir, 'sub_secs.npy'), sub_secs)
+            if len(sub_levs) > 0:
+                np.save(os.path.join(temp_dir, 'sub_levs.npy'), sub_levs)
+            with open(os.path.join(temp_dir, 'rows.json'), 'w') as rows_file:
+                rows_file.write(encoded_rows)
+            entry_dir = os.path.join(self.cache_dir, key)
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            os.rename(temp_dir, entry_dir)
+        except OSError:
+            # another process may have stored the same entry first, or the disk is full -- either way, move on
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            return
+        self.evict()
+
+    def evict(self):
+        """function for removing expired entries, then the least recently used ones until the cache fits"""
+        entries = []
+        now = time.time()
+        for key in os.listdir(self.cache_dir):
+            if key.startswith('.'):
+                # another process is still writing this one
+                continue
+            entry_dir = os.path.join(self.cache_dir, key)
+            try:
+                # the arrays are never touched after they're written, but rows.json is touched on every hit
+                created = os.path.getmtime(os.path.join(entry_dir, 'numpy_data.npy'))
+                last_used = os.path.getmtime(os.path.join(entry_dir, 'rows.json'))
+                size = sum(entry.stat().st_size for entry in os.scandir(entry_dir))
+            except OSError:
+                continue
+            if now - created > self.ttl:
+                shutil.rmtree(entry_dir, ignore_errors=True)
+            else:
+                entries.append((last_used, size, entry_dir))
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, entry_dir in sorted(entries):
+            if total_size <= self.max_bytes:
+                break
+            shutil.rmtree(entry_dir, ignore_errors=True)
+            total_size -= size
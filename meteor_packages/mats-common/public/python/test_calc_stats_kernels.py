@@ -0,0 +1,152 @@
+"""
+Parity tests for the row-at-once statistic kernels in calc_stats.py. Every scalar and vector kernel is checked
+against metcalcpy, one sub-value row at a time, the same way the row-by-row path in calculate_stat calls it. The
+kernels copy metcalcpy's mid-calculation rounding, its None for missing data, its -0.0 handling, and the cases
+where it raises, so a metcalcpy upgrade that changes any of those should fail here.
+
+usage: python -m pytest test_calc_stats_kernels.py
+"""
+import numpy as np
+import pytest
+
+import calc_stats
+
+SEED = 20240101
+N_RANDOM_ROWS = 300
+
+SCALAR_STATISTICS = sorted(calc_stats._scalar_stat_switch())
+VECTOR_STATISTICS = sorted(calc_stats._vector_stat_switch())
+
+
+def _partial_sums_row(rng, column_headers):
+    """function for making one sub-value row of partial sums from a random sample, so that the sums agree"""
+    n = int(rng.integers(2, 60))
+    if 'ffbar' in column_headers:
+        f = rng.normal(rng.normal(0, 3), abs(rng.normal(1, 1)) + 1e-3, n)
+        o = f + rng.normal(0, rng.uniform(0, 2), n)
+        return [f.mean(), o.mean(), (f * f).mean(), (o * o).mean(), (f * o).mean(), n]
+    if 'ffabar' in column_headers:
+        f = rng.normal(0, 3, n)
+        o = f + rng.normal(0, rng.uniform(0, 2), n)
+        return [f.mean(), o.mean(), (f * f).mean(), (o * o).mean(), (f * o).mean(), n]
+    uf, vf = rng.normal(0, 5, n), rng.normal(0, 5, n)
+    uo, vo = uf + rng.normal(0, 1, n), vf + rng.normal(0, 1, n)
+    row = [uf.mean(), vf.mean(), uo.mean(), vo.mean(), (uf * uo + vf * vo).mean(), (uf * uf + vf * vf).mean(),
+           (uo * uo + vo * vo).mean()]
+    if 'f_speed_bar' in column_headers:
+        row += [np.hypot(uf, vf).mean(), np.hypot(uo, vo).mean()]
+    return row + [n]
+
+
+def _edge_case_rows(rng, column_headers):
+    """function for making the sub-value rows where metcalcpy's behavior is easiest to get wrong"""
+    width = len(column_headers)
+    rows = []
+    for col_idx in range(width):
+        # a missing value in each column
+        row = _partial_sums_row(rng, column_headers)
+        row[col_idx] = np.nan
+        rows.append(row)
+        # a signed zero in each column
+        row = _partial_sums_row(rng, column_headers)
+        row[col_idx] = -0.
+        rows.append(row)
+    for total in (0., 1., -0.):
+        row = _partial_sums_row(rng, column_headers)
+        row[-1] = total
+        rows.append(row)
+    # all zeros, with totals of 0 and 1
+    rows.append([0.] * width)
+    rows.append([0.] * (width - 1) + [1.])
+    rows.append([-0.] * (width - 1) + [1.])
+    # every sum the same, so the variances are negative or zero
+    row = _partial_sums_row(rng, column_headers)
+    rows.append([row[0]] * (width - 1) + [row[-1]])
+    # squares smaller than the squared means, so the variances are negative
+    row = _partial_sums_row(rng, column_headers)
+    rows.append([value * 0.01 if 2 <= col_idx < width - 1 else value for col_idx, value in enumerate(row)])
+    # tiny values that round to zero partway through
+    rows.append([1e-6] + [0.] * (width - 2) + [1.])
+    return rows
+
+
+def _sub_value_rows(column_headers):
+    """function for making seeded random and edge-case sub-value rows for a set of column headers"""
+    rng = np.random.default_rng(SEED)
+    rows = [_partial_sums_row(rng, column_headers) for _ in range(N_RANDOM_ROWS)]
+    # some rows rounded, the way they come out of the database
+    rows += [np.round(row, 1).tolist() for row in rows[:N_RANDOM_ROWS // 10]]
+    rows += _edge_case_rows(rng, column_headers)
+    return np.asarray(rows, dtype=np.float64)
+
+
+def _metcalcpy_row_stat(statistic, stat_line_type, row, column_headers):
+    """function for getting metcalcpy's statistic for one sub-value row, as calculate_stat stores it, or the
+    exception metcalcpy raised"""
+    try:
+        sub_stat = calc_stats._stat_switch(stat_line_type)[statistic](row[None, :].copy(), column_headers)
+    except Exception as e:
+        return None, e
+    # calculate_stat stores sub-stats in a float array, so metcalcpy's None becomes a nan
+    return np.nan if sub_stat is None else float(sub_stat), None
+
+
+def _assert_same_value(expected, actual, message):
+    """function for checking that two sub-stats are the same float, nan included, down to the sign of zero"""
+    if np.isnan(expected):
+        assert np.isnan(actual), message
+    else:
+        assert actual == expected and np.signbit(actual) == np.signbit(expected), message
+
+
+@pytest.mark.parametrize("stat_line_type, statistics, kernels", [
+    ('scalar', SCALAR_STATISTICS, calc_stats._scalar_row_stat_switch),
+    ('vector', VECTOR_STATISTICS, calc_stats._vector_row_stat_switch),
+])
+def test_every_statistic_has_a_kernel(stat_line_type, statistics, kernels):
+    assert sorted(kernels()) == statistics
+
+
+@pytest.mark.parametrize("stat_line_type, statistic",
+                         [('scalar', statistic) for statistic in SCALAR_STATISTICS]
+                         + [('vector', statistic) for statistic in VECTOR_STATISTICS])
+def test_row_stats_match_metcalcpy(stat_line_type, statistic):
+    column_headers = calc_stats.numeric_column_headers(stat_line_type, statistic)
+    rows = _sub_value_rows(column_headers)
+    expected = []
+    for row in rows:
+        sub_stat, error = _metcalcpy_row_stat(statistic, stat_line_type, row, column_headers)
+        message = "%s %s for %s" % (stat_line_type, statistic, row.tolist())
+        if error is not None:
+            # the kernels raise a ValueError so that get_curve_stats leaves the point to the row-by-row path
+            with pytest.raises(ValueError):
+                calc_stats.calculate_row_stats(statistic, stat_line_type, row[None, :].copy(), column_headers)
+            continue
+        actual = calc_stats.calculate_row_stats(statistic, stat_line_type, row[None, :].copy(), column_headers)[0]
+        _assert_same_value(sub_stat, actual, message)
+        expected.append((row, sub_stat))
+
+    # the rows metcalcpy can do should come out the same when they're all calculated at once
+    batch = np.asarray([row for row, _ in expected])
+    actual = calc_stats.calculate_row_stats(statistic, stat_line_type, batch.copy(), column_headers)
+    for (row, sub_stat), sub_actual in zip(expected, actual):
+        _assert_same_value(sub_stat, sub_actual, "%s %s in a batch for %s" % (stat_line_type, statistic,
+                                                                             row.tolist()))
+
+
+@pytest.mark.parametrize("statistic, row", [
+    # a negative MSE, which metcalcpy can't take the square root of after rounding
+    ('RMSE', [1., 1., 0.5, 0.5, 2., 10.]),
+    ('Bias-corrected RMSE', [1., 1., 0.5, 0.5, 2., 10.]),
+    # the error stdev of a single sample divides by zero
+    ('Error stdev', [2., 1., 5., 2., 3., 1.]),
+    # a missing total
+    ('N', [2., 1., 5., 2., 3., np.nan]),
+])
+def test_kernel_raises_where_metcalcpy_raises(statistic, row):
+    column_headers = calc_stats.numeric_column_headers('scalar', statistic)
+    numpy_data = np.asarray([row])
+    _, error = _metcalcpy_row_stat(statistic, 'scalar', numpy_data[0], column_headers)
+    assert error is not None
+    with pytest.raises(ValueError):
+        calc_stats.calculate_row_stats(statistic, 'scalar', numpy_data.copy(), column_headers)
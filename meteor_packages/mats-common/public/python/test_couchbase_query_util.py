@@ -0,0 +1,85 @@
+"""
+Tests for how CBQueryUtil.query_db collects a Couchbase query's sub-values. The couchbase client is only needed to
+import the module, so the cluster here is a stand-in that returns the documents each test gives it.
+
+usage: python -m pytest test_couchbase_query_util.py
+"""
+import math
+
+import numpy as np
+import pytest
+
+pytest.importorskip("couchbase")
+
+import couchbase_query_util
+
+FCSTS = ["0", "6"]
+LEVELS = ["500", "850"]
+
+
+class _QueryResult:
+    """stand-in for a couchbase query result"""
+    def __init__(self, rows):
+        self._rows = rows
+
+    def rows(self):
+        return self._rows
+
+
+class _Cluster:
+    """stand-in for a couchbase cluster, which returns no dates and then the given rows"""
+    def __init__(self, rows):
+        self._rows = rows
+
+    def query(self, statement, options):
+        if statement.startswith("SELECT DISTINCT"):
+            return _QueryResult([])
+        return _QueryResult(self._rows)
+
+
+def _query(plot_type, stat_field):
+    """function for making a precalculated query for the stand-in cluster"""
+    return {
+        "appParams": {"plotType": plot_type, "hideGaps": False, "hasLevels": True, "completeness": "0",
+                      "aggMethod": "Mean statistic", "outliers": "all", "matching": False},
+        "database": "db", "lineType": "SL1L2", "statField": stat_field, "statement": "{{docIDTemplate}}",
+        "docIDTemplate": "doc", "dateVariable": "fcstValidEpoch", "fromSecs": 0, "toSecs": 1, "vts": "",
+        "fcsts": FCSTS, "levels": LEVELS, "versions": [], "storms": [], "statLineType": "precalculated",
+        "statistic": "ACC"
+    }
+
+
+def _run(query, rows):
+    """function for running query_db on some documents and returning the curve it made, and its error"""
+    cb_util = couchbase_query_util.CBQueryUtil()
+    cb_util.data, cb_util.n0, cb_util.nTimes, cb_util.error = [], [], [], []
+    cb_util.set_up_output_fields(1)
+    cb_util.query_db(_Cluster(rows), {"query_array": [query], "bucket": "b", "scope": "s", "collection": "c"})
+    return cb_util.data[0], cb_util.error[0]
+
+
+def _datum(secs, values):
+    """function for making one datum, with a value for each forecast lead"""
+    return [secs, "500", {fcst: {"level": "500", "a": value, "b": 2.} for fcst, value in zip(FCSTS, values)}]
+
+
+@pytest.mark.parametrize("stat_field", ["a", ["a", "b", "minus"]])
+def test_null_stat_field_is_a_missing_value(stat_field):
+    rows = [{"hr_of_day": 0, "data": [_datum(1600000000, [1., None]), _datum(1600003600, [3., 5.])]}]
+    curve, error = _run(_query("ValidTime", stat_field), rows)
+    assert error == ""
+    # the null value is dropped from the mean, but the other values aren't
+    expected = np.mean([1., 3., 5.]) if stat_field == "a" else np.mean([-1., 1., 3.])
+    assert math.isclose(curve["y"][0], expected)
+    assert len(curve["subVals"][0]) == 4
+    assert sum(1 for value in curve["subVals"][0] if value == 'NaN') == 1
+
+
+def test_dieoff_with_null_stat_field():
+    rows = [{"data": [_datum(1600000000, [None, 2.]), _datum(1600003600, [None, 4.])]}]
+    curve, error = _run(_query("Dieoff", "a"), rows)
+    assert error == ""
+    # the first forecast lead has only null values, so it's there but has no stat
+    assert curve["x"] == [0, 6]
+    assert curve["y"][0] == 'null'
+    assert math.isclose(curve["y"][1], 3.)